@@ -0,0 +1,197 @@
+from collections import Counter, deque
+
+from .action_frame import ActionFrame
+
+
+class TurnRecord:
+    """What happened during one turn, from the point of view of player 0 (you).
+
+    Locations are (x, y) tuples and unit types are indexes into the config's unitInformation.
+
+    Attributes :
+        * turn_number (int): The turn this record is for
+        * health, SP, MP (list): Each player's health and resources at the start of the turn, indexed by player
+        * spawns (list): For each player, the (unit_type, x, y) of every unit they spawned
+        * breaches (list): For each player, the (x, y) locations where their units scored
+        * structure_deaths (list): For each player, the (x, y) locations where their structures were destroyed
+
+    """
+    __slots__ = ("turn_number", "health", "SP", "MP", "spawns", "breaches", "structure_deaths")
+
+    def __init__(self, turn_number):
+        self.turn_number = turn_number
+        self.health = [None, None]
+        self.SP = [None, None]
+        self.MP = [None, None]
+        self.spawns = ([], [])
+        self.breaches = ([], [])
+        self.structure_deaths = ([], [])
+
+
+class History:
+    """Keeps a record of the last turns of the game, built incrementally from turn states and action frames.
+
+    Records are kept in a ring buffer, so memory stays bounded however long the game is.
+    Only the event lists of frames that contain spawns, breaches or deaths are decoded.
+    AlgoCore.enable_history sets one up and feeds it every message from the engine.
+
+    Attributes :
+        * capacity (int): The number of turns kept
+        * records (deque): The TurnRecords of the last capacity turns, oldest first
+        * structure_types (int): Unit type indexes below this are structures
+
+    """
+    def __init__(self, capacity=100, structure_types=3):
+        """Creates an empty history
+
+        Args:
+            capacity: The number of turns kept
+            structure_types: The number of structure types, which come first in the config's unitInformation
+
+        """
+        self.capacity = capacity
+        self.records = deque(maxlen=capacity)
+        self.structure_types = structure_types
+
+    def __record(self, turn_number):
+        """The record of a turn, created if it is newer than every kept record
+        """
+        if self.records and self.records[-1].turn_number == turn_number:
+            return self.records[-1]
+        for record in self.records:
+            if record.turn_number == turn_number:
+                return record
+        record = TurnRecord(turn_number)
+        self.records.append(record)
+        return record
+
+    def record_turn(self, state_string):
+        """Records the health and resources of both players from a turn state
+
+        Args:
+            state_string: The game state string sent by the engine at the start of a turn
+
+        """
+        frame = state_string if isinstance(state_string, ActionFrame) else ActionFrame(state_string)
+        record = self.__record(frame.turn_number)
+        for player_index, key in enumerate(["p1Stats", "p2Stats"]):
+            stats = frame.section(key)
+            if stats:
+                record.health[player_index], record.SP[player_index], record.MP[player_index] = map(float, stats[:3])
+
+    def record_frame(self, frame):
+        """Records the spawns, breaches and structure deaths of an action frame
+
+        Args:
+            frame: The action frame, as an ActionFrame or a string
+
+        """
+        if not isinstance(frame, ActionFrame):
+            frame = ActionFrame(frame)
+        record = None
+        if frame.has_event("spawn"):
+            record = self.__record(frame.turn_number)
+            # [[x, y], unit type, unit id, player (1 is you, 2 is the enemy)]
+            for location, unit_type, _, player in (event[:4] for event in frame.event("spawn")):
+                record.spawns[int(player) - 1].append((int(unit_type), int(location[0]), int(location[1])))
+        if frame.has_event("breach"):
+            record = record or self.__record(frame.turn_number)
+            # [[x, y], damage, unit type, unit id, player]
+            for event in frame.event("breach"):
+                record.breaches[int(event[4]) - 1].append((int(event[0][0]), int(event[0][1])))
+        if frame.has_event("death"):
+            record = record or self.__record(frame.turn_number)
+            # [[x, y], unit type, unit id, player, removed by its owner]
+            for event in frame.event("death"):
+                if int(event[1]) < self.structure_types and not (len(event) > 4 and event[4]):
+                    record.structure_deaths[int(event[3]) - 1].append((int(event[0][0]), int(event[0][1])))
+
+    def last(self, turns=None):
+        """The records of the last turns, oldest first
+
+        Args:
+            turns: The number of turns, every kept turn if None
+
+        Returns:
+            A list of TurnRecords
+
+        """
+        records = list(self.records)
+        return records if turns is None else records[-turns:]
+
+    def attack_side_distribution(self, turns=None, player_index=1, arena_size=28):
+        """Counts the mobile units a player spawned on each half of the board
+
+        Args:
+            turns: The number of recent turns to look at, every kept turn if None
+            player_index: The attacking player, 1 for the enemy by default
+            arena_size: The size of the arena
+
+        Returns:
+            A dict with the number of units spawned on the 'left' and 'right' halves
+
+        """
+        sides = {'left': 0, 'right': 0}
+        for record in self.last(turns):
+            for unit_type, x, _ in record.spawns[player_index]:
+                if unit_type >= self.structure_types:
+                    sides['left' if x < arena_size // 2 else 'right'] += 1
+        return sides
+
+    def spawn_counts(self, turns=None, player_index=1):
+        """Counts the units a player spawned per unit type index
+
+        Args:
+            turns: The number of recent turns to look at, every kept turn if None
+            player_index: The player, 1 for the enemy by default
+
+        Returns:
+            A Counter of unit type index to number of units spawned
+
+        """
+        return Counter(unit_type for record in self.last(turns) for unit_type, _, _ in record.spawns[player_index])
+
+    def breached_locations(self, turns=None, player_index=1):
+        """Counts the locations where a player's units scored
+
+        Args:
+            turns: The number of recent turns to look at, every kept turn if None
+            player_index: The scoring player, 1 for the enemy by default, which gives the tiles where you were breached
+
+        Returns:
+            A Counter of (x, y) to number of breaches
+
+        """
+        return Counter(location for record in self.last(turns) for location in record.breaches[player_index])
+
+    def structure_death_locations(self, turns=None, player_index=0):
+        """Counts the locations where a player's structures were destroyed
+
+        Args:
+            turns: The number of recent turns to look at, every kept turn if None
+            player_index: The player who lost the structures, 0 for you by default
+
+        Returns:
+            A Counter of (x, y) to number of structures destroyed
+
+        """
+        return Counter(location for record in self.last(turns) for location in record.structure_deaths[player_index])
+
+    def resource_curve(self, resource="MP", player_index=1, turns=None):
+        """Gets a player's health or resources at the start of each recorded turn
+
+        Args:
+            resource: 'MP', 'SP' or 'health'
+            player_index: The player, 1 for the enemy by default
+            turns: The number of recent turns to look at, every kept turn if None
+
+        Returns:
+            A list of (turn number, value) pairs, oldest first, skipping turns without a recorded value
+
+        """
+        curve = []
+        for record in self.last(turns):
+            value = getattr(record, resource)[player_index]
+            if value is not None:
+                curve.append((record.turn_number, value))
+        return curve
@@ -1,24 +1,26 @@
-import heapq
-import math
 import sys
-import queue
+from collections import deque
+from .game_map import IN_BOUNDS_MASK
 from .util import debug_write
 
-class Node:
-    """A path-finding node
+ARENA_SIZE = 28
 
-    Attributes :
-        * visited_idealness (bool): Have we visited this node during the idealness search step?
-        * visited_validate (bool): Have we visited this node during the validation step?
-        * blocked (bool): Is there a structures at this node's location
-        * pathlength: The distance between this node and the target location
 
+def _build_neighbors(arena_size):
+    """Precomputes the in bounds neighbors of every location, as flat indices.
+    Neighbors are listed in the order up, down, right, left, the order units consider them in.
     """
-    def __init__(self):
-        self.visited_idealness = False
-        self.visited_validate = False
-        self.blocked = False
-        self.pathlength = -1
+    neighbors = []
+    for index in range(arena_size * arena_size):
+        x, y = divmod(index, arena_size)
+        adjacent = []
+        for nx, ny in ((x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y)):
+            if 0 <= nx < arena_size and 0 <= ny < arena_size and IN_BOUNDS_MASK[nx * arena_size + ny]:
+                adjacent.append(nx * arena_size + ny)
+        neighbors.append(tuple(adjacent))
+    return tuple(neighbors)
+
+NEIGHBORS = _build_neighbors(ARENA_SIZE)
 
 """
 This class helps with pathfinding. We guarantee the results will
@@ -28,29 +30,72 @@ code to maximise time efficiency
 class ShortestPathFinder:
     """Handles path-finding
 
+    The pathfinder caches its work for the board it was last used on. The blocked grid and the
+    'pockets' of connected pathable space are built once per version of the GameMap, and each
+    validation distance field is built once per target edge (or self destruct tile). Repeated
+    queries on an unchanged board only have to walk back along a cached distance field.
+    Spawning or removing structures through GameMap or GameState changes the map version and
+    invalidates the cache. Given a TranspositionTable, the grids and distance fields of every board
+    are also kept there under its zobrist hash, so they are reused when the board comes back,
+    on a later turn or after a rollback.
+
     Attributes :
         * HORIZONTAL (int): A constant representing a horizontal movement
         * VERTICAL (int): A constant representing a vertical movement
 
         * game_state (:obj: GameState): The current gamestate
-        * game_map (:obj: GameMap): The current gamemap
+        * table (:obj: TranspositionTable): Where the work done on each board is kept, None to only keep the last board
 
     """
-    def __init__(self):
+    def __init__(self, table=None):
         self.HORIZONTAL = 1
         self.VERTICAL = 2
+        self.table = table
         self.initialized = False
+        self._board = None
+        self._walkable = None
+        self._pockets = None
+        self._fields = {}
+        self._ideal_tiles = {}
+        self._last_field = None
 
     def initialize_map(self, game_state):
-        """Initializes the map
+        """Initializes the map, reusing the cached grids if the board has not changed since the last call
 
         Args:
             game_state: A GameState object representing the gamestate we want to traverse
         """
-        #Initialize map 
-        self.initialized = True
         self.game_state = game_state
-        self.game_map = [[Node() for x in range(self.game_state.ARENA_SIZE)] for y in range(self.game_state.ARENA_SIZE)]
+        game_map = game_state.game_map
+        self.initialize_grid(game_map.structure_grid, (game_map, game_map.version), game_map.zobrist)
+
+    def initialize_grid(self, structure_grid, board_key, zobrist=None):
+        """Initializes the map from a raw occupancy grid instead of a GameState, for example one being simulated
+
+        Args:
+            structure_grid: A flat grid indexed by x * ARENA_SIZE + y, non zero where a structure blocks the location
+            board_key: A value that changes whenever the grid contents change, the cache is kept while it stays equal
+            zobrist: The GameMap.zobrist hash of the grid, to look the board up in the transposition table
+        """
+        self.initialized = True
+        if self._board is not None and self._board == board_key:
+            return
+
+        self._board = board_key
+        self._last_field = None
+        entry = None
+        if self.table is not None and zobrist is not None:
+            entry = self.table.get(("path", zobrist))
+        if entry is not None:
+            self._walkable, self._pockets, self._fields, self._ideal_tiles = entry
+            return
+        self._walkable = bytes(in_bounds and not code for in_bounds, code in zip(IN_BOUNDS_MASK, structure_grid))
+        self._pockets = self._find_pockets(self._walkable)
+        self._fields = {}
+        self._ideal_tiles = {}
+        if self.table is not None and zobrist is not None:
+            # The dicts are filled in as paths are asked for, later lookups of the board see those too
+            self.table.put(("path", zobrist), (self._walkable, self._pockets, self._fields, self._ideal_tiles))
 
     def navigate_multiple_endpoints(self, start_point, end_points, game_state):
         """Finds the path a unit would take to reach a set of endpoints
@@ -67,59 +112,110 @@ class ShortestPathFinder:
         """
         if game_state.contains_stationary_unit(start_point):
             return
+        if not game_state.game_map.in_arena_bounds(start_point):
+            return [start_point]
 
-        #Initialize map 
         self.initialize_map(game_state)
-        #Fill in walls
-        for location in self.game_state.game_map:
-            if self.game_state.contains_stationary_unit(location):
-                self.game_map[location[0]][location[1]].blocked = True
-        #Do pathfinding
-        ideal_endpoints = self._idealness_search(start_point, end_points)
-        self._validate(ideal_endpoints, end_points)
-        return self._get_path(start_point, end_points)
+        return self.find_path(start_point, end_points)
+
+    def find_path(self, start_point, end_points):
+        """Finds the path a unit would take on the grid loaded by initialize_map or initialize_grid
+
+        Args:
+            * start_point: The starting location of the unit, an unblocked in bounds location
+            * end_points: The end points of the unit, should be a list of edge locations
+
+        Returns:
+            The path a unit at start_point would take when trying to reach end_points
+
+        """
+        field = self.get_distance_field(start_point, end_points)
+        return self._get_path(start_point, end_points, field)
+
+    def get_distance_field(self, start_point, end_points):
+        """Gets the validation distance field units starting at start_point follow.
+        initialize_map or initialize_grid must have been called for the current board.
+
+        Args:
+            * start_point: The starting location of the unit
+            * end_points: The end points of the unit, should be a list of edge locations
+
+        Returns:
+            A flat list indexed by x * ARENA_SIZE + y holding the remaining path length from each
+            location, or -1 for locations the unit can not reach. The list is shared, do not modify it.
+
+        """
+        ideal_tile = self._idealness_search(start_point, end_points)
+        if ideal_tile is None:
+            key = tuple(map(tuple, end_points))
+        else:
+            key = ideal_tile
+        field = self._fields.get(key)
+        if field is None:
+            field = self._validate(ideal_tile, end_points)
+            self._fields[key] = field
+        self._last_field = field
+        return field
+
+    def _find_pockets(self, walkable):
+        """Labels every walkable location with the id of the 'pocket' of connected pathable space it belongs to.
+        Unwalkable locations are labeled -1.
+        """
+        pockets = [-1] * len(walkable)
+        pocket_id = 0
+        for origin in range(len(walkable)):
+            if not walkable[origin] or pockets[origin] != -1:
+                continue
+            pockets[origin] = pocket_id
+            current = [origin]
+            for index in current:
+                for neighbor in NEIGHBORS[index]:
+                    if walkable[neighbor] and pockets[neighbor] == -1:
+                        pockets[neighbor] = pocket_id
+                        current.append(neighbor)
+            pocket_id += 1
+        return pockets
 
     def _idealness_search(self, start, end_points):
         """
-        Finds the most ideal tile in our 'pocket' of pathable space. 
+        Finds the most ideal tile in our 'pocket' of pathable space.
         The edge if it is available, or the best self destruct location otherwise
+
+        Returns:
+            None if the pocket reaches one of the end_points, otherwise the flat index of the best self destruct location
         """
-        current = queue.Queue()
-        current.put(start)
-        best_idealness = self._get_idealness(start, end_points)
-        self.game_map[start[0]][start[1]].visited_idealness = True
-        most_ideal = start
-
-        while not current.empty():
-            search_location = current.get()
-            for neighbor in self._get_neighbors(search_location):
-                if not self.game_state.game_map.in_arena_bounds(neighbor) or self.game_map[neighbor[0]][neighbor[1]].blocked:
+        x, y = map(int, start)
+        pocket = self._pockets[x * ARENA_SIZE + y]
+        direction = tuple(self._get_direction_from_endpoints(end_points))
+        key = (pocket, direction, tuple(map(tuple, end_points)))
+        if key in self._ideal_tiles:
+            return self._ideal_tiles[key]
+
+        reaches_edge = False
+        for end_x, end_y in end_points:
+            if self._pockets[end_x * ARENA_SIZE + end_y] == pocket:
+                reaches_edge = True
+                break
+
+        most_ideal = None
+        if not reaches_edge:
+            best_idealness = -1
+            for index, location_pocket in enumerate(self._pockets):
+                if location_pocket != pocket:
                     continue
-
-                x, y = neighbor
-                current_idealness = self._get_idealness(neighbor, end_points)
-
+                current_idealness = self._get_idealness(divmod(index, ARENA_SIZE), direction)
                 if current_idealness > best_idealness:
                     best_idealness = current_idealness
-                    most_ideal = neighbor
-
-                if not self.game_map[x][y].visited_idealness and not self.game_map[x][y].blocked:
-                    self.game_map[x][y].visited_idealness = True
-                    current.put(neighbor)
+                    most_ideal = index
 
+        self._ideal_tiles[key] = most_ideal
         return most_ideal
 
-    def _get_neighbors(self, location):
-        """Get the locations adjacent to a location
-        """
-        x, y = location
-        return [[x, y + 1], [x, y - 1], [x + 1, y], [x - 1, y]]
-
     def _get_direction_from_endpoints(self, end_points):
         """Prints a message to the games debug output
 
         Args:
-            * end_points: A set of endpoints, should be an edge 
+            * end_points: A set of endpoints, should be an edge
 
         Returns:
             A direction [x,y] representing the edge. For example, [1,1] for the top right and [-1, 1] for the top left
@@ -128,85 +224,69 @@ class ShortestPathFinder:
         point = end_points[0]
         x, y = point
         direction = [1, 1]
-        if x < self.game_state.HALF_ARENA:
+        if x < ARENA_SIZE // 2:
            direction[0] = -1
-        if y < self.game_state.HALF_ARENA:
+        if y < ARENA_SIZE // 2:
             direction[1] = -1
         return direction
 
-    def _get_idealness(self, location, end_points):
+    def _get_idealness(self, location, direction):
         """Get the idealness of a tile, the reachable tile the unit most wants to path to.
-        Better self destruct locations are more ideal. The endpoints are perfectly ideal. 
+        Better self destruct locations are more ideal. Endpoints are handled by _idealness_search.
 
         Returns:
-            A location the unit will attempt to reach
+            The idealness of the location when moving in the given direction
         """
-        if location in end_points:
-            return sys.maxsize
-
-        direction = self._get_direction_from_endpoints(end_points)
-
         idealness = 0
         if direction[1] == 1:
             idealness += 28 * location[1]
-        else: 
+        else:
             idealness += 28 * (27 - location[1])
         if direction[0] == 1:
             idealness += location[0]
-        else: 
+        else:
             idealness += (27 - location[0])
 
         return idealness
 
     def _validate(self, ideal_tile, end_points):
-        """Breadth first search of the grid, setting the pathlengths of each node
+        """Breadth first search of the grid, building the pathlength of each location
 
         """
-        #VALIDATION
-        #Add our most ideal tiles to current
-        current = queue.Queue()
-        if ideal_tile in end_points:
-            for location in end_points:
-               current.put(location)
-               #Set current pathlength to 0
-               self.game_map[location[0]][location[1]].pathlength = 0
-               self.game_map[location[0]][location[1]].visited_validate = True
+        walkable = self._walkable
+        field = [-1] * len(walkable)
+        current = deque()
+        if ideal_tile is None:
+            for x, y in end_points:
+                index = x * ARENA_SIZE + y
+                current.append(index)
+                field[index] = 0
         else:
-            current.put(ideal_tile)
-            self.game_map[ideal_tile[0]][ideal_tile[1]].pathlength = 0
-            self.game_map[ideal_tile[0]][ideal_tile[1]].visited_validate = True
-
-        #While current is not empty
-        while not current.empty():
-            current_location = current.get()
-            current_node = self.game_map[current_location[0]][current_location[1]]
-            for neighbor in self._get_neighbors(current_location):
-                if not self.game_state.game_map.in_arena_bounds(neighbor) or self.game_map[neighbor[0]][neighbor[1]].blocked:
-                    continue
-
-                neighbor_node = self.game_map[neighbor[0]][neighbor[1]]
-                if not neighbor_node.visited_validate and not current_node.blocked:
-                    neighbor_node.pathlength = current_node.pathlength + 1
-                    neighbor_node.visited_validate = True
-                    current.put(neighbor)
-
-        #debug_write("Print after validate")
-        #self.print_map()
-        return
+            current.append(ideal_tile)
+            field[ideal_tile] = 0
 
-    def _get_path(self, start_point, end_points):
+        while current:
+            index = current.popleft()
+            # Blocked endpoints are targets but units can not path through them
+            if not walkable[index]:
+                continue
+            next_pathlength = field[index] + 1
+            for neighbor in NEIGHBORS[index]:
+                if walkable[neighbor] and field[neighbor] == -1:
+                    field[neighbor] = next_pathlength
+                    current.append(neighbor)
+        return field
+
+    def _get_path(self, start_point, end_points, field):
         """Once all nodes are validated, and a target is found, the unit can path to its target
 
         """
-        #GET THE PATH
         path = [start_point]
-        current = start_point
+        current = list(map(int, start_point))
         move_direction = 0
 
-        while not self.game_map[current[0]][current[1]].pathlength == 0:
-            #debug_write("current tile {} has cost {}".format(current, self.game_map[current[0]][current[1]].pathlength))
-            next_move = self._choose_next_move(current, move_direction, end_points)
-            #debug_write(next_move)
+        while not field[current[0] * ARENA_SIZE + current[1]] == 0:
+            next_move = self._choose_next_move(current, move_direction, end_points, field)
 
             if current[0] == next_move[0]:
                 move_direction = self.VERTICAL
@@ -214,34 +294,29 @@ class ShortestPathFinder:
                 move_direction = self.HORIZONTAL
             path.append(next_move)
             current = next_move
-        
-        #debug_write(path)
+
         return path
-  
-    def _choose_next_move(self, current_point, previous_move_direction, end_points):
+
+    def _choose_next_move(self, current_point, previous_move_direction, end_points, field):
         """Given the current location and adjacent locations, return the best 'next step' for a given unit to take
         """
-        neighbors = self._get_neighbors(current_point)
-        #debug_write("Unit at {} previously moved {} and has these neighbors {}".format(current_point, previous_move_direction, neighbors))
-
+        walkable = self._walkable
         ideal_neighbor = current_point
-        best_pathlength = self.game_map[current_point[0]][current_point[1]].pathlength
-        for neighbor in neighbors:
-            #debug_write("Comparing champ {} and contender {}".format(ideal_neighbor, neighbor))
-            if not self.game_state.game_map.in_arena_bounds(neighbor) or self.game_map[neighbor[0]][neighbor[1]].blocked:
+        best_pathlength = field[current_point[0] * ARENA_SIZE + current_point[1]]
+        for neighbor_index in NEIGHBORS[current_point[0] * ARENA_SIZE + current_point[1]]:
+            if not walkable[neighbor_index]:
                 continue
 
             new_best = False
-            x, y = neighbor
-            current_pathlength = self.game_map[x][y].pathlength
+            current_pathlength = field[neighbor_index]
 
             #Filter by pathlength
             if current_pathlength > best_pathlength:
                 continue
             elif current_pathlength < best_pathlength:
-                #debug_write("Contender has better pathlength at {} vs champs {}".format(current_pathlength, best_pathlength))
                 new_best = True
 
+            neighbor = list(divmod(neighbor_index, ARENA_SIZE))
             #Filter by direction based on prev move
             if not new_best and not self._better_direction(current_point, neighbor, ideal_neighbor, previous_move_direction, end_points):
                 continue
@@ -249,7 +324,6 @@ class ShortestPathFinder:
             ideal_neighbor = neighbor
             best_pathlength = current_pathlength
 
-        #debug_write("Gave unit at {} new tile {}".format(current_point, ideal_neighbor))
         return ideal_neighbor
 
     def _better_direction(self, prev_tile, new_tile, prev_best, previous_move_direction, end_points):
@@ -261,26 +335,25 @@ class ShortestPathFinder:
         if previous_move_direction == self.HORIZONTAL and not new_tile[0] == prev_best[0]:
             #We want to go up now. If we have not changed our y, we are not going up
             if prev_tile[1] == new_tile[1]:
-                return False 
+                return False
             return True
         if previous_move_direction == self.VERTICAL and not new_tile[1] == prev_best[1]:
             if prev_tile[0] == new_tile[0]:
-                #debug_write("contender {} has the same x coord as prev tile {} so we will keep best move {}".format(new_tile, prev_tile, prev_best))
                 return False
             return True
-        if previous_move_direction == 0: 
-            if prev_tile[1] == new_tile[1]: 
+        if previous_move_direction == 0:
+            if prev_tile[1] == new_tile[1]:
                 return False
             return True
-        
-        #To make it here, both moves are on the same axis 
+
+        #To make it here, both moves are on the same axis
         direction = self._get_direction_from_endpoints(end_points)
         if new_tile[1] == prev_best[1]: #If they both moved horizontal...
             if direction[0] == 1 and new_tile[0] > prev_best[0]: #If we moved right and right is our direction, we moved towards our direction
-                return True 
+                return True
             if direction[0] == -1 and new_tile[0] < prev_best[0]: #If we moved left and left is our direction, we moved towards our direction
-                return True 
-            return False 
+                return True
+            return False
         if new_tile[0] == prev_best[0]: #If they both moved vertical...
             if direction[1] == 1 and new_tile[1] > prev_best[1]: #If we moved up and up is our direction, we moved towards our direction
                 return True
@@ -290,18 +363,19 @@ class ShortestPathFinder:
         return True
 
     def print_map(self):
-        """Prints an ASCII version of the current game map for debug purposes
+        """Prints an ASCII version of the distance field of the last path for debug purposes
 
         """
-        if not self.initialized:
-            debug_write("Attempted to print_map before pathfinder initialization. Use 'this_object.initialize_map(game_state)' to initialize the map first")
+        if not self.initialized or self._last_field is None:
+            debug_write("Attempted to print_map before pathfinding. Use 'this_object.navigate_multiple_endpoints(start_point, end_points, game_state)' to find a path first")
             return
 
         for y in range(28):
             for x in range(28):
-                node = self.game_map[x][28 - y - 1]
-                if not node.blocked and not node.pathlength == -1:
-                    self._print_justified(node.pathlength)
+                index = x * ARENA_SIZE + (28 - y - 1)
+                pathlength = self._last_field[index]
+                if self._walkable[index] and not pathlength == -1:
+                    self._print_justified(pathlength)
                 else:
                     sys.stderr.write("   ")
             debug_write("")
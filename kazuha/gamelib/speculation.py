@@ -0,0 +1,133 @@
+import threading
+from .util import debug_write
+
+
+class SpeculationWorker:
+    """Runs a function on the newest action frame in a background thread.
+
+    While the engine plays out the action phase, the algo only reads frames from stdin. The worker
+    uses that idle time: every frame handed to submit replaces the previous pending one, and the
+    thread runs the function on the newest frame whenever it is free. After the last frame of the
+    action phase it is therefore working on the board the next turn starts from.
+
+    When the next turn starts, finish_turn marks the last submitted frame as the final board. That frame
+    is still run if the worker was busy, and latest(final=True) only returns its result. A run on an
+    older frame can not be interrupted, but the function can check superseded() and return early.
+
+    Reading stdin releases the GIL, so the read loop keeps draining frames while the worker runs.
+    AlgoCore.enable_speculation sets one up that calls AlgoCore.speculate.
+
+    Attributes :
+        * function (function): Called with (frame_string, turn_number), its return value is kept as the result
+        * running (bool): True until stop is called
+
+    """
+    def __init__(self, function):
+        """Starts the worker thread
+
+        Args:
+            function: Called with (frame_string, turn_number) for the newest submitted frame
+
+        """
+        self.function = function
+        self.running = True
+        self.__condition = threading.Condition()
+        self.__pending = None
+        self.__submitted = None     # (turn_number, frame_number) of the newest submitted frame
+        self.__current = None       # (turn_number, frame_number) of the frame being run
+        self.__final = None         # (turn_number, frame_number) of the frame the current turn starts from
+        self.__result = None
+        self.__thread = threading.Thread(target=self.__run, name="speculation", daemon=True)
+        self.__thread.start()
+
+    def submit(self, frame_string, turn_number, frame_number=None):
+        """Queues a frame, replacing any frame that has not been started yet. Never blocks.
+
+        Args:
+            frame_string: The action frame, as received from the engine
+            turn_number: The turn the frame belongs to
+            frame_number: The number of the frame in the action phase
+
+        """
+        with self.__condition:
+            self.__pending = (frame_string, turn_number, frame_number)
+            self.__submitted = (turn_number, frame_number)
+            self.__condition.notify()
+
+    def finish_turn(self):
+        """Marks the newest submitted frame as the final board of the action phase, call it when your turn begins.
+        The frame is kept, so it is still run if the worker is busy with an earlier one.
+        """
+        with self.__condition:
+            self.__final = self.__submitted
+
+    def cancel(self):
+        """Drops the pending frame so no new work starts, and marks the run in progress as superseded
+        """
+        with self.__condition:
+            self.__pending = None
+            self.__submitted = None
+
+    def superseded(self):
+        """Checks if the run in progress is no longer useful, because a newer frame was submitted or it was cancelled.
+        Call it from the function to stop long work early.
+
+        Returns:
+            True if the frame being run is not the newest submitted frame
+
+        """
+        with self.__condition:
+            return self.__current != self.__submitted
+
+    def latest(self, timeout=0, final=False):
+        """Gets the result of the newest finished run
+
+        Args:
+            timeout: Seconds to wait for a run in progress, or a submitted frame, to finish before returning
+            final: If True, only return the result of the final board marked by finish_turn, waiting for it up to timeout
+
+        Returns:
+            (turn_number, frame_number, result) for the newest finished run, or None if no run finished yet,
+            or if final is True and the final board has not been run
+
+        """
+        with self.__condition:
+            if final:
+                if self.__final is None:
+                    return None
+                if timeout > 0:
+                    self.__condition.wait_for(lambda: self.__result is not None and self.__result[:2] == self.__final, timeout)
+                if self.__result is None or self.__result[:2] != self.__final:
+                    return None
+            elif timeout > 0:
+                self.__condition.wait_for(lambda: self.__current is None and self.__pending is None, timeout)
+            return self.__result
+
+    def stop(self):
+        """Stops the worker thread once its current run finishes
+        """
+        with self.__condition:
+            self.running = False
+            self.__pending = None
+            self.__submitted = None
+            self.__condition.notify_all()
+
+    def __run(self):
+        while True:
+            with self.__condition:
+                self.__condition.wait_for(lambda: self.__pending is not None or not self.running)
+                if not self.running:
+                    return
+                frame_string, turn_number, frame_number = self.__pending
+                self.__pending = None
+                self.__current = (turn_number, frame_number)
+            result = None
+            try:
+                result = (turn_number, frame_number, self.function(frame_string, turn_number))
+            except Exception as exception:
+                debug_write("Speculation on turn {} failed: {}".format(turn_number, exception))
+            with self.__condition:
+                if result is not None:
+                    self.__result = result
+                self.__current = None
+                self.__condition.notify_all()
@@ -0,0 +1,157 @@
+from .util import debug_write
+
+
+class ThreatMap:
+    """Holds the damage per frame structures deal to mobile units of one player on every location.
+
+    The map is built from the occupancy grid of a GameMap. It remembers the grid it was built from
+    and, when asked to sync, only re-applies the locations whose structures were spawned, removed or
+    upgraded since, so planning code can keep using it while placing hypothetical structures.
+    Use GameState.get_threat_map to get a map that is kept up to date for you.
+    Given a TranspositionTable, the damage of every board it syncs to is kept there under the board's
+    zobrist hash, so a board seen before, on an earlier turn or before a rollback, is not recomputed.
+
+    Attributes :
+        * player_index (int): The player whose mobile units are threatened, 0 for you 1 for the enemy
+        * damage (list): Flat list indexed by x * ARENA_SIZE + y of the damage per frame dealt on each location
+        * table (:obj: TranspositionTable): Where the damage of each board is kept, None to not keep it
+
+    """
+    def __init__(self, game_map, player_index, table=None):
+        """Builds the threat map for the given player
+
+        Args:
+            game_map: The GameMap to read structures from
+            player_index: The player whose mobile units are threatened, 0 for you 1 for the enemy
+            table: A TranspositionTable to keep the damage of each board in
+
+        """
+        self.game_map = game_map
+        self.player_index = player_index
+        self.table = table
+        self.ARENA_SIZE = game_map.ARENA_SIZE
+        self.damage = [0.0] * (self.ARENA_SIZE * self.ARENA_SIZE)
+        self.__attack_stats = {}
+        self.__structures = bytearray(len(self.damage))
+        self.__owners = bytearray(len(self.damage))
+        self.__upgraded = bytearray(len(self.damage))
+        self.version = None
+        self.sync()
+
+    def copy(self, game_map):
+        """Copies the threat map for a copy of its GameMap, see GameMap.copy
+
+        Args:
+            game_map: The GameMap the copy reads structures from
+
+        Returns:
+            A ThreatMap equal to this one, synced against game_map from now on
+
+        """
+        copied = ThreatMap.__new__(ThreatMap)
+        copied.__dict__.update(self.__dict__)
+        copied.game_map = game_map
+        copied.damage = list(self.damage)
+        copied.__structures = bytearray(self.__structures)
+        copied.__owners = bytearray(self.__owners)
+        copied.__upgraded = bytearray(self.__upgraded)
+        copied.version = None
+        return copied
+
+    def __get_attack_stats(self, code, upgraded):
+        """The damage to mobile units and attack range of a structure type code from the occupancy grid
+        """
+        key = (code, upgraded)
+        if key not in self.__attack_stats:
+            type_config = self.game_map.config["unitInformation"][code - 1]
+            damage = type_config.get("attackDamageWalker", 0)
+            attack_range = type_config.get("attackRange", 0)
+            if upgraded:
+                upgrade_config = type_config.get("upgrade", {})
+                damage = upgrade_config.get("attackDamageWalker", damage)
+                attack_range = upgrade_config.get("attackRange", attack_range)
+            self.__attack_stats[key] = (damage, attack_range)
+        return self.__attack_stats[key]
+
+    def __apply(self, index, sign):
+        """Adds (sign 1) or subtracts (sign -1) the threat of the structure recorded at index
+        """
+        code = self.__structures[index]
+        if not code or self.__owners[index] == self.player_index:
+            return
+        damage, attack_range = self.__get_attack_stats(code, self.__upgraded[index])
+        if damage <= 0:
+            return
+        x, y = divmod(index, self.ARENA_SIZE)
+        for target in self.game_map.get_indices_in_range([x, y], attack_range):
+            tx, ty = divmod(target, self.ARENA_SIZE)
+            if (tx - x) ** 2 + (ty - y) ** 2 <= attack_range ** 2:
+                self.damage[target] += sign * damage
+
+    def sync(self):
+        """Brings the threat map up to date with the GameMap, only recomputing changed locations
+        """
+        game_map = self.game_map
+        if self.version == game_map.version:
+            return
+        key = ("threat", self.player_index, game_map.zobrist)
+        damage = self.table.get(key) if self.table is not None else None
+        if damage is not None:
+            self.damage[:] = damage
+            self.__structures[:] = game_map.structure_grid
+            self.__owners[:] = game_map.owner_grid
+            self.__upgraded[:] = game_map.upgraded_grid
+            self.version = game_map.version
+            return
+        size = self.ARENA_SIZE
+        for column in range(0, size * size, size):
+            end = column + size
+            if (self.__structures[column:end] == game_map.structure_grid[column:end] and
+                    self.__owners[column:end] == game_map.owner_grid[column:end] and
+                    self.__upgraded[column:end] == game_map.upgraded_grid[column:end]):
+                continue
+            for index in range(column, end):
+                if (self.__structures[index] == game_map.structure_grid[index] and
+                        self.__owners[index] == game_map.owner_grid[index] and
+                        self.__upgraded[index] == game_map.upgraded_grid[index]):
+                    continue
+                self.__apply(index, -1)
+                self.__structures[index] = game_map.structure_grid[index]
+                self.__owners[index] = game_map.owner_grid[index]
+                self.__upgraded[index] = game_map.upgraded_grid[index]
+                self.__apply(index, 1)
+        self.version = game_map.version
+        if self.table is not None:
+            self.table.put(key, list(self.damage))
+
+    def damage_at(self, location):
+        """Gets the damage per frame a mobile unit of player_index takes at a location
+
+        Args:
+            location: A map location
+
+        Returns:
+            The total damage per frame of every enemy structure in range of the location
+
+        """
+        x, y = location
+        if not self.game_map.in_arena_bounds(location):
+            debug_write("Location {} is not in the arena bounds.".format(location))
+            return 0
+        return self.damage[int(x) * self.ARENA_SIZE + int(y)]
+
+    def path_damage(self, path):
+        """Gets the damage per frame summed over every location of a path
+
+        Args:
+            path: A list of locations, such as the result of GameState.find_path_to_edge
+
+        Returns:
+            The sum of the damage per frame on each location of the path, 0 for an empty or missing path
+
+        """
+        if not path:
+            return 0
+        damage = self.damage
+        size = self.ARENA_SIZE
+        return sum(damage[x * size + y] for x, y in path)
@@ -0,0 +1,439 @@
+import math
+from .navigation import ShortestPathFinder
+from .unit import GameUnit
+from .util import debug_write
+
+
+class SimulationResult:
+    """Holds the outcome of a simulated action phase. Every per player list is indexed by player index.
+
+    Attributes :
+        * frames (int): The number of frames simulated
+        * breaches (list): For each player, the locations where their units scored
+        * health_lost (list): For each player, the health they lost to enemy breaches
+        * sp_gained (list): For each player, the SP they earned by scoring
+        * structure_damage (list): For each player, the damage their units dealt to enemy structures
+        * destroyed_structures (list): For each player, the [x, y] locations of their structures that were destroyed
+        * self_destructs (list): For each player, the locations where their units self destructed
+        * surviving_units (list): For each player, the number of mobile units still alive when the simulation stopped
+
+    """
+    def __init__(self):
+        self.frames = 0
+        self.breaches = [[], []]
+        self.health_lost = [0, 0]
+        self.sp_gained = [0, 0]
+        self.structure_damage = [0, 0]
+        self.destroyed_structures = [[], []]
+        self.self_destructs = [[], []]
+        self.surviving_units = [0, 0]
+
+    def __str__(self):
+        return "Simulated {} frames, breaches: {}, health lost: {}, destroyed structures: {}".format(
+            self.frames, [len(b) for b in self.breaches], self.health_lost, [len(d) for d in self.destroyed_structures])
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class ActionSimulator:
+    """Fast-forwards the action phase of a turn, frame by frame.
+
+    The simulator copies the structures and mobile units of a GameState into flat per location
+    and per unit lists, so it never touches the GameState or its GameMap while running. Mobile
+    units already on the map, such as those added by attempt_spawn, are simulated, and more can
+    be added with add_unit (for example the units you expect your opponent to deploy).
+
+    Each frame follows the order of the game engine:
+        1. Supports shield friendly mobile units in range, once per support and unit
+        2. Mobile units move along their path, score on their target edge or self destruct
+        3. Every unit attacks the target chosen with the same priorities as GameState.get_target
+        4. Units and structures with no health left are removed, and units re-path if a structure died
+
+    This is a close model of the engine rather than an exact one, use it to compare candidate attacks.
+
+    Attributes :
+        * frame (int): The current frame of the simulation
+        * result (:obj: SimulationResult): The outcome so far
+        * events (dict): When recording events, the breach, death and selfDestruct events of the last frame in the
+          format of the engine's action frames, with player 1 being player index 0. None otherwise
+
+    """
+    EVENT_TYPES = ["selfDestruct", "breach", "damage", "shield", "move", "spawn", "death", "attack", "melee"]
+
+    def __init__(self, game_state, record_events=False):
+        """Loads the board of a game state
+
+        Args:
+            game_state: The GameState to simulate the action phase of
+            record_events: If True, the events of each frame are kept in self.events.
+                Mobile units are identified by their index in the simulator, structures by their flat location index
+
+        """
+        self.config = game_state.config
+        self.record_events = record_events
+        self.events = None
+        self.ARENA_SIZE = game_state.ARENA_SIZE
+        self.HALF_ARENA = game_state.HALF_ARENA
+        self.game_map = game_state.game_map
+        self.frame = 0
+        self.result = SimulationResult()
+        self.__get_hit_radius = self.config["unitInformation"][0].get("getHitRadius", 0)
+        self.__shorthands = [unit_information.get("shorthand") for unit_information in self.config["unitInformation"]]
+        self.__stats = {}
+        self.__edges = self.game_map.get_edges()
+        self.__edge_indices = [frozenset(x * self.ARENA_SIZE + y for x, y in edge) for edge in self.__edges]
+        self.__pathfinder = ShortestPathFinder()
+        self.__board_version = 0
+        self.__structure_candidates = {}
+        self.__paths = {}       # (flat location, target edge) -> path, for the current board version
+
+        # Structures, per flat location index
+        grid_size = self.ARENA_SIZE * self.ARENA_SIZE
+        self.structure_code = bytearray(self.game_map.structure_grid)
+        self.structure_owner = bytearray(self.game_map.owner_grid)
+        self.structure_upgraded = bytearray(self.game_map.upgraded_grid)
+        self.structure_health = list(self.game_map.health_grid)
+        self.__structure_indices = [index for index in range(grid_size) if self.structure_code[index]]
+        self.__structure_stats_at = {index: self.__get_stats(self.structure_code[index] - 1, self.structure_upgraded[index] == 1)
+                                     for index in self.__structure_indices}
+        self.__support_indices = [index for index in self.__structure_indices
+                                  if self.__structure_stats_at[index].shieldPerUnit > 0 and self.__structure_stats_at[index].shieldRange > 0]
+
+        # Mobile units, one entry per unit in each list
+        self.unit_type = []
+        self.unit_player = []
+        self.unit_x = []
+        self.unit_y = []
+        self.unit_health = []
+        self.unit_frames_per_move = []
+        self.unit_steps = []
+        self.unit_target_edge = []
+        self.unit_path = []
+        self.unit_path_position = []
+        self.unit_path_version = []
+        self.unit_shielded_by = []
+        self.unit_alive = []
+        self.__unit_stats = []
+
+        for index in range(grid_size):
+            x, y = divmod(index, self.ARENA_SIZE)
+            if not self.game_map.in_arena_bounds([x, y]):
+                continue
+            for unit in self.game_map.get_units_at_index(index):
+                if not unit.stationary:
+                    self.add_unit(unit.unit_type, [x, y], 1, unit.player_index, unit.health)
+
+    def __get_stats(self, type_index, upgraded=False):
+        """A GameUnit holding the stats of a unit type, shared by every unit of that type
+        """
+        key = (type_index, upgraded)
+        if key not in self.__stats:
+            unit = GameUnit(self.__shorthands[type_index], self.config)
+            if upgraded:
+                unit.upgrade()
+            self.__stats[key] = unit
+        return self.__stats[key]
+
+    def add_unit(self, unit_type, location, num=1, player_index=0, health=None):
+        """Adds mobile units to the simulation
+
+        Args:
+            unit_type: The type of the units, SCOUT, DEMOLISHER or INTERCEPTOR
+            location: The location the units start at
+            num: The number of units to add
+            player_index: The player controlling the units, 0 for you 1 for the enemy
+            health: The starting health of each unit, the unit type's starting health if None
+
+        """
+        if unit_type not in self.__shorthands:
+            debug_write("Invalid unit {} passed to the simulator".format(unit_type))
+            return
+        type_index = self.__shorthands.index(unit_type)
+        stats = self.__get_stats(type_index)
+        if stats.stationary:
+            debug_write("Only mobile units can be added to the simulator, got {}".format(unit_type))
+            return
+        x, y = map(int, location)
+        frames_per_move = max(1, int(round(1 / stats.speed))) if stats.speed > 0 else 0
+        for _ in range(num):
+            self.unit_type.append(type_index)
+            self.unit_player.append(player_index)
+            self.unit_x.append(x)
+            self.unit_y.append(y)
+            self.unit_health.append(stats.max_health if health is None else health)
+            self.unit_frames_per_move.append(frames_per_move)
+            self.unit_steps.append(0)
+            self.unit_target_edge.append(self.__target_edge(x, y))
+            self.unit_path.append(None)
+            self.unit_path_position.append(0)
+            self.unit_path_version.append(-1)
+            self.unit_shielded_by.append(set())
+            self.unit_alive.append(True)
+            self.__unit_stats.append(stats)
+
+    def __target_edge(self, x, y):
+        left = x < self.HALF_ARENA
+        bottom = y < self.HALF_ARENA
+        if left and bottom:
+            return self.game_map.TOP_RIGHT
+        elif left:
+            return self.game_map.BOTTOM_RIGHT
+        elif bottom:
+            return self.game_map.TOP_LEFT
+        return self.game_map.BOTTOM_LEFT
+
+    def run(self, max_frames=500):
+        """Simulates frames until no mobile units are left, or max_frames is reached
+
+        Args:
+            max_frames: The maximum number of frames to simulate
+
+        Returns:
+            The SimulationResult of the action phase
+
+        """
+        while self.frame < max_frames and any(self.unit_alive):
+            self.step()
+        for unit_id, alive in enumerate(self.unit_alive):
+            if alive:
+                self.result.surviving_units[self.unit_player[unit_id]] += 1
+        return self.result
+
+    def step(self):
+        """Simulates a single frame
+        """
+        self.frame += 1
+        self.result.frames = self.frame
+        if self.record_events:
+            self.events = {event_type: [] for event_type in self.EVENT_TYPES}
+        self.__shield()
+        self.__move()
+        self.__attack()
+        self.__remove_dead()
+
+    def __in_range(self, dx, dy, attack_range):
+        return math.sqrt(dx ** 2 + dy ** 2) < attack_range + self.__get_hit_radius
+
+    def __shield(self):
+        cells = None
+        for index in self.__support_indices:
+            if not self.structure_code[index]:
+                continue
+            owner = self.structure_owner[index]
+            if cells is None:
+                cells = self.__mobile_cells()
+            if not cells[owner]:
+                continue
+            stats = self.__structure_stats_at[index]
+            x, y = divmod(index, self.ARENA_SIZE)
+            forward = y if owner == 0 else self.ARENA_SIZE - 1 - y
+            amount = stats.shieldPerUnit + stats.shieldBonusPerY * forward
+            for target in self.game_map.get_indices_in_range([x, y], stats.shieldRange):
+                for unit_id in cells[owner].get(target, ()):
+                    shielded_by = self.unit_shielded_by[unit_id]
+                    if index not in shielded_by:
+                        self.unit_health[unit_id] += amount
+                        shielded_by.add(index)
+
+    def __move(self):
+        for unit_id, alive in enumerate(self.unit_alive):
+            frames_per_move = self.unit_frames_per_move[unit_id]
+            if not alive or not frames_per_move or self.frame % frames_per_move:
+                continue
+            path = self.__get_path(unit_id)
+            position = self.unit_path_position[unit_id]
+            if path is None or position + 1 >= len(path):
+                self.__self_destruct(unit_id)
+                continue
+            x, y = path[position + 1]
+            self.unit_x[unit_id] = x
+            self.unit_y[unit_id] = y
+            self.unit_path_position[unit_id] = position + 1
+            self.unit_steps[unit_id] += 1
+            if x * self.ARENA_SIZE + y in self.__edge_indices[self.unit_target_edge[unit_id]]:
+                self.__breach(unit_id)
+
+    def __get_path(self, unit_id):
+        """The path of a unit, recomputed from its current location after a structure was destroyed.
+        Units on the same location heading for the same edge share a path until the board changes again
+        """
+        if self.unit_path_version[unit_id] != self.__board_version:
+            x, y = self.unit_x[unit_id], self.unit_y[unit_id]
+            key = (x * self.ARENA_SIZE + y, self.unit_target_edge[unit_id])
+            if key in self.__paths:
+                path = self.__paths[key]
+            else:
+                self.__pathfinder.initialize_grid(self.structure_code, (self, self.__board_version))
+                if self.structure_code[key[0]]:
+                    path = None
+                else:
+                    path = self.__pathfinder.find_path([x, y], self.__edges[key[1]])
+                self.__paths[key] = path
+            self.unit_path[unit_id] = path
+            self.unit_path_position[unit_id] = 0
+            self.unit_path_version[unit_id] = self.__board_version
+        return self.unit_path[unit_id]
+
+    def __breach(self, unit_id):
+        player = self.unit_player[unit_id]
+        damage = self.config["unitInformation"][self.unit_type[unit_id]].get("playerBreachDamage", 1)
+        self.result.breaches[player].append([self.unit_x[unit_id], self.unit_y[unit_id]])
+        self.result.health_lost[1 - player] += damage
+        self.result.sp_gained[player] += damage * self.config["resources"].get("coresForPlayerDamage", 0)
+        self.unit_alive[unit_id] = False
+        if self.events is not None:
+            self.events["breach"].append([[self.unit_x[unit_id], self.unit_y[unit_id]], damage, self.unit_type[unit_id], str(unit_id), player + 1])
+
+    def __self_destruct(self, unit_id):
+        player = self.unit_player[unit_id]
+        x, y = self.unit_x[unit_id], self.unit_y[unit_id]
+        self.unit_alive[unit_id] = False
+        self.result.self_destructs[player].append([x, y])
+        type_config = self.config["unitInformation"][self.unit_type[unit_id]]
+        if self.events is not None:
+            self.events["death"].append([[x, y], self.unit_type[unit_id], str(unit_id), player + 1, False])
+        if self.unit_steps[unit_id] < type_config.get("selfDestructStepsRequired", 5):
+            return
+        if self.events is not None:
+            self.events["selfDestruct"].append([[x, y], [], type_config.get("selfDestructDamageTower", 0), self.unit_type[unit_id], str(unit_id), player + 1])
+        explosion_range = type_config.get("selfDestructRange", 0)
+        for index in self.game_map.get_indices_in_range([x, y], explosion_range):
+            if self.structure_code[index] and self.structure_owner[index] != player and self.structure_health[index] > 0:
+                damage = type_config.get("selfDestructDamageTower", 0)
+                self.structure_health[index] -= damage
+                self.result.structure_damage[player] += damage
+        walker_damage = type_config.get("selfDestructDamageWalker", 0)
+        for other_id, alive in enumerate(self.unit_alive):
+            if (alive and self.unit_player[other_id] != player and
+                    self.__in_range(self.unit_x[other_id] - x, self.unit_y[other_id] - y, explosion_range)):
+                self.unit_health[other_id] -= walker_damage
+
+    def __mobile_cells(self):
+        """For each player, a dict of flat location to the ids of the alive mobile units there
+        """
+        cells = [{}, {}]
+        size = self.ARENA_SIZE
+        for unit_id, alive in enumerate(self.unit_alive):
+            if alive:
+                index = self.unit_x[unit_id] * size + self.unit_y[unit_id]
+                cells[self.unit_player[unit_id]].setdefault(index, []).append(unit_id)
+        return cells
+
+    def __target_key(self, attacker_player, stationary, distance, health, x, y):
+        """Sort key matching the target priorities of GameState.get_target, lower is preferred
+        """
+        height = y if attacker_player == 0 else -y
+        return (1 if stationary else 0, distance, health, height, -abs(self.HALF_ARENA - 0.5 - x))
+
+    def __enemy_structures_in_range(self, x, y, player, attack_range):
+        """Enemy structure locations in range of a location, cached until a structure is destroyed
+        """
+        key = (x, y, player, attack_range)
+        candidates = self.__structure_candidates.get(key)
+        if candidates is None:
+            candidates = [index for index in self.game_map.get_indices_in_range([x, y], attack_range)
+                          if self.structure_code[index] and self.structure_owner[index] != player]
+            self.__structure_candidates[key] = candidates
+        return candidates
+
+    def __choose_target(self, player, x, y, stats, enemy_cells):
+        """Returns ('unit', unit_id), ('structure', index) or None for an attacker of player at x, y
+        """
+        best_key = None
+        target = None
+        if stats.damage_i > 0 and enemy_cells:
+            indices = self.game_map.get_indices_in_range([x, y], stats.attackRange)
+            if len(enemy_cells) < len(indices):
+                # Fewer occupied locations than locations in range, check the distance to each of them instead
+                size = self.ARENA_SIZE
+                reach = stats.attackRange + self.__get_hit_radius
+                in_range = [(index, unit_ids) for index, unit_ids in enemy_cells.items()
+                            if math.sqrt((index // size - x) ** 2 + (index % size - y) ** 2) < reach]
+            else:
+                in_range = [(index, enemy_cells[index]) for index in indices if index in enemy_cells]
+            for index, unit_ids in in_range:
+                tx, ty = divmod(index, self.ARENA_SIZE)
+                distance = math.sqrt((tx - x) ** 2 + (ty - y) ** 2)
+                for unit_id in unit_ids:
+                    health = self.unit_health[unit_id]
+                    if health <= 0:
+                        continue
+                    key = self.__target_key(player, False, distance, health, tx, ty)
+                    if best_key is None or key < best_key:
+                        best_key = key
+                        target = ('unit', unit_id)
+        if target is None and stats.damage_f > 0:
+            for index in self.__enemy_structures_in_range(x, y, player, stats.attackRange):
+                health = self.structure_health[index]
+                if health <= 0:
+                    continue
+                tx, ty = divmod(index, self.ARENA_SIZE)
+                key = self.__target_key(player, True, math.sqrt((tx - x) ** 2 + (ty - y) ** 2), health, tx, ty)
+                if best_key is None or key < best_key:
+                    best_key = key
+                    target = ('structure', index)
+        return target
+
+    def __deal_damage(self, player, stats, target):
+        kind, target_id = target
+        if kind == 'unit':
+            self.unit_health[target_id] -= stats.damage_i
+        else:
+            self.structure_health[target_id] -= stats.damage_f
+            self.result.structure_damage[player] += stats.damage_f
+
+    def __attack(self):
+        cells = self.__mobile_cells()
+        if not cells[0] and not cells[1]:
+            return
+        for index in self.__structure_indices:
+            if self.structure_health[index] <= 0:
+                continue
+            stats = self.__structure_stats_at[index]
+            player = self.structure_owner[index]
+            if stats.damage_i <= 0 or not cells[1 - player]:
+                continue
+            x, y = divmod(index, self.ARENA_SIZE)
+            target = self.__choose_target(player, x, y, stats, cells[1 - player])
+            if target is not None:
+                self.__deal_damage(player, stats, target)
+        # Targets only lose health during the attack step, so once an attacker finds nothing in range,
+        # neither will the other units of the same type and player stacked on its location
+        no_target = set()
+        for unit_id, alive in enumerate(self.unit_alive):
+            if not alive or self.unit_health[unit_id] <= 0:
+                continue
+            player = self.unit_player[unit_id]
+            key = (self.unit_x[unit_id], self.unit_y[unit_id], self.unit_type[unit_id], player)
+            if key in no_target:
+                continue
+            stats = self.__unit_stats[unit_id]
+            target = self.__choose_target(player, key[0], key[1], stats, cells[1 - player])
+            if target is None:
+                no_target.add(key)
+            else:
+                self.__deal_damage(player, stats, target)
+
+    def __remove_dead(self):
+        for unit_id, alive in enumerate(self.unit_alive):
+            if alive and self.unit_health[unit_id] <= 0:
+                self.unit_alive[unit_id] = False
+                if self.events is not None:
+                    self.events["death"].append([[self.unit_x[unit_id], self.unit_y[unit_id]], self.unit_type[unit_id],
+                                                 str(unit_id), self.unit_player[unit_id] + 1, False])
+        destroyed = [index for index in self.__structure_indices if self.structure_health[index] <= 0]
+        if not destroyed:
+            return
+        for index in destroyed:
+            self.result.destroyed_structures[self.structure_owner[index]].append(list(divmod(index, self.ARENA_SIZE)))
+            if self.events is not None:
+                self.events["death"].append([list(divmod(index, self.ARENA_SIZE)), self.structure_code[index] - 1,
+                                             str(index), self.structure_owner[index] + 1, False])
+            self.structure_code[index] = 0
+            self.structure_upgraded[index] = 0
+            self.structure_health[index] = 0
+        self.__structure_indices = [index for index in self.__structure_indices if self.structure_code[index]]
+        self.__structure_candidates = {}
+        self.__paths = {}
+        self.__board_version += 1
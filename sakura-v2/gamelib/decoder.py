@@ -0,0 +1,64 @@
+"""
+Decodes game state strings from the engine.
+
+orjson is used when it is installed, otherwise only the sections GameState needs are decoded with the
+standard library, skipping the events of the previous action phase.
+Run `python -m gamelib.benchmark replay_file [replay_file ...]` to measure the parse cost per turn on recorded games.
+"""
+
+import json
+from collections import namedtuple
+
+try:
+    import orjson
+    _fast_loads = orjson.loads
+except ImportError:
+    orjson = None
+    _fast_loads = None
+
+_decoder = json.JSONDecoder()
+
+DecodedState = namedtuple("DecodedState", ["turn_info", "p1_stats", "p2_stats", "p1_units", "p2_units"])
+
+BACKEND = "orjson" if _fast_loads is not None else "json"
+
+
+def loads(string):
+    """Parses a json string with the fastest available backend
+    """
+    if _fast_loads is not None:
+        return _fast_loads(string)
+    return json.loads(string)
+
+
+def _decode_section(state_string, key):
+    """Decodes the value of the first "key": in the string, or returns None if it is missing
+    """
+    index = state_string.find('"{}"'.format(key))
+    if index == -1:
+        return None
+    index = state_string.find(':', index) + 1
+    while state_string[index] in ' \t\r\n':
+        index += 1
+    return _decoder.raw_decode(state_string, index)[0]
+
+
+def decode_state(state_string):
+    """Decodes the sections of a game state string that GameState uses
+
+    Args:
+        state_string: A game state or action frame string from the engine
+
+    Returns:
+        A DecodedState of turnInfo, p1Stats, p2Stats, p1Units and p2Units
+
+    """
+    if _fast_loads is not None:
+        state = _fast_loads(state_string)
+        return DecodedState(state["turnInfo"], state["p1Stats"], state["p2Stats"], state["p1Units"], state["p2Units"])
+    return DecodedState(
+        _decode_section(state_string, "turnInfo"),
+        _decode_section(state_string, "p1Stats"),
+        _decode_section(state_string, "p2Stats"),
+        _decode_section(state_string, "p1Units"),
+        _decode_section(state_string, "p2Units"))
@@ -0,0 +1,125 @@
+import json
+
+_decoder = json.JSONDecoder()
+
+
+def scan_turn_info(state_string):
+    """Reads turnInfo from a game state string without parsing the rest of it
+
+    Args:
+        state_string: A game state or action frame string from the engine
+
+    Returns:
+        The turnInfo list of ints, [state type, turn number, action phase frame number, ...], or None if it is missing
+
+    """
+    start = state_string.find('"turnInfo"')
+    if start == -1:
+        return None
+    start = state_string.find('[', start)
+    end = state_string.find(']', start)
+    if start == -1 or end == -1:
+        return None
+    try:
+        return [int(float(value)) for value in state_string[start + 1:end].split(',')]
+    except ValueError:
+        return None
+
+
+class ActionFrame(str):
+    """An action frame string that decodes its sections only when they are asked for.
+
+    AlgoCore passes one to on_action_frame. It is still the frame string, so json.loads(frame) keeps
+    working, but reading frame.turn_info or frame.event("breach") only decodes that part of the frame.
+
+    Attributes :
+        * turn_info (list): The turnInfo of the frame, read without parsing the rest of it
+        * turn_number (int): The turn the frame belongs to
+        * frame_number (int): The index of the frame within the action phase
+
+    """
+    EVENT_TYPES = ["selfDestruct", "breach", "damage", "shield", "move", "spawn", "death", "attack", "melee"]
+
+    def __new__(cls, frame_string, turn_info=None):
+        frame = super().__new__(cls, frame_string)
+        frame.turn_info = turn_info if turn_info is not None else scan_turn_info(frame_string)
+        frame.__sections = {}
+        return frame
+
+    @property
+    def turn_number(self):
+        return self.turn_info[1] if self.turn_info and len(self.turn_info) > 1 else None
+
+    @property
+    def frame_number(self):
+        return self.turn_info[2] if self.turn_info and len(self.turn_info) > 2 else None
+
+    def __find_value(self, key, start=0):
+        """The index of the value of the first "key": at or after start, or -1
+        """
+        index = self.find('"{}"'.format(key), start)
+        if index == -1:
+            return -1
+        index = self.find(':', index) + 1
+        while self[index] in ' \t\r\n':
+            index += 1
+        return index
+
+    def section(self, key):
+        """Decodes one top level section of the frame, such as "p1Units" or "events"
+
+        Args:
+            key: The name of the section
+
+        Returns:
+            The decoded section, or None if the frame does not have it
+
+        """
+        if key not in self.__sections:
+            index = self.__find_value(key)
+            self.__sections[key] = _decoder.raw_decode(self, index)[0] if index != -1 else None
+        return self.__sections[key]
+
+    def event(self, event_type):
+        """Decodes one list of events, such as "breach" or "death"
+
+        Args:
+            event_type: One of ActionFrame.EVENT_TYPES
+
+        Returns:
+            The list of events of that type in this frame, empty if there were none
+
+        """
+        key = "events." + event_type
+        if key not in self.__sections:
+            events = self.__find_value("events")
+            index = self.__find_value(event_type, events) if events != -1 else -1
+            self.__sections[key] = _decoder.raw_decode(self, index)[0] if index != -1 else []
+        return self.__sections[key]
+
+    def has_event(self, event_type):
+        """Checks if the frame has any events of a type without decoding them
+
+        Args:
+            event_type: One of ActionFrame.EVENT_TYPES
+
+        Returns:
+            True if there is at least one event of that type in this frame
+
+        """
+        events = self.__find_value("events")
+        index = self.__find_value(event_type, events) if events != -1 else -1
+        if index == -1:
+            return False
+        index += 1
+        while self[index] in ' \t\r\n':
+            index += 1
+        return self[index] != ']'
+
+    @property
+    def state(self):
+        """The fully decoded frame, parsed once on first use
+        """
+        if None not in self.__sections:
+            self.__sections[None] = json.loads(self)
+        return self.__sections[None]
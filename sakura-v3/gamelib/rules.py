@@ -0,0 +1,109 @@
+from .util import config_key
+
+SP = 0
+MP = 1
+
+# Rules keyed by config_key(config), so games with equal configs share one GameRules
+_RULES = {}
+
+
+class GameRules:
+    """Holds the unit constants and tables of a game config, built once per game and shared by every GameState.
+
+    Use GameRules.from_config(config) to get the rules of a config. The rules never change during a game,
+    so any number of GameStates, forks and simulations can reference the same rules at once.
+
+    Attributes :
+        * config (JSON): The game config the rules were built from
+        * WALL, SUPPORT, TURRET, SCOUT, DEMOLISHER, INTERCEPTOR (str): The shorthands of the unit types
+        * REMOVE (str): A constant representing removing your own unit
+        * UPGRADE (str): A constant representing upgrading a unit
+        * UNIT_TYPE_TO_INDEX (dict): Maps a unit to its index in the config
+        * STRUCTURE_TYPES (frozenset): The structure units
+        * MOBILE_UNITS (frozenset): The mobile units
+        * ALL_UNITS (frozenset): Every unit that can be spawned
+        * costs (dict): Maps a unit type to its cost, [SP, MP]
+        * upgrade_costs (dict): Maps a unit that can be upgraded to its upgrade cost, [SP, MP]
+        * edges (list): The locations of the four edges, indexed like GameMap.TOP_RIGHT and friends
+        * friendly_edges (frozenset): (x, y) tuples of the locations player 0 can deploy mobile units on
+
+    """
+    def __init__(self, config, arena_size=28):
+        """Builds the rules of a config, prefer from_config which caches them
+
+        Args:
+            config (JSON): Contains information about the game
+            arena_size: The size of the arena
+
+        """
+        self.config = config
+        unit_information = config["unitInformation"]
+        self.UNIT_TYPE_TO_INDEX = {}
+        for index, name in enumerate(["WALL", "SUPPORT", "TURRET", "SCOUT", "DEMOLISHER", "INTERCEPTOR", "REMOVE", "UPGRADE"]):
+            shorthand = unit_information[index]["shorthand"]
+            setattr(self, name, shorthand)
+            self.UNIT_TYPE_TO_INDEX[shorthand] = index
+
+        self.STRUCTURE_TYPES = frozenset([self.WALL, self.SUPPORT, self.TURRET])
+        self.MOBILE_UNITS = frozenset([self.SCOUT, self.DEMOLISHER, self.INTERCEPTOR])
+        self.ALL_UNITS = self.STRUCTURE_TYPES | self.MOBILE_UNITS
+
+        self.costs = {}
+        self.upgrade_costs = {}
+        for unit_type in self.UNIT_TYPE_TO_INDEX:
+            unit_def = unit_information[self.UNIT_TYPE_TO_INDEX[unit_type]]
+            cost_base = [unit_def.get('cost1', 0), unit_def.get('cost2', 0)]
+            self.costs[unit_type] = cost_base
+            if unit_def.get('upgrade', None) is not None:
+                upgrade_def = unit_def['upgrade']
+                self.upgrade_costs[unit_type] = [upgrade_def.get('cost1', cost_base[SP]), upgrade_def.get('cost2', cost_base[MP])]
+
+        half_arena = arena_size // 2
+        self.edges = [
+            [[half_arena + num, arena_size - 1 - num] for num in range(half_arena)],
+            [[half_arena - 1 - num, arena_size - 1 - num] for num in range(half_arena)],
+            [[half_arena - 1 - num, num] for num in range(half_arena)],
+            [[half_arena + num, num] for num in range(half_arena)]]
+        self.friendly_edges = frozenset(tuple(location) for location in self.edges[2] + self.edges[3])
+
+    @classmethod
+    def from_config(cls, config):
+        """Gets the rules of a config, building them the first time a config with the same contents is seen
+
+        Args:
+            config (JSON): Contains information about the game
+
+        Returns:
+            The shared GameRules of the config
+
+        """
+        key = config_key(config)
+        rules = _RULES.get(key)
+        if rules is None:
+            rules = _RULES.setdefault(key, cls(config))
+        return rules
+
+    def is_stationary(self, unit_type):
+        """
+            Args:
+                unit_type: A unit type
+
+            Returns:
+                Boolean, True if the unit is stationary, False otherwise.
+        """
+        return unit_type in self.STRUCTURE_TYPES
+
+    def type_cost(self, unit_type, upgrade=False):
+        """Gets the cost of a unit, or of its upgrade
+
+        Args:
+            unit_type: The units type (string shorthand)
+            upgrade: If True, get the cost of upgrading the unit
+
+        Returns:
+            A new list [SP, MP]
+
+        """
+        if upgrade and unit_type in self.upgrade_costs:
+            return list(self.upgrade_costs[unit_type])
+        return list(self.costs[unit_type])
@@ -0,0 +1,306 @@
+"""
+Tunes the constants of a strategy by playing it against opponents with HeadlessEngine.
+
+    python -m gamelib.tuner algo space.json opponent [opponent ...] [--candidates 27] [--workers 4] [--cache tuning.jsonl]
+
+space.json maps parameter names to [low, high] ranges, integers when both bounds are integers, or to
+{"choices": [...]} for anything else, such as a list of turret locations. Each parameter is set as an attribute
+of the AlgoStrategy right after its on_game_start, so strategies set their defaults as self.<name> there or in __init__
+and read them afterwards. Naming a parameter the strategy does not have is an error.
+"""
+
+import hashlib
+import json
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from .engine import HeadlessEngine
+from .selfplay import load_algo
+
+# The config of the current process, set up by _init_worker in pool workers or by the tuner itself when serial
+_worker_config = None
+
+
+class SearchSpace:
+    """The parameters of a strategy that can be tuned, and their ranges.
+
+    Attributes :
+        * parameters (dict): Maps a parameter name to a (low, high) range or a list of choices
+
+    """
+    def __init__(self, parameters):
+        """
+        Args:
+            parameters: Maps a parameter name to [low, high], integers when both bounds are integers,
+                or to {"choices": [...]}, or to any other list of choices
+
+        """
+        self.parameters = {}
+        for name, values in parameters.items():
+            if isinstance(values, dict):
+                self.parameters[name] = list(values["choices"])
+            elif len(values) == 2 and all(type(value) in (int, float) for value in values):
+                self.parameters[name] = tuple(values)
+            else:
+                self.parameters[name] = list(values)
+
+    def sample(self, rng):
+        """Picks a random value for every parameter
+
+        Args:
+            rng: A random.Random
+
+        Returns:
+            A dict of parameter name to value
+
+        """
+        params = {}
+        for name, values in sorted(self.parameters.items()):
+            if isinstance(values, tuple):
+                low, high = values
+                params[name] = rng.randint(low, high) if type(low) == int and type(high) == int else rng.uniform(low, high)
+            else:
+                params[name] = rng.choice(values)
+        return params
+
+    @staticmethod
+    def key(params, algo=""):
+        """A hash identifying a set of parameter values
+
+        Args:
+            params: A dict of parameter name to value
+            algo: The strategy the values are for
+
+        Returns:
+            A hex string, the same for equal values whatever their order
+
+        """
+        return hashlib.sha1((algo + json.dumps(params, sort_keys=True)).encode()).hexdigest()
+
+
+def _init_worker(config):
+    global _worker_config
+    _worker_config = config
+
+
+def _source_hash(algo_path):
+    """Hashes the python files of an algo folder, or an algo_strategy.py file, so cached results are dropped when the code changes
+    """
+    if os.path.isfile(algo_path):
+        paths = [algo_path]
+    else:
+        paths = sorted(os.path.join(folder, name) for folder, _, names in os.walk(algo_path) for name in names if name.endswith(".py"))
+    digest = hashlib.sha1()
+    for path in paths:
+        digest.update(os.path.relpath(path, algo_path).encode())
+        with open(path, "rb") as source_file:
+            digest.update(source_file.read())
+    return digest.hexdigest()
+
+
+def _apply_params(algo, params):
+    """Sets the parameter values as attributes of an algo once its on_game_start has run, so they replace the defaults set there.
+    on_game_start raises a ValueError if the algo has no attribute for a parameter, rather than the value being silently unused
+    """
+    on_game_start = algo.on_game_start
+
+    def tuned_on_game_start(config):
+        on_game_start(config)
+        unknown = sorted(name for name in params if not hasattr(algo, name))
+        if unknown:
+            raise ValueError("{} has no parameters named {}".format(type(algo).__name__, ", ".join(unknown)))
+        for name, value in params.items():
+            setattr(algo, name, value)
+    algo.on_game_start = tuned_on_game_start
+
+
+def _play(algo_path, params, opponent_path, game_index, seed, max_turns):
+    """Plays one game of a candidate against an opponent, the candidate is player 2 on odd games
+
+    Returns:
+        (score, health difference), the score is 1 for a win, 0.5 for a draw and 0 for a loss
+    """
+    random.seed(seed)
+    algo = load_algo(algo_path)
+    _apply_params(algo, params)
+    opponent = load_algo(opponent_path)
+    swapped = game_index % 2 == 1
+    algos = [opponent, algo] if swapped else [algo, opponent]
+    result = HeadlessEngine(_worker_config, algos[0], algos[1], max_turns).play()
+    own = 1 if swapped else 0
+    score = 0.5 if result.winner == 0 else float(result.winner == own + 1)
+    return score, result.health[own] - result.health[1 - own]
+
+
+class Tuner:
+    """Searches for the parameter values of a strategy that win the most games against a set of opponents.
+
+    Games are played with HeadlessEngine across a pool of processes, alternating sides between games.
+    Every game result is cached by parameter hash, opponent and game number, and written to cache_path when given, so a set
+    of values is never played against the same opponent twice, including across runs. The keys also cover the source of
+    the strategy, of each opponent and of this gamelib, the seed and max_turns, so results are played again when any of them change.
+
+    Attributes :
+        * algo_path (str): The folder or algo_strategy.py of the strategy being tuned
+        * opponents (list): The folders or algo_strategy.py files of the opponents
+        * space (:obj: SearchSpace): The parameters being tuned
+        * workers (int): The number of worker processes, 0 when playing serially
+        * results (dict): Maps (parameter hash, opponent and its source hash, game number) to (score, health difference)
+
+    """
+    def __init__(self, algo_path, opponents, space, config, workers=None, cache_path=None, seed=0, max_turns=100, play=_play):
+        """Starts the worker processes and loads the cached results
+
+        Args:
+            algo_path: The folder or algo_strategy.py of the strategy being tuned
+            opponents: The folders or algo_strategy.py files of the opponents
+            space: A SearchSpace, or the dict to build one from
+            config: The game config
+            workers: The number of worker processes, one less than the number of cores if None
+            cache_path: A jsonl file the results are read from and appended to, results are only kept in memory if None
+            seed: Seeds the sampling of candidates and the games
+            max_turns: The number of turns after which a game ends
+            play: A module level function (algo_path, params, opponent_path, game_index, seed, max_turns) returning
+                (score, health difference), to play games another way, such as with engine.jar
+
+        """
+        self.algo_path = algo_path
+        self.opponents = list(opponents)
+        self.space = space if isinstance(space, SearchSpace) else SearchSpace(space)
+        self.seed = seed
+        self.max_turns = max_turns
+        self.play = play
+        self.rng = random.Random(seed)
+        self.results = {}
+        engine_hash = _source_hash(os.path.dirname(os.path.abspath(__file__)))
+        self.__algo_key = "{}:{}:{}:{}:{}".format(algo_path, _source_hash(algo_path), engine_hash, seed, max_turns)
+        self.__opponent_keys = {opponent: "{}:{}".format(opponent, _source_hash(opponent)) for opponent in self.opponents}
+        self.__cache_path = cache_path
+        if cache_path is not None and os.path.exists(cache_path):
+            with open(cache_path) as cache_file:
+                for line in cache_file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.results[(entry["key"], entry["opponent"], entry["game"])] = (entry["score"], entry["margin"])
+
+        if workers is None:
+            workers = (os.cpu_count() or 1) - 1
+        self.workers = workers if workers > 1 else 0
+        self.__pool = None
+        if self.workers:
+            self.__pool = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(config,))
+        else:
+            _init_worker(config)
+
+    def __game_seed(self, key, opponent, game_index):
+        return int(hashlib.sha1("{}:{}:{}:{}".format(self.seed, key, opponent, game_index).encode()).hexdigest()[:8], 16)
+
+    def __record(self, result_key, result):
+        self.results[result_key] = result
+        if self.__cache_path is not None:
+            with open(self.__cache_path, "a") as cache_file:
+                cache_file.write(json.dumps({"key": result_key[0], "opponent": result_key[1], "game": result_key[2],
+                                             "score": result[0], "margin": result[1]}) + "\n")
+
+    def evaluate(self, candidates, games):
+        """Plays every candidate against every opponent, only the games missing from the cache are played
+
+        Args:
+            candidates: A list of dicts of parameter values
+            games: The number of games against each opponent
+
+        Returns:
+            A list with the (mean score, mean health difference) of each candidate, in the same order
+
+        """
+        missing = {}
+        for params in candidates:
+            key = SearchSpace.key(params, self.__algo_key)
+            for opponent in self.opponents:
+                for game_index in range(games):
+                    result_key = (key, self.__opponent_keys[opponent], game_index)
+                    if result_key not in self.results:
+                        missing[result_key] = (params, opponent)
+        missing = list(missing.items())
+
+        jobs = [(self.algo_path, params, opponent, result_key[2], self.__game_seed(*result_key), self.max_turns)
+                for result_key, (params, opponent) in missing]
+        if self.workers:
+            outcomes = self.__pool.map(self.play, *zip(*jobs), chunksize=max(1, len(jobs) // (4 * self.workers))) if jobs else []
+        else:
+            outcomes = (self.play(*job) for job in jobs)
+        for (result_key, _), outcome in zip(missing, outcomes):
+            self.__record(result_key, tuple(outcome))
+
+        scores = []
+        for params in candidates:
+            key = SearchSpace.key(params, self.__algo_key)
+            played = [self.results[(key, self.__opponent_keys[opponent], game_index)]
+                      for opponent in self.opponents for game_index in range(games)]
+            scores.append((sum(score for score, _ in played) / len(played), sum(margin for _, margin in played) / len(played)))
+        return scores
+
+    def successive_halving(self, candidates=27, eta=3, min_games=2, max_games=18, initial=None):
+        """Samples candidates and plays them in rounds, keeping the best 1/eta of them with eta times more games each round
+
+        Args:
+            candidates: The number of random candidates to start from
+            eta: The fraction of candidates dropped each round, and the factor the number of games grows by
+            min_games: The number of games against each opponent in the first round
+            max_games: The maximum number of games against each opponent
+            initial: A list of dicts of parameter values to include, such as the current values of the strategy
+
+        Returns:
+            (best parameter values, (mean score, mean health difference))
+
+        """
+        pool = list(initial or [])
+        while len(pool) < candidates:
+            pool.append(self.space.sample(self.rng))
+        games = min_games
+        while True:
+            scores = self.evaluate(pool, games)
+            ranked = sorted(range(len(pool)), key=lambda index: scores[index], reverse=True)
+            if len(pool) <= 1 or games >= max_games:
+                return pool[ranked[0]], scores[ranked[0]]
+            pool = [pool[index] for index in ranked[:max(1, len(pool) // eta)]]
+            games = min(max_games, games * eta)
+
+    def close(self):
+        """Shuts down the worker processes
+        """
+        if self.__pool is not None:
+            self.__pool.shutdown()
+            self.__pool = None
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Tunes the parameters of a strategy with self-play")
+    parser.add_argument("algo", help="the algo folder to tune")
+    parser.add_argument("space", help="json file of the parameters to tune")
+    parser.add_argument("opponents", nargs="+", help="algo folders to play against")
+    parser.add_argument("--candidates", type=int, default=27)
+    parser.add_argument("--min-games", type=int, default=2)
+    parser.add_argument("--max-games", type=int, default=18)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--cache", default=None, help="jsonl file results are cached in across runs")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "game-configs.json")
+    with open(config_path) as config_file:
+        game_config = json.load(config_file)
+    with open(args.space) as space_file:
+        search_space = SearchSpace(json.load(space_file))
+    tuner = Tuner(os.path.abspath(args.algo), [os.path.abspath(path) for path in args.opponents], search_space, game_config,
+                  args.workers, args.cache, args.seed)
+    try:
+        best, (best_score, best_margin) = tuner.successive_halving(args.candidates, min_games=args.min_games, max_games=args.max_games)
+    finally:
+        tuner.close()
+    sys.stdout.write("Best parameters: {}\nScore: {:.3f}, health difference: {:.2f}\n".format(json.dumps(best, sort_keys=True), best_score, best_margin))
@@ -1,6 +1,10 @@
 import json
 
+from .action_frame import ActionFrame, scan_turn_info
+from .budget import TurnBudget
 from .game_state import GameState
+from .history import History
+from .speculation import SpeculationWorker
 from .util import get_command, debug_write, BANNER_TEXT, send_command
 
 class AlgoCore(object):
@@ -10,10 +14,21 @@ class AlgoCore(object):
 
     Attributes :
         * config (JSON): json object containing information about the game
+        * turn_budget (:obj: TurnBudget): Tracks the time used by the current turn, set before each call to on_turn
+        * log_turn_times (bool): If true, the time taken by each turn is written to the debug output. False by default, set it in on_game_start to opt in
+        * speculation (:obj: SpeculationWorker): Runs speculate on action frames in the background, None unless enable_speculation was called
+        * history (:obj: History): Records spawns, breaches, structure deaths and resources of recent turns, None unless enable_history was called
+        * action_frame_events (list): Event types on_action_frame is called for, such as ["breach", "death"].
+          None calls it for every frame, an empty list never calls it
 
     """
     def __init__(self):
         self.config = None
+        self.turn_budget = None
+        self.log_turn_times = False
+        self.speculation = None
+        self.history = None
+        self.action_frame_events = None
 
     def on_game_start(self, config):
         """
@@ -40,9 +55,48 @@ class AlgoCore(object):
         The action phase is made up of a sequence of distinct frames. 
         Each of these frames is sent to the algo in order. 
         They can be handled in this function. 
+        The frame is passed as an ActionFrame, a string that can decode only the sections you need, for example frame.event("breach"). 
+        Set self.action_frame_events to only be called for frames containing those events. 
         """
         pass
 
+    def _wants_action_frame(self, frame):
+        """
+        Checks if on_action_frame should be called for a frame, without parsing it
+        """
+        if type(self).on_action_frame is AlgoCore.on_action_frame:
+            return False
+        if self.action_frame_events is None:
+            return True
+        return any(frame.has_event(event_type) for event_type in self.action_frame_events)
+
+    def enable_speculation(self):
+        """
+        Starts a background worker that calls speculate with the newest action frame while the action phase plays out.
+        Call it from on_game_start. In on_turn, self.speculation.latest(timeout, final=True) returns
+        (turn_number, frame_number, result) of the run on the last frame of the action phase, waiting up to timeout
+        seconds for it, or None, so you can reuse work such as paths or attack scores computed on the final board.
+        Long running speculate functions can check self.speculation.superseded() and return early.
+        """
+        if self.speculation is None:
+            self.speculation = SpeculationWorker(self.speculate)
+
+    def enable_history(self, capacity=100):
+        """
+        Starts recording the spawns, breaches, structure deaths and resources of every turn into self.history.
+        Call it from on_game_start. Only the last capacity turns are kept. 
+        """
+        if self.history is None:
+            self.history = History(capacity)
+
+    def speculate(self, frame_string, turn_number):
+        """
+        Called in a background thread with the newest action frame once enable_speculation was called.
+        The frame can be loaded with GameState(self.config, frame_string) to analyze the board the next turn will start from.
+        Whatever you return is made available through self.speculation.latest(). 
+        By default, it does nothing. 
+        """
+        return None
 
     def start(self):
         """ 
@@ -57,39 +111,66 @@ class AlgoCore(object):
             # Note: Python blocks and hangs on stdin. Can cause issues if connections aren't setup properly and may need to
             # manually kill this Python program.
             game_state_string = get_command()
-            if "replaySave" in game_state_string:
+            if not self.handle_message(game_state_string):
+                break
+
+    def handle_message(self, game_state_string):
+        """
+        Handles a single message from the game engine: the config, a turn, an action frame or the end of the game.
+        start calls it with every line read from stdin, HeadlessEngine calls it directly. 
+        Returns False once the game is over, True otherwise. 
+        """
+        if "replaySave" in game_state_string:
+            """
+            This means this must be the config file. So, load in the config file as a json and add it to your AlgoStrategy class.
+            """
+            parsed_config = json.loads(game_state_string)
+            self.on_game_start(parsed_config)
+        elif "turnInfo" in game_state_string:
+            turn_info = scan_turn_info(game_state_string)
+            if turn_info is None:
+                turn_info = [int(value) for value in json.loads(game_state_string).get("turnInfo")]
+            stateType = turn_info[0]
+            if stateType == 0:
+                """
+                This is the game turn game state message. Algo must now print to stdout 2 lines, one for build phase one for
+                deploy phase. Printing is handled by the provided functions.
+                """
+                if self.speculation is not None:
+                    self.speculation.finish_turn()
+                self.turn_budget = TurnBudget.from_config(self.config, turn_info[1])
+                if self.history is not None:
+                    self.history.record_turn(ActionFrame(game_state_string, turn_info))
+                self.on_turn(game_state_string)
+                if self.log_turn_times:
+                    self.turn_budget.report()
+            elif stateType == 1:
+                """
+                If stateType == 1, this game_state_string string represents a single frame of an action phase
+                """
+                frame = ActionFrame(game_state_string, turn_info)
+                if self.history is not None:
+                    self.history.record_frame(frame)
+                if self._wants_action_frame(frame):
+                    self.on_action_frame(frame)
+                if self.speculation is not None:
+                    self.speculation.submit(game_state_string, turn_info[1], turn_info[2])
+            elif stateType == 2:
                 """
-                This means this must be the config file. So, load in the config file as a json and add it to your AlgoStrategy class.
+                This is the end game message. This means the game is over so break and finish the program.
                 """
-                parsed_config = json.loads(game_state_string)
-                self.on_game_start(parsed_config)
-            elif "turnInfo" in game_state_string:
-                state = json.loads(game_state_string)
-                stateType = int(state.get("turnInfo")[0])
-                if stateType == 0:
-                    """
-                    This is the game turn game state message. Algo must now print to stdout 2 lines, one for build phase one for
-                    deploy phase. Printing is handled by the provided functions.
-                    """
-                    self.on_turn(game_state_string)
-                elif stateType == 1:
-                    """
-                    If stateType == 1, this game_state_string string represents a single frame of an action phase
-                    """
-                    self.on_action_frame(game_state_string)
-                elif stateType == 2:
-                    """
-                    This is the end game message. This means the game is over so break and finish the program.
-                    """
-                    debug_write("Got end state, game over. Stopping algo.")
-                    break
-                else:
-                    """
-                    Something is wrong? Received an incorrect or improperly formatted string.
-                    """
-                    debug_write("Got unexpected string with turnInfo: {}".format(game_state_string))
+                debug_write("Got end state, game over. Stopping algo.")
+                if self.speculation is not None:
+                    self.speculation.stop()
+                return False
             else:
                 """
                 Something is wrong? Received an incorrect or improperly formatted string.
                 """
-                debug_write("Got unexpected string : {}".format(game_state_string))
+                debug_write("Got unexpected string with turnInfo: {}".format(game_state_string))
+        else:
+            """
+            Something is wrong? Received an incorrect or improperly formatted string.
+            """
+            debug_write("Got unexpected string : {}".format(game_state_string))
+        return True
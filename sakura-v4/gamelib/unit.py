@@ -1,16 +1,89 @@
+from collections import namedtuple
+from .util import config_key
+
+
 def is_stationary(unit_type, structure_types):
     """
         Args:
             unit_type: A unit type
-        
-        Returns: 
+
+        Returns:
             Boolean, True if the unit is stationary, False otherwise.
     """
     return unit_type in structure_types
 
 
+UnitStats = namedtuple("UnitStats", [
+    "unit_type", "config", "upgraded", "stationary", "speed", "damage_f", "damage_i", "attackRange",
+    "shieldRange", "max_health", "shieldPerUnit", "shieldBonusPerY", "cost"])
+UnitStats.__doc__ = """The stats of a unit type, shared by every GameUnit of that type. See get_unit_stats."""
+
+# Stat tables keyed by config_key(config), so games with equal configs share one table
+_STAT_TABLES = {}
+
+
+def get_unit_stats(config, unit_type, upgraded=False):
+    """Gets the shared stat record of a unit type, building the table for the config on first use
+
+    Args:
+        config: The game config
+        unit_type: The shorthand of a unit type
+        upgraded: If True, get the stats of the upgraded unit
+
+    Returns:
+        The UnitStats of the unit type
+
+    """
+    key = config_key(config)
+    table = _STAT_TABLES.get(key)
+    if table is None:
+        table = _STAT_TABLES.setdefault(key, _build_stat_table(config))
+    return table[unit_type, upgraded]
+
+
+def _build_stat_table(config):
+    """Builds the UnitStats of every unit type in a config, upgraded and not
+    """
+    table = {}
+    for type_config in reversed(config["unitInformation"]):
+        unit_type = type_config.get("shorthand")
+        base = UnitStats(
+            unit_type=unit_type,
+            config=config,
+            upgraded=False,
+            stationary=type_config.get("unitCategory") == 0,
+            speed=type_config.get("speed", 0),
+            damage_f=type_config.get("attackDamageTower", 0),
+            damage_i=type_config.get("attackDamageWalker", 0),
+            attackRange=type_config.get("attackRange", 0),
+            shieldRange=type_config.get("shieldRange", 0),
+            max_health=type_config.get("startHealth", 0),
+            shieldPerUnit=type_config.get("shieldPerUnit", 0),
+            shieldBonusPerY=type_config.get("shieldBonusPerY", 0),
+            cost=(type_config.get("cost1", 0), type_config.get("cost2", 0)))
+        upgrade_config = type_config.get("upgrade", {})
+        upgraded = base._replace(
+            upgraded=True,
+            speed=upgrade_config.get("speed", base.speed),
+            damage_f=upgrade_config.get("attackDamageTower", base.damage_f),
+            damage_i=upgrade_config.get("attackDamageWalker", base.damage_i),
+            attackRange=upgrade_config.get("attackRange", base.attackRange),
+            shieldRange=upgrade_config.get("shieldRange", base.shieldRange),
+            max_health=upgrade_config.get("startHealth", base.max_health),
+            shieldPerUnit=upgrade_config.get("shieldPerUnit", base.shieldPerUnit),
+            shieldBonusPerY=upgrade_config.get("shieldBonusPerY", base.shieldBonusPerY),
+            cost=(upgrade_config.get("cost1", 0) + base.cost[0], upgrade_config.get("cost2", 0) + base.cost[1]))
+        table[unit_type, False] = base
+        table[unit_type, True] = upgraded
+    return table
+
+
 class GameUnit:
-    """Holds information about a Unit. 
+    """Holds information about a Unit.
+
+    The stats of a unit are copied from a UnitStats record shared by every unit of the same type into slots,
+    so creating and upgrading units is cheap and reading stats is a plain attribute read. Stats can be
+    assigned on a single unit, upgrade() resets them to the upgraded stats of the type.
 
     Attributes :
         * unit_type (string): This unit's type
@@ -30,51 +103,35 @@ class GameUnit:
         * shieldPerUnit (float): how much shield is given per unit
         * pending_removal (boolean): If this unit is marked for removal by its owner
         * upgraded (boolean): If this unit is upgraded
+        * stats (UnitStats): The shared stats of this unit's type
 
     """
+    __slots__ = ("player_index", "health", "x", "y", "pending_removal", "stats", "unit_type", "config", "upgraded",
+                 "stationary", "speed", "damage_f", "damage_i", "attackRange", "shieldRange", "max_health",
+                 "shieldPerUnit", "shieldBonusPerY")
+
     def __init__(self, unit_type, config, player_index=None, health=None, x=-1, y=-1):
         """ Initialize unit variables using args passed
 
         """
-        self.unit_type = unit_type
-        self.config = config
+        self.__set_stats(get_unit_stats(config, unit_type))
         self.player_index = player_index
         self.pending_removal = False
-        self.upgraded = False
         self.x = x
         self.y = y
-        self.__serialize_type()
         self.health = self.max_health if not health else health
 
-    def __serialize_type(self):
-        from .game_state import STRUCTURE_TYPES, UNIT_TYPE_TO_INDEX, SUPPORT
-        type_config = self.config["unitInformation"][UNIT_TYPE_TO_INDEX[self.unit_type]]
-        self.stationary = type_config["unitCategory"] == 0
-        self.speed = type_config.get("speed", 0)
-        self.damage_f = type_config.get("attackDamageTower", 0)
-        self.damage_i = type_config.get("attackDamageWalker", 0)
-        self.attackRange = type_config.get("attackRange", 0)
-        self.shieldRange = type_config.get("shieldRange", 0)
-        self.max_health = type_config.get("startHealth", 0)
-        self.shieldPerUnit = type_config.get("shieldPerUnit", 0)
-        self.shieldBonusPerY = type_config.get("shieldBonusPerY", 0)
-        self.cost = [type_config.get("cost1", 0), type_config.get("cost2", 0)]
+    def __set_stats(self, stats):
+        self.stats = stats
+        (self.unit_type, self.config, self.upgraded, self.stationary, self.speed, self.damage_f, self.damage_i,
+         self.attackRange, self.shieldRange, self.max_health, self.shieldPerUnit, self.shieldBonusPerY, _) = stats
 
+    @property
+    def cost(self):
+        return list(self.stats.cost)
 
     def upgrade(self):
-        from .game_state import UNIT_TYPE_TO_INDEX
-        type_config = self.config["unitInformation"][UNIT_TYPE_TO_INDEX[self.unit_type]].get("upgrade", {})
-        self.speed = type_config.get("speed", self.speed)
-        self.damage_f = type_config.get("attackDamageTower", self.damage_f)
-        self.damage_i = type_config.get("attackDamageWalker", self.damage_i)
-        self.attackRange = type_config.get("attackRange", self.attackRange)
-        self.shieldRange = type_config.get("shieldRange", self.shieldRange)
-        self.max_health = type_config.get("startHealth", self.max_health)
-        self.shieldPerUnit = type_config.get("shieldPerUnit", self.shieldPerUnit)
-        self.shieldBonusPerY = type_config.get("shieldBonusPerY", self.shieldBonusPerY)
-        self.cost = [type_config.get("cost1", 0) + self.cost[0], type_config.get("cost2", 0) + self.cost[1]]
-        self.upgraded = True
-
+        self.__set_stats(get_unit_stats(self.stats.config, self.stats.unit_type, True))
 
     def __toString(self):
         owner = "Friendly" if self.player_index == 0 else "Enemy"
@@ -86,4 +143,3 @@ class GameUnit:
 
     def __repr__(self):
         return self.__toString()
-
@@ -117,6 +117,18 @@ would show 2 graphs. The first would show health and the second would plot bits
 
 (I recommend just trying a bunch of combinations with ':' to get familiar with this).
 
+----------------------------------------------------------------------------------------
+Replay index
+
+The first time a replay is read, a compact summary of it (per turn stats, spawn counts and end stats)
+is stored in replay_index.sqlite next to the replay. Later runs read the summary instead of the replay,
+and only re-read replays whose size or modification time changed. To rebuild every summary use:
+>py scripts/contributions/get_results.py -a --reindex
+
+Replays that are not in the index are read in parallel, one process per core by default.
+You can choose the number of processes with -j, -j 1 reads them one at a time:
+>py scripts/contributions/get_results.py -a -j 4
+
 ----------------------------------------------------------------------------------------
 
 All of the commands above can be combined in any order. For example, if I wanted to run the
@@ -174,7 +186,10 @@ try:
 	import json
 	import glob
 	import math
+	import sqlite3
 	import argparse
+	import functools
+	import multiprocessing as mp
 except ImportError as e:
 	sys.stderr.write("WARNING: Module not found, full error:\n\n")
 	sys.stderr.write(e)
@@ -231,6 +246,14 @@ def parse_args():
 		nargs="*",
 		default=[],
 		help="specify what data you would like to be graphed - you must have matplotlib installed\n\nValid Options For Single Game:\n\t- health\n\t- bits\n\t- cores\n\t- cores_spent\n\t- bits_spent\n\t- cores_on_board\n\nValid Options For Multiple Games:\n\t- wins\n\n")
+	ap.add_argument(
+		"-j", "--jobs",
+		default=os.cpu_count() or 1,
+		help="number of processes used to read replays, defaults to the number of cores\n\n")
+	ap.add_argument(
+		"--reindex",
+		action='store_true',
+		help="ignore the replay index and read every replay file again\n\n")
 	return vars(ap.parse_args())
 
 
@@ -440,15 +463,125 @@ class Algo:
 		return disp
 
 
+# Columns stored for every frame of a replay in the index, see ReplayIndex
+FRAME_COLUMNS = ['turn', 'frame'] + ['p{}_{}'.format(p, c) for p in (1, 2) for c in
+	['health', 'cores', 'bits', 'filters', 'encryptors', 'destructors'] + ['spawn_{}'.format(i) for i in range(6)]]
+
+# Summarizes a replay frame into the values of FRAME_COLUMNS
+def summarize_frame(data):
+	turn_info = data['turnInfo']
+	row = [turn_info[1], turn_info[2]]
+	spawn = data['events']['spawn']
+	for p_index in (1, 2):
+		stats = data['p{}Stats'.format(p_index)]
+		units = data['p{}Units'.format(p_index)]
+		row += [stats[0], stats[1], stats[2], len(units[0]), len(units[1]), len(units[2])]
+		counts = [0] * 6
+		for x in spawn:
+			if x[3] == p_index and 0 <= x[1] < 6:
+				counts[x[1]] += 1
+		row += counts
+	return row
+
+# Caches the per frame summaries and end stats of replays in a SQLite file next to them,
+# so a replay only has to be read again when it changes
+class ReplayIndex:
+	VERSION = 1
+	FILE_NAME = 'replay_index.sqlite'
+
+	connections = {}		# (process id, directory) -> ReplayIndex, connections can not be shared with worker processes
+
+	def __init__(self, directory):
+		self.db = sqlite3.connect(os.path.join(directory, ReplayIndex.FILE_NAME), timeout=30)
+		self.db.execute('CREATE TABLE IF NOT EXISTS replays (path TEXT PRIMARY KEY, version INTEGER, mtime REAL, size INTEGER, end_stats TEXT)')
+		self.db.execute('CREATE TABLE IF NOT EXISTS frames (path TEXT, position INTEGER, {}, PRIMARY KEY (path, position))'.format(
+			', '.join('{} REAL'.format(c) for c in FRAME_COLUMNS)))
+
+	# returns the index for the directory of a replay, or None if it can not be created
+	@staticmethod
+	def for_replay(fname):
+		directory = os.path.dirname(os.path.abspath(fname))
+		key = (os.getpid(), directory)
+		if key not in ReplayIndex.connections:
+			try:
+				ReplayIndex.connections[key] = ReplayIndex(directory)
+			except sqlite3.Error as e:
+				sys.stderr.write('Could not open the replay index in {}: {}\n'.format(directory, e))
+				ReplayIndex.connections[key] = None
+		return ReplayIndex.connections[key]
+
+	@staticmethod
+	def signature(fname):
+		stat = os.stat(fname)
+		return stat.st_mtime, stat.st_size
+
+	# returns (frame rows, end stats) if the replay is indexed and unchanged, None otherwise
+	def load(self, fname):
+		path = os.path.abspath(fname)
+		mtime, size = ReplayIndex.signature(fname)
+		entry = self.db.execute('SELECT version, mtime, size, end_stats FROM replays WHERE path = ?', (path,)).fetchone()
+		if entry is None or entry[0] != ReplayIndex.VERSION or entry[1] != mtime or entry[2] != size:
+			return None
+		rows = self.db.execute('SELECT {} FROM frames WHERE path = ? ORDER BY position'.format(', '.join(FRAME_COLUMNS)), (path,)).fetchall()
+		return [[int(v) if i < 2 else v for i, v in enumerate(row)] for row in rows], json.loads(entry[3])
+
+	def store(self, fname, rows, end_stats):
+		path = os.path.abspath(fname)
+		mtime, size = ReplayIndex.signature(fname)
+		with self.db:
+			self.db.execute('DELETE FROM frames WHERE path = ?', (path,))
+			self.db.executemany('INSERT INTO frames VALUES (?, ?, {})'.format(', '.join('?' for _ in FRAME_COLUMNS)),
+				[(path, position) + tuple(row) for position, row in enumerate(rows)])
+			self.db.execute('INSERT OR REPLACE INTO replays VALUES (?, ?, ?, ?, ?)', (path, ReplayIndex.VERSION, mtime, size, json.dumps(end_stats)))
+
+
+# Reads the frame summaries and end stats of a replay, from the index if it is up to date.
+# This is what the worker processes of FileHandler run, so it only returns the compact summaries
+def read_replay(fname, reindex=False):
+	index = ReplayIndex.for_replay(fname)
+	if index is not None and not reindex:
+		try:
+			cached = index.load(fname)
+			if cached is not None:
+				return cached
+		except sqlite3.Error as e:
+			sys.stderr.write('Could not read {} from the replay index: {}\n'.format(fname, e))
+
+	turns = {}
+	end_stats = {}
+	with open(fname) as f:
+		for line in f:
+			line = line.replace("\n", "")
+			line = line.replace("\t", "")
+
+			if (line != ''):
+				data = json.loads(line)
+
+				if 'debug' not in data:
+					key = (data['turnInfo'][1], data['turnInfo'][2])
+					turns[key] = summarize_frame(data)
+					end_stats[key] = data.get('endStats')
+
+	rows = list(turns.values())
+	last_end_stats = end_stats[list(turns)[-1]] if turns else None
+	if index is not None and last_end_stats is not None:
+		try:
+			index.store(fname, rows, last_end_stats)
+		except sqlite3.Error as e:
+			sys.stderr.write('Could not add {} to the replay index: {}\n'.format(fname, e))
+	return rows, last_end_stats
+
+
 # Stores data from a single replay and creates the Algo classes
 class Replay:
-	def __init__(self, f_name, algos):
+	reindex = False
+
+	def __init__(self, f_name, algos, summary=None):
 		self.fname = f_name;
-		self.ref = None
-		self.turns = {}
-		self.valid_turns = []
+		self.turns = {}			# (turn, frame) -> frame summary, see FRAME_COLUMNS
+		self.end_stats = None
 
-		self.load_data()				# handles loading all the data from file into python variables
+		self.load_data(summary)		# handles loading all the data from the index or the file into python variables
 		self.unpack_data(algos)		# stores relevant data after it has been loaded
 
 	def __eq__(self, other):
@@ -460,85 +593,56 @@ class Replay:
 	def __repr__(self):
 		return self.__string()
 
-	def load_data(self):
-		with open(self.fname) as f:
-			for line in f:
-				line = line.replace("\n", "")
-				line = line.replace("\t", "")
-
-				if (line != ''):
-					data = json.loads(line)
-
-					try:
-						data['debug']
-						self.ref = data
-					except:
-						turn_num = data['turnInfo'][1]
-						frame_num = data['turnInfo'][2]
-						self.turns[(turn_num, frame_num)] = data
-						if (turn_num, frame_num) not in self.valid_turns:
-							self.valid_turns.append((turn_num, frame_num))
-
-	def get_cores_on_board(self, filters, encryptors, destructors):
-		return len(filters) + len(encryptors) * 4 + len(destructors) * 3
-
-	def get_bits_spent(self, algo, spawn):
-		p_index = 1 if algo == self.algo1 else 2
-		pings = [x for x in spawn if x[3] == p_index and x[1] == 3]
-		emps = [x for x in spawn if x[3] == p_index and x[1] == 4]
-		scramblers = [x for x in spawn if x[3] == p_index and x[1] == 5]
-		return len(pings) + len(emps) * 3 + len(scramblers)
-
-	def get_cores_spent(self, algo, spawn):
-		p_index = 1 if algo == self.algo1 else 2
-		filters = [x for x in spawn if x[3] == p_index and x[1] == 0]
-		encryptors = [x for x in spawn if x[3] == p_index and x[1] == 1]
-		destructors = [x for x in spawn if x[3] == p_index and x[1] == 2]
-		return len(filters) + len(encryptors) * 4 + len(destructors) * 3
-
-	def add_data_to_algo(self, algo, t, f, stats, units, spawn):
-		algo.add_data(self.fname, t, 'health', stats[0])
-		algo.add_data(self.fname, t, 'cores', stats[1])
-		algo.add_data(self.fname, t, 'bits', stats[2])
-
-		filters, encryptors, destructors, pings, emps, scramblers, removes = units
-
-		algo.add_data(self.fname, t, 'cores_on_board', self.get_cores_on_board(filters, encryptors, destructors))
+	@property
+	def valid_turns(self):
+		return list(self.turns)
+
+	# summary is the result of read_replay if it has already been read, by a worker process for example
+	def load_data(self, summary=None):
+		rows, self.end_stats = summary if summary is not None else read_replay(self.fname, Replay.reindex)
+		for row in rows:
+			self.turns[(row[0], row[1])] = row
+
+	def get_bits_spent(self, spawn_counts):
+		return spawn_counts[3] + spawn_counts[4] * 3 + spawn_counts[5]
+
+	def get_cores_spent(self, spawn_counts):
+		return spawn_counts[0] + spawn_counts[1] * 4 + spawn_counts[2] * 3
+
+	def add_data_to_algo(self, algo, t, f, summary):
+		health, cores, bits, filters, encryptors, destructors = summary[:6]
+		spawn_counts = summary[6:]
+
+		algo.add_data(self.fname, t, 'health', health)
+		algo.add_data(self.fname, t, 'cores', cores)
+		algo.add_data(self.fname, t, 'bits', bits)
+
+		algo.add_data(self.fname, t, 'cores_on_board', filters + encryptors * 4 + destructors * 3)
 
 		if f == 0:
-			algo.add_data(self.fname, t, 'cores_spent', self.get_cores_spent(algo, spawn), True)
-			algo.add_data(self.fname, t, 'bits_spent', self.get_bits_spent(algo, spawn), True)
+			algo.add_data(self.fname, t, 'cores_spent', self.get_cores_spent(spawn_counts), True)
+			algo.add_data(self.fname, t, 'bits_spent', self.get_bits_spent(spawn_counts), True)
 
 	def unpack_data(self, algos):
 		try:
 			self.algo1, self.algo2 = self.create_algos(algos)
 
+			half = (len(FRAME_COLUMNS) - 2) // 2
 			for t, f in self.get_valid_turns():
-				turn = self.get_turn(t, f)
-
-				turn_info = turn['turnInfo']
-				events = turn['events']
-				spawn = events['spawn']
-
-				p1_stats = turn['p1Stats']
-				p1_units = turn['p1Units']
-
-				p2_stats = turn['p2Stats']
-				p2_units = turn['p2Units']
-
-				self.add_data_to_algo(self.algo1, t, f, p1_stats, p1_units, spawn)
-				self.add_data_to_algo(self.algo2, t, f, p2_stats, p2_units, spawn)
+				row = self.get_turn(t, f)
+				self.add_data_to_algo(self.algo1, t, f, row[2:2 + half])
+				self.add_data_to_algo(self.algo2, t, f, row[2 + half:])
 
 			self.algo1.recored_final_data(self.fname, self.algo2)
 			self.algo2.recored_final_data(self.fname, self.algo1)
-			self.algo1.add_end_stats(self.fname, self.turns[self.valid_turns[-1]]['endStats']['player1'])
-			self.algo2.add_end_stats(self.fname, self.turns[self.valid_turns[-1]]['endStats']['player2'])
+			self.algo1.add_end_stats(self.fname, dict(self.end_stats['player1']))
+			self.algo2.add_end_stats(self.fname, dict(self.end_stats['player2']))
 		except Exception as e:
 			sys.stderr.write(str(e))
 
 	# only creates a new algo class if that algo does not already exist. Otherwise data is added to the existing one
 	def create_algos(self, algos):
-		end_stats = self.turns[self.valid_turns[-1]]['endStats']
+		end_stats = self.end_stats
 		p1_algo = end_stats['player1']['name']
 		p2_algo = end_stats['player2']['name']
 
@@ -600,16 +704,30 @@ class FileHandler:
 			return files
 		return files[:num]
 
-	def load_files(self, num=1, a=False, f_names=[]):
-		if len(f_names) > 0:
+	# reads the replays with up to jobs worker processes, yielding (file name, summary) in order as they are ready
+	def __read_replays(self, f_names, jobs=1):
+		if jobs <= 1 or len(f_names) <= 1:
 			for f_name in f_names:
-				if f_name.find('replays') == -1:
-					self.replays.append(Replay('replays/'+f_name, self.algos))
-				else:
-					self.replays.append(Replay(f_name, self.algos))
+				yield f_name, read_replay(f_name, Replay.reindex)
+			return
+
+		pool = mp.Pool(min(jobs, len(f_names)))
+		try:
+			summaries = pool.imap(functools.partial(read_replay, reindex=Replay.reindex), f_names, chunksize=4)
+			for f_name, summary in zip(f_names, summaries):
+				yield f_name, summary
+		finally:
+			pool.close()
+			pool.join()
+
+	def load_files(self, num=1, a=False, f_names=[], jobs=1):
+		if len(f_names) > 0:
+			f_names = [f_name if f_name.find('replays') != -1 else 'replays/'+f_name for f_name in f_names]
 		else:
-			for f_name in self.__latest_replays(num, a):
-				self.replays.append(Replay(f_name, self.algos))
+			f_names = self.__latest_replays(num, a)
+
+		for f_name, summary in self.__read_replays(f_names, jobs):
+			self.replays.append(Replay(f_name, self.algos, summary))
 
 	def add_plot(self, lbl):
 		if lbl == 'wins':
@@ -710,8 +828,9 @@ def get_graph_options(options):
 def main(args):
 	verbose_options, summary_options = get_graph_options(args['graph'])
 
+	Replay.reindex = args['reindex']
 	fh = FileHandler()
-	fh.load_files(int(args['num']), args['all'], args['file']) #loads the files - all JSON reading is here
+	fh.load_files(int(args['num']), args['all'], args['file'], int(args['jobs'])) #loads the files - all JSON reading is here
 
 	# check to see if matplotlib is installed
 	graphing_enabled = True if len(verbose_options) > 0 or len(summary_options) > 0 else False
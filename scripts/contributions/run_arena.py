@@ -49,9 +49,9 @@ algo3
 ...
 
 
-Lastly, the final argument you can (and should) in combination with each of these
-is -b, for batch_size. This controls how many games can run at one time to keep
-this from melting your computer. The default is 5.
+You can also use -b, for batch_size, in combination with each of these. This controls how many
+games can run at one time. By default it is the number of cores of your computer, or fewer if
+there is not enough free memory to run that many games (about 1GB each).
 
 For example:
 >py scripts/contributions/run_arena.py -a -b 6
@@ -60,6 +60,28 @@ This would run every single game like before, but 6 games at a time.
 
 DO NOT RUN WITH A LARGE BATCH SIZE (like >15, depending on your computer) or else it will take forever and crash.
 
+Use -t to stop games that take longer than a number of seconds, and -r for the number of times
+a game that crashed or timed out is run again (the default is 1):
+>py scripts/contributions/run_arena.py -a -t 600 -r 2
+
+The result of every game (winner, turns, duration and replay file) is written to
+replays/arena_ledger.jsonl as soon as it finishes, or to the file given with -l. If the arena
+is stopped part way through, running the same command again skips the games already in the
+ledger and only plays the rest. Each result is stored with a hash of the source of both algos, the
+game config and engine.jar, so after you edit one algo only the games it plays in are run again.
+The results of earlier versions stay in the ledger and are used again if you undo the edit.
+Delete the ledger to play every game again.
+
+To find out whether one algo is really stronger than another, use --sprt. Each pair of algos then
+plays games two at a time, once from each side, until a sequential probability ratio test says one
+of them is stronger by about --elo points (100 by default), or until --max-games is reached.
+Pairs that are still undecided are played at the same time, so a clear result comes from as few
+games as possible:
+>py scripts/contributions/run_arena.py -s kazuha-v3 kazuha-v2 --sprt --elo 50
+
+--alpha sets how likely the test is to pick the wrong algo (0.05 by default). Games that end in
+a draw or fail do not count towards the result. These games are also kept in the ledger.
+
 
 At the end I also run the get_results.py script that outputs some data. I recommend having
 matplotlib installed for graphs, etc.
@@ -73,47 +95,52 @@ If you have questions just ask me on the forums - @Isaac
 import sys
 try:
 	import os
+	import json
+	import queue
+	import signal
 	import subprocess
 	import argparse
 	import itertools
+	import threading
+	import tempfile
 	import time
 	import copy
-	import multiprocessing as mp
+	import math
+	import collections
+	import hashlib
 except ImportError as e:
 	print("WARNING: Module not found, full error:\n")
 	print(str(e))
 	sys.exit()
 
 
-# Runs a single game
-def run_single_game(process_command, algo1, algo2, max_name_len):
-	p = subprocess.Popen(
-		process_command,
-		shell=True,
-		stdout=subprocess.PIPE,
-		stderr=subprocess.PIPE
-		)
-	output, error = p.communicate()
-	# daemon necessary so game shuts down if this script is shut down by user
-	p.daemon = 1
-	p.wait()
-	print("{: <30}{: <{fill}}   vs   {}".format('Finished running match:', algo1, algo2, fill=str(max_name_len)))
+MATCH_MEMORY = 1024 ** 3	# rough number of bytes one match needs (the engine plus two algos), used to size the pool
 
-	# print (''.join(['{}\n'.format(x) for x in str(output).split('\\r\\n')])[1:])
-	if str(error) != "b''":
-		print ('Error with match - {} {}:\n\tError:\n{}'.format(algo1, algo2, error))
+# Get location of this run file
+file_dir = os.path.dirname(os.path.realpath(__file__))
+parent_dir = os.path.abspath(os.path.join(file_dir, os.pardir, os.pardir))
+replay_dir = os.path.join(parent_dir, 'replays')
 
-def run_match(arg1='', arg2='', max_name_len=0):
-	# Get location of this run file
-	file_dir = os.path.dirname(os.path.realpath(__file__)).replace('\\contributions', '')
-	parent_dir = os.path.join(file_dir, os.pardir)
-	parent_dir = os.path.abspath(parent_dir)
+# Get if running in windows OS
+is_windows = sys.platform.startswith('win')
 
-	# Get if running in windows OS
-	is_windows = sys.platform.startswith('win')
 
+# returns the number of matches to run at once, one per core as long as there is enough free memory for them
+def default_workers():
+	workers = os.cpu_count() or 1
+	try:
+		with open('/proc/meminfo') as f:
+			for line in f:
+				if line.startswith('MemAvailable:'):
+					workers = min(workers, int(line.split()[1]) * 1024 // MATCH_MEMORY)
+	except (OSError, ValueError):
+		pass
+	return max(1, workers)
+
+# returns the command that runs a match between two algos
+def get_match_command(arg1='', arg2=''):
 	# Set default path for algos if script is run with no params
-	default_algo = parent_dir + "\\algos\\starter-algo-ZIPME\\run.ps1" if is_windows else parent_dir + "/algos/starter-algo-ZIPME/run.sh" 
+	default_algo = parent_dir + "\\algos\\starter-algo-ZIPME\\run.ps1" if is_windows else parent_dir + "/algos/starter-algo-ZIPME/run.sh"
 	algo1 = default_algo
 	algo2 = default_algo
 
@@ -140,7 +167,444 @@ def run_match(arg1='', arg2='', max_name_len=0):
 			trailing_char = "" if algo2.endswith('/') else "/"
 			algo2 = algo2 + trailing_char + "run.sh"
 
-	run_single_game("cd {} && java -jar engine.jar work {} {}".format(parent_dir, algo1, algo2), algo1.split('\\')[-2].replace('algos/',''),  algo2.split('\\')[-2].replace('algos/',''), max_name_len)
+	return "cd {} && java -jar engine.jar work {} {}".format(parent_dir, algo1, algo2)
+
+# returns the last line of a file without reading all of it
+def read_last_line(f_name, block=1 << 16):
+	with open(f_name, 'rb') as f:
+		f.seek(0, os.SEEK_END)
+		end = f.tell()
+		data = b''
+		while end > 0 and data.strip().count(b'\n') < 1:
+			start = max(0, end - block)
+			f.seek(start)
+			data = f.read(end - start) + data
+			end = start
+	return data.strip().split(b'\n')[-1].decode()
+
+# stops a match and the algos it started
+def kill_match(p):
+	try:
+		if is_windows:
+			subprocess.run('taskkill /F /T /PID {}'.format(p.pid), shell=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+		else:
+			os.killpg(p.pid, signal.SIGKILL)
+	except OSError:
+		pass
+	p.wait()
+
+
+# returns a hash of the contents of every file under a directory, or of a list of files
+def hash_files(paths):
+	h = hashlib.sha1()
+	for path in paths:
+		if os.path.isdir(path):
+			for root, dirs, files in os.walk(path):
+				dirs[:] = sorted(d for d in dirs if d != '__pycache__' and not d.startswith('.'))
+				for f in sorted(files):
+					if not f.endswith('.pyc'):
+						f_name = os.path.join(root, f)
+						h.update(os.path.relpath(f_name, path).replace('\\', '/').encode() + b'\0')
+						with open(f_name, 'rb') as f:
+							h.update(f.read())
+		elif os.path.exists(path):
+			h.update(os.path.basename(path).encode() + b'\0')
+			with open(path, 'rb') as f:
+				h.update(f.read())
+	return h.hexdigest()
+
+
+# Hashes the source of the algos and the engine, so that a result is only reused while the two algos,
+# the game config and engine.jar are all exactly what they were when the match was played
+class Fingerprints:
+	def __init__(self):
+		self.engine = hash_files([os.path.join(parent_dir, 'game-configs.json'), os.path.join(parent_dir, 'engine.jar')])
+		self.algos = {}
+
+	def algo(self, name):
+		if name not in self.algos:
+			self.algos[name] = hash_files([os.path.join(parent_dir, 'algos', name)])
+		return self.algos[name]
+
+	def match(self, match):
+		return hashlib.sha1('{} {} {}'.format(self.engine, self.algo(match[0]), self.algo(match[1])).encode()).hexdigest()
+
+
+# Keeps the result of every finished match in a JSONL file, one line per match.
+# Matches that already have a result are skipped when the arena is run again, as long as
+# neither algo nor the engine changed since, see Fingerprints. Results are keyed by the two algos in
+# either order, the seat of the first one and any game number, and every result is kept with its
+# fingerprint, so a match played again after an algo changes does not hide the results of the old version
+class Ledger:
+	def __init__(self, f_name, fingerprints=None):
+		self.fname = f_name
+		self.fingerprints = fingerprints
+		self.results = {}		# key -> fingerprint -> list of results, oldest first
+		self.lock = threading.Lock()
+
+		if os.path.exists(f_name):
+			with open(f_name) as f:
+				for line in f:
+					try:
+						result = json.loads(line)
+						self.add(result)
+					except (ValueError, KeyError, TypeError):
+						pass		# a line cut short when the arena was stopped
+
+	# the same key for a match whichever way round the algos are listed, with the seat of the first sorted algo
+	def key(self, match):
+		pair = tuple(sorted(match[:2]))
+		seat = 1 if match[0] == pair[0] else 2
+		return (pair, seat) + tuple(match[2:])
+
+	def fingerprint(self, match):
+		return self.fingerprints.match(match) if self.fingerprints is not None else None
+
+	def add(self, result):
+		fingerprint = result.get('hash') if self.fingerprints is not None else None
+		self.results.setdefault(self.key(result['match']), {}).setdefault(fingerprint, []).append(result)
+
+	# returns the latest successful result of a match for the current algos and engine, None if there is none
+	def result(self, match):
+		results = self.results.get(self.key(match), {}).get(self.fingerprint(match), [])
+		for result in reversed(results):
+			if result['status'] == 'ok':
+				return result
+		return None
+
+	def finished(self, match):
+		return self.result(match) is not None
+
+	# returns the replay files of the matches that have a result
+	def replays(self, matches):
+		replays = [self.result(match).get('replay') for match in matches if self.finished(match)]
+		return [f_name for f_name in replays if f_name and os.path.exists(f_name)]
+
+	def record(self, result):
+		with self.lock:
+			if self.fingerprints is not None:
+				result['hash'] = self.fingerprints.match(result['match'])
+			self.add(result)
+			with open(self.fname, 'a') as f:
+				f.write(json.dumps(result) + '\n')
+
+
+# Runs matches on a fixed number of worker threads that take them from a queue. Each match is a separate
+# engine process, so the threads only wait on it. Results are written to the ledger as soon as a match ends
+class Arena:
+	def __init__(self, ledger, workers, timeout=None, retries=1):
+		self.ledger = ledger
+		self.workers = workers
+		self.timeout = timeout
+		self.retries = retries
+
+		self.jobs = queue.Queue()
+		self.lock = threading.Lock()
+		self.running = {}			# match -> Popen of every match being played
+		self.claimed = set()		# replays already matched to a finished match
+		self.stopping = False
+		self.max_name_len = 0
+
+	# finds the replay a match just wrote, the newest unclaimed replay created after it started
+	def claim_replay(self, match, started):
+		with self.lock:
+			try:
+				replays = [os.path.join(replay_dir, f) for f in os.listdir(replay_dir) if f.endswith('.replay')]
+			except OSError:
+				return None
+			replays = [f for f in replays if f not in self.claimed and os.path.getmtime(f) >= started]
+			for f_name in sorted(replays, key=os.path.getmtime, reverse=True):
+				try:
+					end_stats = json.loads(read_last_line(f_name))['endStats']
+				except (OSError, ValueError, KeyError):
+					continue
+				names = (end_stats['player1'].get('name'), end_stats['player2'].get('name'))
+				if names == tuple(match[:2]) or len(replays) == 1 or self.workers == 1:
+					self.claimed.add(f_name)
+					return f_name, end_stats
+		return None
+
+	# plays a match once, returns its result
+	def play(self, match):
+		started = time.time()
+		with tempfile.TemporaryFile() as err:
+			p = subprocess.Popen(
+				get_match_command('algos/{}'.format(match[0]), 'algos/{}'.format(match[1])),
+				shell=True,
+				stdout=subprocess.DEVNULL,
+				stderr=err,
+				start_new_session=not is_windows
+				)
+			with self.lock:
+				self.running[match] = p
+			try:
+				p.wait(timeout=self.timeout)
+				status = 'ok' if p.returncode == 0 else 'error'
+			except subprocess.TimeoutExpired:
+				kill_match(p)
+				status = 'timeout'
+			with self.lock:
+				del self.running[match]
+
+			err.seek(0)
+			error = err.read()[-2000:].decode(errors='replace')
+
+		result = {'match': list(match), 'status': status, 'elapsed': round(time.time() - started, 2)}
+		replay = self.claim_replay(match, started) if status == 'ok' else None
+		if replay is not None:
+			f_name, end_stats = replay
+			result['replay'] = f_name
+			result['winner'] = end_stats['winner']
+			result['turns'] = end_stats.get('turns')
+			result['duration'] = end_stats.get('duration')
+		elif status == 'ok':
+			result['status'] = 'error'
+			error = error or 'no replay was written'
+		return result, error
+
+	# returns the next match to play, None when there are no more
+	def next_match(self):
+		try:
+			return self.jobs.get_nowait()
+		except queue.Empty:
+			return None
+
+	# called with the result of every match once it is in the ledger
+	def finished(self, match, result):
+		pass
+
+	# plays matches until there are no more
+	def worker(self):
+		while not self.stopping:
+			match = self.next_match()
+			if match is None:
+				return
+
+			print ('{: <30}{: <{fill}}   vs   {}'.format('Starting match:', match[0], match[1], fill=str(self.max_name_len)))
+			for attempt in range(self.retries + 1):
+				result, error = self.play(match)
+				result['attempts'] = attempt + 1
+				if result['status'] == 'ok' or self.stopping:
+					break
+
+			if self.stopping:
+				return
+			self.ledger.record(result)
+			print ('{: <30}{: <{fill}}   vs   {}'.format('Finished running match:', match[0], match[1], fill=str(self.max_name_len)))
+			if result['status'] != 'ok':
+				print ('Error with match - {} {} ({}):\n\tError:\n{}'.format(match[0], match[1], result['status'], error))
+			self.finished(match, result)
+
+	def run(self, matches):
+		matches = [tuple(match) for match in matches]
+		todo = [match for match in matches if not self.ledger.finished(match)]
+		if len(todo) < len(matches):
+			print ('Skipping {} matches already in {}'.format(len(matches) - len(todo), self.ledger.fname))
+		if len(todo) == 0:
+			return
+		self.max_name_len = len(max(todo, key=lambda e:len(e[0]))[0])
+
+		for match in todo:
+			self.jobs.put(match)
+		self.run_workers(min(self.workers, len(todo)))
+
+	# starts the worker threads and waits for them, stopping every match on Ctrl+C
+	def run_workers(self, count):
+		threads = [threading.Thread(target=self.worker, daemon=True) for _ in range(count)]
+		for thread in threads:
+			thread.start()
+		try:
+			while any(thread.is_alive() for thread in threads):
+				for thread in threads:
+					thread.join(.5)
+		except KeyboardInterrupt:
+			print ('\nStopping, finished matches are saved in {}'.format(self.ledger.fname))
+			self.stopping = True
+			with self.lock:
+				running = list(self.running.values())
+			for p in running:
+				kill_match(p)
+			raise
+
+
+# Decides whether one algo is stronger than another with a sequential probability ratio test on the
+# games they won against each other. The test is between the first algo being elo points stronger (H1)
+# and the second being elo points stronger (H0), which makes the log likelihood ratio a constant step
+# per decisive game, so it only depends on wins - losses. Draws and failed games carry no information
+class SPRT:
+	def __init__(self, elo=100, alpha=0.05, beta=0.05):
+		p = 1 / (1 + 10 ** (-elo / 400))		# chance that the stronger algo wins a decisive game
+		self.elo = elo
+		self.step = math.log(p / (1 - p))
+		self.lower = math.log(beta / (1 - alpha))
+		self.upper = math.log((1 - beta) / alpha)
+
+	def llr(self, wins, losses):
+		return (wins - losses) * self.step
+
+	# returns 1 if the first algo is stronger, 2 if the second one is, 0 if more games are needed
+	def decide(self, wins, losses):
+		llr = self.llr(wins, losses)
+		if llr >= self.upper:
+			return 1
+		if llr <= self.lower:
+			return 2
+		return 0
+
+
+# The games between two algos in a sequential arena. They are played in pairs with the sides swapped,
+# game 2n with the first algo as player 1 and game 2n+1 with the second, so neither side is favoured.
+# The test is only updated once both games of a pair are done
+class Pairing:
+	def __init__(self, algo1, algo2, sprt):
+		self.algos = (algo1, algo2)
+		self.sprt = sprt
+		self.winners = {}		# game number -> index of the algo that won it, None for a draw or failed game
+		self.wins = [0, 0]
+		self.draws = 0
+		self.scheduled = 0		# pairs of games scheduled
+		self.completed = 0		# pairs of games finished
+		self.decision = 0
+
+	# returns the matches counted towards the result
+	def games(self):
+		return [match for n in range(self.scheduled) for match in self.pair(n) if match[2] in self.winners]
+
+	# returns the two matches of a pair of games
+	def pair(self, n):
+		algo1, algo2 = self.algos
+		return [(algo1, algo2, 2 * n), (algo2, algo1, 2 * n + 1)]
+
+	def add(self, match, result):
+		winner = None
+		if result['status'] == 'ok' and result.get('winner') in (1, 2):
+			winner = self.algos.index(match[result['winner'] - 1])
+		self.winners[match[2]] = winner
+
+		first = match[2] - match[2] % 2
+		if first in self.winners and first + 1 in self.winners:
+			self.completed += 1
+			for game in (first, first + 1):
+				if self.winners[game] is None:
+					self.draws += 1
+				else:
+					self.wins[self.winners[game]] += 1
+			self.decision = self.sprt.decide(*self.wins)
+			return True
+		return False
+
+	def __str__(self):
+		return '{} vs {}: {}-{}, {} drawn or failed, LLR {:.2f} [{:.2f}, {:.2f}]'.format(
+			self.algos[0], self.algos[1], self.wins[0], self.wins[1], self.draws,
+			self.sprt.llr(*self.wins), self.sprt.lower, self.sprt.upper)
+
+
+# An arena that plays each pairing until the SPRT decides which algo is stronger, or until max_games.
+# Undecided pairings are played at the same time, and when there are fewer of them than workers,
+# several pairs of the same pairing are played at once. Games already in the ledger are reused
+class SequentialArena(Arena):
+	def __init__(self, ledger, workers, sprt, max_games=100, timeout=None, retries=1):
+		super().__init__(ledger, workers, timeout, retries)
+		self.sprt = sprt
+		self.max_pairs = max(1, max_games // 2)
+		self.pairings = []
+		self.pairing_of = {}				# (algo1, algo2) in either order -> Pairing
+		self.pending = collections.deque()	# matches waiting for a worker
+		self.outstanding = 0				# matches waiting or being played
+		self.changed = threading.Condition(self.lock)
+
+	# the number of pairs of games of a pairing to play at once
+	def width(self):
+		undecided = sum(1 for pairing in self.pairings if pairing.decision == 0 and pairing.completed < self.max_pairs)
+		return max(1, -(-self.workers // (2 * max(1, undecided))))
+
+	# schedules pairs of games of a pairing until it is decided, must be called with the lock held
+	def schedule(self, pairing):
+		while pairing.decision == 0 and pairing.scheduled < self.max_pairs and pairing.scheduled - pairing.completed < self.width():
+			for match in pairing.pair(pairing.scheduled):
+				if self.ledger.finished(match):
+					if pairing.add(match, self.ledger.result(match)):
+						self.report(pairing)
+				else:
+					self.pending.append(match)
+					self.outstanding += 1
+			pairing.scheduled += 1
+
+	def report(self, pairing):
+		status = 'undecided'
+		if pairing.decision:
+			status = '{} is stronger'.format(pairing.algos[pairing.decision - 1])
+		elif pairing.completed >= self.max_pairs:
+			status = 'no clear winner after {} games'.format(2 * pairing.completed)
+		print ('{} - {}'.format(pairing, status))
+
+	def next_match(self):
+		with self.changed:
+			while not self.stopping:
+				while self.pending:
+					match = self.pending.popleft()
+					if self.pairing_of[match[:2]].decision == 0:
+						return match
+					self.outstanding -= 1		# the pairing was decided while the match was waiting
+				if self.outstanding == 0:
+					return None
+				self.changed.wait()
+			return None
+
+	def finished(self, match, result):
+		with self.changed:
+			self.outstanding -= 1
+			pairing = self.pairing_of[match[:2]]
+			if pairing.decision == 0 and pairing.add(match, result):		# games that end after the decision are only kept in the ledger
+				self.report(pairing)
+			for pairing in self.pairings:
+				self.schedule(pairing)
+			self.changed.notify_all()
+
+	def run(self, matches):
+		for algo1, algo2 in matches:
+			pairing = Pairing(algo1, algo2, self.sprt)
+			self.pairings.append(pairing)
+			self.pairing_of[(algo1, algo2)] = self.pairing_of[(algo2, algo1)] = pairing
+		if len(self.pairings) == 0:
+			return
+		self.max_name_len = max(len(name) for pairing in self.pairings for name in pairing.algos)
+
+		with self.lock:
+			for pairing in self.pairings:
+				self.schedule(pairing)
+		self.run_workers(self.workers)
+
+		print ()
+		print ('Results:')
+		for pairing in self.pairings:
+			self.report(pairing)
+
+# runs every match on a pool of workers, skipping the ones the ledger already has an up to date result for,
+# returns the replay files of the matches
+def run_matches(matches, batch_size=None, timeout=None, retries=1, ledger=None):
+	ledger = Ledger(ledger or os.path.join(replay_dir, 'arena_ledger.jsonl'), Fingerprints())
+	workers = batch_size or default_workers()
+	print ('Running {} matches at a time'.format(workers))
+	Arena(ledger, workers, timeout, retries).run(matches)
+
+	print ()
+	print ('Finished all matches!')
+	print ()
+	return ledger.replays(matches)
+
+# plays every pairing until one of its algos is clearly stronger, returns the replay files of the games
+def run_sequential(matches, sprt, max_games=100, batch_size=None, timeout=None, retries=1, ledger=None):
+	ledger = Ledger(ledger or os.path.join(replay_dir, 'arena_ledger.jsonl'), Fingerprints())
+	workers = batch_size or default_workers()
+	print ('Running {} matches at a time, until an algo is {} elo stronger than the other'.format(workers, sprt.elo))
+	arena = SequentialArena(ledger, workers, sprt, max_games, timeout, retries)
+	arena.run(matches)
+
+	print ()
+	print ('Finished all matches!')
+	print ()
+	return ledger.replays([match for pairing in arena.pairings for match in pairing.games()])
 
 # handles all the arguments
 def parse_args():
@@ -162,8 +626,41 @@ def parse_args():
 	ap.add_argument(
 		"-b", "--batch",
 		type=int,
-		default=5,
-		help="number of games to run at a single time (on seperate threads)\n\n")
+		default=None,
+		help="number of games to run at a single time - defaults to the number of cores, fewer if there is not enough free memory\n\n")
+	ap.add_argument(
+		"-t", "--timeout",
+		type=float,
+		default=None,
+		help="number of seconds a game can run before it is stopped\n\n")
+	ap.add_argument(
+		"-r", "--retries",
+		type=int,
+		default=1,
+		help="number of times a game that failed or timed out is run again\n\n")
+	ap.add_argument(
+		"-l", "--ledger",
+		default='',
+		help="file the result of each game is written to - games already in it are not run again (default replays/arena_ledger.jsonl)\n\n")
+	ap.add_argument(
+		"--sprt",
+		action='store_true',
+		help="play each pair of algos repeatedly, with sides swapped, until one is clearly stronger\n\n")
+	ap.add_argument(
+		"--elo",
+		type=float,
+		default=100,
+		help="elo difference the --sprt test looks for, smaller differences need more games (default 100)\n\n")
+	ap.add_argument(
+		"--alpha",
+		type=float,
+		default=0.05,
+		help="chance the --sprt test picks the wrong algo as stronger (default 0.05)\n\n")
+	ap.add_argument(
+		"--max-games",
+		type=int,
+		default=100,
+		help="number of games after which --sprt gives up on a pair of algos (default 100)\n\n")
 	return vars(ap.parse_args())
 
 # called by the -a arg, runs every algo in directory
@@ -188,43 +685,6 @@ def run_from_file(filePath):
 		print ('File {} was not found'.format(filePath))
 		sys.exit()
 
-# returns the number of processess that are active
-def get_num_running(processes):
-	c = 0
-	for i, proc in processes.items():
-		if proc.is_alive():
-			c += 1
-	return c
-
-# starts a subprocess for each match up to batch_size and then starts them as they finish
-def run_matches(matches, batch_size):
-	tmp = copy.deepcopy(matches)
-	max_name_len = len(max(tmp, key=lambda e:len(e[0]))[0])
-
-	algos = []
-	processes = {}
-	i = 0
-	for match in matches:
-		algos.append((match[0],match[1]))
-		algo1 = 'algos/{}'.format(match[0])
-		algo2 = 'algos/{}'.format(match[1])
-		processes[i] = mp.Process(target=run_match, args=(algo1, algo2, max_name_len))
-		i += 1
-
-	for i in range(len(processes)):
-		print ('{: <30}{: <{fill}}   vs   {}'.format('Starting match:', algos[i][0], algos[i][1], fill=str(max_name_len)))
-		processes[i].start()
-		i += 1
-		while get_num_running(processes) >= batch_size:
-			time.sleep(.1)
-
-	while get_num_running(processes) > 0:
-			time.sleep(.1)
-
-	print ()
-	print ('Finished all matches!')
-	print ()
-
 if __name__ == '__main__':
 	args = parse_args() # get command line arguments
 
@@ -239,17 +699,24 @@ if __name__ == '__main__':
 		print ('No arguments - no action taken')
 		sys.exit()
 
+	matches = list(matches)
 	tmp = copy.deepcopy(matches)
-	run_matches(matches, args['batch'])		# run all matches
+	if args['sprt']:
+		sprt = SPRT(args['elo'], args['alpha'], args['alpha'])
+		replays = run_sequential(matches, sprt, args['max_games'], args['batch'], args['timeout'], args['retries'], args['ledger'])
+	else:
+		replays = run_matches(matches, args['batch'], args['timeout'], args['retries'], args['ledger'])		# run all matches
 
 	# if get_results is avalible, run a summary of the matches played
 	try:
 		args = {	'all':		False, 				\
 					'verbose':	False, 				\
 					'averages':	[], 				\
-					'file':		[],					\
+					'file':		replays,			\
 					'graph':	['wins'],	\
-					'num':		len(list(tmp))		\
+					'num':		len(replays) or len(list(tmp)),	\
+					'jobs':		os.cpu_count() or 1,	\
+					'reindex':	False				\
 				}
 		from get_results import main
 		main(args)
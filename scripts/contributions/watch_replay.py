@@ -299,6 +299,10 @@ def parse_args():
 		'-kt', '--keep_trying',
 		action='store_true',
 		help="forces the save file to keep trying different writers until one works - flag only works if you are saving a replay\n\n")
+	ap.add_argument(
+		'-j', '--jobs',
+		default=os.cpu_count() or 1,
+		help="number of processes used to summarize the replay files that are not displayed when more than one is given, defaults to the number of cores\n\n")
 	return vars(ap.parse_args())
 
 # stores all information for a single unit on the graph
@@ -829,20 +833,22 @@ class Graph:
 		try:
 			last_frame = max(self.data, key=lambda f: (f[0], f[1]))			# the last frame of the entire match (single number)
 			endStats = self.data[last_frame].data['endStats']				# here is where the error would be thrown - if endStats exists
-
-			# From here on we know we have all data for entire game - endStats exists
-
-			# if blit is on, do not create the slider
-			if not BLIT:
-				self.slider = Slider(self.fig.add_axes([0.6, 0.03, 0.3, 0.03]), 'Turn Slider', 0, self.num_frames, valfmt='%1i', valstep=1, color='w')
-				self.slider.on_changed(self.slider_active)
-				self.slider_exists = True 									# tracks whether the slider exists
-
-			self.info = Info(endStats, self.info_ax, True)					# create the Info (right side) with endStates information
-			self.real_time = False											# not longer running in real-time
+			self.end_game_init(endStats)
 		except KeyError as e:
 			self.info = Info(None, self.info_ax)							# endStats doesn't exist, create Info with default values
 
+	# called once we have all data for entire game - endStats exists
+	def end_game_init(self, endStats):
+		# if blit is on, do not create the slider
+		if not BLIT:
+			self.slider = Slider(self.fig.add_axes([0.6, 0.03, 0.3, 0.03]), 'Turn Slider', 0, self.num_frames, valfmt='%1i', valstep=1, color='w')
+			self.slider.on_changed(self.slider_active)
+			self.slider_exists = True 										# tracks whether the slider exists
+
+		self.info_ax.clear()												# clear the default player names
+		self.info = Info(endStats, self.info_ax, True)						# create the Info (right side) with endStates information
+		self.real_time = False												# not longer running in real-time
+
 	# change the interval speed between frames
 	def change_play_speed(self, speed):
 		self.speed = speed
@@ -999,19 +1005,19 @@ class Graph:
 	def data_stream(self):
 		while True:
 
-			# everything in this block (real-time) is extrememly inefficient, becuase it has to constantly load new data
+			# in real-time only the frames the engine has added since the last call are read, they are added to
+			# the same dicts and lists this graph already uses so nothing else has to be rebuilt
 			if self.real_time:
-				self.info_ax.clear()															# clear the inforation side
-
-				self.fh.load_files(1,False,args['file']) 										# load latest replay (again)
-				replay = self.fh.get_last_replay()												# get latest replay (again)
+				replay = self.fh.get_last_replay()
+				if replay.read_new_frames() > 0:												# read the new lines of the replay
+					self.num_frames = len(self.data)
+					if replay.end_stats != None:
+						self.end_game_init(replay.end_stats)									# the game is over, show the winner and the slider
 
 				# user paused game, don't advance
 				if not self.is_manual:
 					self.advance()
 
-				self.general_init(replay.frames, replay.frames_in_turn, replay.healths)			# call general initialization
-
 				# this is for the first call - cannot send before yield is reached (function called)
 				try:
 					self.frame_generator.send(self.num_frames)		# send the inverval generator the number of frames loaded
@@ -1149,6 +1155,8 @@ class Replay:
 		self.frames = {}				# dict containing all data, keys are turn, frame tuple with Frame objects as values
 		self.frames_in_turn = {}		# number of frames in each turn
 		self.healths = ([], [])			# contains the healths for player1 and player2
+		self.end_stats = None			# the endStats of the match, None until the engine has written them
+		self.offset = 0					# the number of bytes of the file that have been read
 
 		self.load_data()				# handles loading all the data from file into python variables
 
@@ -1163,30 +1171,52 @@ class Replay:
 
 	# loads all data from a replay into the python variables
 	def load_data(self):
-		with open(self.fname) as f:
-			i = 0
-			for line in f:
-				line = line.replace("\n", "")
-				line = line.replace("\t", "")
-
-				if (line != ''):
-					data = json.loads(line)
-
-					try:
-						data['debug']
-						self.ref = data
-					except:
-						turn_num = data['turnInfo'][1]
-						frame_num = data['turnInfo'][2]
-						self.frames[(turn_num, frame_num)] = Frame(turn_num, frame_num, data)
-
-						self.healths[0].append(data['p1Stats'][0])
-						self.healths[1].append(data['p2Stats'][0])
-
-						try:
-							self.frames_in_turn[turn_num] += 1
-						except KeyError:
-							self.frames_in_turn[turn_num] = 1
+		self.read_new_frames()
+
+	# reads the lines added to the file since the last call, returns the number of new frames.
+	# this is how real-time mode follows a replay as the engine writes it, without parsing it all again
+	def read_new_frames(self):
+		with open(self.fname, 'rb') as f:
+			f.seek(self.offset)
+			new_data = f.read()
+
+		lines = new_data.split(b'\n')
+		tail = lines.pop()						# whatever follows the last newline, it may still be being written
+		try:
+			if tail.strip() != b'':
+				json.loads(tail.decode())
+			lines.append(tail)
+			self.offset += len(new_data)
+		except ValueError:
+			self.offset += len(new_data) - len(tail)
+
+		num_frames = len(self.frames)
+		for line in lines:
+			line = line.decode().replace("\t", "").strip()
+			if line != '':
+				self.add_line(json.loads(line))
+		return len(self.frames) - num_frames
+
+	# adds a single line of the replay to the python variables
+	def add_line(self, data):
+		try:
+			data['debug']
+			self.ref = data
+		except:
+			turn_num = data['turnInfo'][1]
+			frame_num = data['turnInfo'][2]
+			self.frames[(turn_num, frame_num)] = Frame(turn_num, frame_num, data)
+
+			self.healths[0].append(data['p1Stats'][0])
+			self.healths[1].append(data['p2Stats'][0])
+
+			try:
+				self.frames_in_turn[turn_num] += 1
+			except KeyError:
+				self.frames_in_turn[turn_num] = 1
+
+			if 'endStats' in data:
+				self.end_stats = data['endStats']
 
 # handles opening multiple games (replays)
 class FileHandler:
@@ -1213,17 +1243,44 @@ class FileHandler:
 			return files
 		return files[:num]
 
-	def load_files(self, num=1, a=False, f_names=[]):
+	# loads the replay that is displayed, the first one given or the latest one.
+	# any other replays are only summarized, up to jobs of them at once in worker processes,
+	# so their frames are parsed in the workers and only a line of text is sent back
+	def load_files(self, num=1, a=False, f_names=[], jobs=1):
 		self.replays = []
+		self.summaries = []
 		if len(f_names) > 0:
-			for f_name in f_names:
-				if f_name.find('replays') == -1:
-					self.replays.append(Replay('replays/'+f_name))
-				else:
-					self.replays.append(Replay(f_name))
+			f_names = [f_name if f_name.find('replays') != -1 else 'replays/'+f_name for f_name in f_names]
 		else:
-			for f_name in self.__latest_replays(num, a):
-				self.replays.append(Replay(f_name))
+			f_names = self.__latest_replays(num, a)
+		if len(f_names) == 0:
+			return
+
+		others = f_names[1:]
+		if jobs <= 1 or len(others) <= 1:
+			self.replays = [Replay(f_names[0])]
+			self.summaries = [summarize_replay(f_name) for f_name in others]
+		else:
+			pool = mp.Pool(min(jobs, len(others)))
+			try:
+				summaries = pool.imap(summarize_replay, others)
+				self.replays = [Replay(f_names[0])]					# parsed while the workers summarize the others
+				self.summaries = list(summaries)
+			finally:
+				pool.close()
+				pool.join()
+
+		for summary in self.summaries:
+			print (summary)
+
+# parses a replay and describes it in one line, run in worker processes for the replays that are not displayed
+def summarize_replay(f_name):
+	replay = Replay(f_name)
+	summary = '{}: {} turns, {} frames'.format(f_name, len(replay.frames_in_turn), len(replay.frames))
+	if replay.end_stats is not None:
+		winner = replay.end_stats['winner']
+		summary += ', winner {}'.format(replay.end_stats['player1']['name'] if winner == 1 else replay.end_stats['player2']['name'])
+	return summary + ' (not displayed)'
 
 
 # This is all almost directly copied from run_match.py
@@ -1333,7 +1390,7 @@ def main(args):
 			print ('You specified to keep trying writers, but it will not be used since you are not saving the animation')
 
 		fh = FileHandler()																			# create a file handler object
-		fh.load_files(1,False,args['file'])															# load latest replay
+		fh.load_files(1,False,args['file'],int(args['jobs']))										# load latest replay
 		replay = fh.get_last_replay()																# get latest replay
 
 		animatedReplay = Graph(replay.frames, replay.frames_in_turn, replay.healths, writers, keep_trying, save=save)		# create our Graph object
@@ -7,23 +7,60 @@ It contains functions that let you get information about resources, deploy units
 The GameMap class in game_map.py represents the current game map. It can be used to access information related to the locations of units. 
 Investigating it is useful for any player that wants to access more information about the current state of the game. \n
 
+The GameRules class in rules.py holds the unit constants and cost tables of the game config. It is built once per game and shared by every GameState. \n
+
 The GameUnit class in unit.py represents a single unit. 
 Investigating it is useful for any player that wants to access information about units. \n
 
 The AlgoCore class in algocore.py handles communication with the game engine, and forms the bones of an algo. AlgoStrategy inherits from it. 
 Investigating it is useful for advanced players interested in getting data from the action phase or communicating directly with the game engine. \n
 
+The ActionFrame class in action_frame.py is the action frame string passed to on_action_frame. It decodes only the sections you ask for. \n
+
+The TurnBudget class in budget.py tracks the time used by the current turn. AlgoCore makes one available to on_turn as self.turn_budget. \n
+
+The History class in history.py records spawns, breaches, structure deaths and resources of recent turns, see AlgoCore.enable_history. \n
+
+The SpeculationWorker class in speculation.py runs AlgoCore.speculate on action frames in a background thread, see AlgoCore.enable_speculation. \n
+
+The TranspositionTable class in transposition.py keeps results keyed by GameMap.zobrist, a hash of the structures on the board. 
+GameState.transpositions is shared by every GameState of a game, so pathing, threat maps and your own results are reused when a board comes back. \n
+
 The Navigation class in navigation.py contains functions related to path-finding, which are used by GameState in pathing related functions. 
 Investigating it is useful for advanced player who want to optimize the slow default pathing algorithm we provide. \n 
 
+The ThreatMap class in threat_map.py holds the damage enemy structures deal to mobile units on every location of the map.
+Get one from GameState.get_threat_map to cheaply estimate how much damage a path will take. \n
+
+The ActionSimulator class in simulator.py fast-forwards the action phase of a turn on a copy of the board.
+Use it to compare candidate attacks by the breaches and structure damage they would cause. \n
+
+decoder.py decodes game state strings from the engine, using orjson when it is installed. 
+Run python -m gamelib.benchmark with replay files to measure the parse cost per turn. \n
+
+The AttackEvaluator class in evaluator.py scores many candidate attacks in parallel across a process pool. Create it in on_game_start. \n
+
+The HeadlessEngine class in engine.py plays a match between two algos in one process, without engine.jar, for fast self-play. 
+Run python -m gamelib.selfplay with two algo folders to play them against each other. \n
+
+The Tuner class in tuner.py searches for the values of strategy constants that win the most self-play games, with successive halving. 
+Run python -m gamelib.tuner with an algo folder, a json file of parameter ranges and opponent folders. \n
+
 util.py contains a small handful of functions that help with communication, including the debug-printing function, debug_write().
 """
 
 from .algocore import AlgoCore
+from .action_frame import ActionFrame
+from .budget import TurnBudget
 from .util import debug_write
 from .game_state import GameState
+from .rules import GameRules
 from .unit import GameUnit
 from .game_map import GameMap
 from .navigation import ShortestPathFinder
+from .threat_map import ThreatMap
+from .simulator import ActionSimulator
+from .engine import HeadlessEngine
+from .transposition import TranspositionTable
 
-__all__ = ["algocore", "game_state", "game_map", "navigation", "unit", "util"]
\ No newline at end of file
+__all__ = ["action_frame", "algocore", "budget", "decoder", "engine", "evaluator", "game_state", "game_map", "history", "navigation", "rules", "selfplay", "simulator", "speculation", "threat_map", "transposition", "tuner", "unit", "util"]
\ No newline at end of file
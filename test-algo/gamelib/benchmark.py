@@ -0,0 +1,82 @@
+"""
+Measures the cost of parsing recorded turn states.
+
+Usage: python -m gamelib.benchmark replay_file [replay_file ...]
+"""
+
+import json
+import sys
+import time
+
+from .decoder import BACKEND, decode_state
+from .game_state import GameState
+
+
+def read_turn_strings(path):
+    """Reads the game config and the turn states (not action frames) of a replay file
+
+    Args:
+        path: A replay file, one json message per line
+
+    Returns:
+        (config, list of turn state strings), the config is None if the file does not have one
+
+    """
+    config = None
+    turn_strings = []
+    with open(path) as replay:
+        for line in replay:
+            line = line.strip()
+            if not line:
+                continue
+            if "replaySave" in line and config is None:
+                config = json.loads(line)
+            elif '"turnInfo":[0,' in line.replace(" ", ""):
+                turn_strings.append(line)
+    return config, turn_strings
+
+
+def benchmark(paths, repeat=5):
+    """Times parsing every turn state of some replays, with json.loads and with decode_state, and building GameStates
+
+    Args:
+        paths: Replay files
+        repeat: The number of times each measurement is repeated, the fastest run is kept
+
+    Returns:
+        A dict of the number of turns and the seconds per turn of each measurement
+
+    """
+    games = [read_turn_strings(path) for path in paths]
+    games = [(config, turns) for config, turns in games if config is not None and turns]
+    turn_count = sum(len(turns) for _, turns in games)
+    if not turn_count:
+        return {"turns": 0}
+
+    def best_of(function):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for config, turns in games:
+                for turn_string in turns:
+                    function(config, turn_string)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best / turn_count
+
+    return {
+        "turns": turn_count,
+        "json.loads": best_of(lambda config, turn_string: json.loads(turn_string)),
+        "decode_state ({})".format(BACKEND): best_of(lambda config, turn_string: decode_state(turn_string)),
+        "GameState": best_of(lambda config, turn_string: GameState(config, turn_string)),
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python -m gamelib.benchmark replay_file [replay_file ...]")
+        sys.exit(1)
+    results = benchmark(sys.argv[1:])
+    print("{} turns".format(results.pop("turns")))
+    for name, seconds in results.items():
+        print("{:>24}: {:8.1f} us per turn".format(name, seconds * 1e6))
@@ -1,7 +1,67 @@
 import math
+import random
+from array import array
 from .unit import GameUnit
 from .util import debug_write
 
+
+def _build_in_bounds_mask(arena_size):
+    """Builds a flat mask of the diamond shaped board, indexed by x * arena_size + y
+    """
+    half_arena = arena_size // 2
+    mask = bytearray(arena_size * arena_size)
+    for y in range(arena_size):
+        row_size = y + 1 if y < half_arena else arena_size - y
+        for x in range(half_arena - row_size, half_arena + row_size):
+            mask[x * arena_size + y] = 1
+    return bytes(mask)
+
+IN_BOUNDS_MASK = _build_in_bounds_mask(28)
+
+# Shared by every GameMap: disc offsets keyed by (radius, getHitRadius), and the in bounds
+# flat indices of those discs keyed by (x, y, radius, getHitRadius)
+_RANGE_OFFSETS = {}
+_RANGE_INDICES = {}
+
+# Zobrist keys of every (location, owner, upgraded) combination keyed by structure type code. They come from
+# a fixed seed, so equal boards get equal hashes in every process and every game
+_ZOBRIST_KEYS = {}
+
+
+def _zobrist_keys(code):
+    keys = _ZOBRIST_KEYS.get(code)
+    if keys is None:
+        rng = random.Random("zobrist {}".format(code))
+        keys = tuple(rng.getrandbits(64) for _ in range(28 * 28 * 4))
+        _ZOBRIST_KEYS[code] = keys
+    return keys
+
+
+def get_range_offsets(radius, get_hit_radius):
+    """Gets the (dx, dy) offsets of every location in range of a center location, ordered by dx and then dy.
+
+    Args:
+        radius: The radius of the search area
+        get_hit_radius: The getHitRadius of units, added to the radius
+
+    Returns:
+        A tuple of (dx, dy) offsets, cached for every later call with the same arguments
+
+    """
+    key = (radius, get_hit_radius)
+    offsets = _RANGE_OFFSETS.get(key)
+    if offsets is None:
+        search_radius = math.ceil(radius)
+        offsets = []
+        for i in range(-search_radius, search_radius + 1):
+            for j in range(-search_radius, search_radius + 1):
+                # A unit with a given range affects all locations whose centers are within that range + get hit radius
+                if math.sqrt(i ** 2 + j ** 2) < radius + get_hit_radius:
+                    offsets.append((i, j))
+        offsets = tuple(offsets)
+        _RANGE_OFFSETS[key] = offsets
+    return offsets
+
 class GameMap:
     """Holds data about the current game map and provides functions
     useful for getting information related to the map.
@@ -9,6 +69,15 @@ class GameMap:
     game_map[x, y] will return a list of Units located at that location, 
     or an empty list if there are no units at the location
 
+    Alongside the lists of units, the map keeps a compact occupancy grid of the structures on the board.
+    The grid is flat and indexed by x * ARENA_SIZE + y, and is kept in sync by add_unit, remove_unit and
+    assignments through game_map[x, y]. If you modify the units at a location in place, call sync_location
+    afterwards so the grid reflects your change.
+
+    copy() returns a copy of the map that shares its columns of units with the original until either map
+    changes them through add_unit, remove_unit or game_map[x, y] assignments. Units themselves are shared,
+    so do not change the units of a copied map in place.
+
     Attributes :
         * config (JSON): Contains information about the current game rules
         * enable_warnings (bool): If true, debug messages for game_map functions will print out
@@ -18,6 +87,13 @@ class GameMap:
         * TOP_LEFT (int): A constant that represents the top left edge
         * BOTTOM_LEFT (int): Hidden challenge! Can you guess what this constant represents???
         * BOTTOM_RIGHT (int): A constant that represents the bottom right edge
+        * structure_grid (bytearray): Per location, 0 if empty, otherwise 1 + the config index of the structure type
+        * owner_grid (bytearray): Per location, the player index owning the structure
+        * upgraded_grid (bytearray): Per location, 1 if the structure is upgraded
+        * health_grid (array): Per location, the health of the structure
+        * version (int): Incremented every time the occupancy grid changes, used to invalidate cached pathing
+        * zobrist (int): A 64 bit hash of the type, owner and upgraded state of every structure, equal for equal boards.
+          It is updated incrementally with the occupancy grid, call rehash after writing the grid directly
 
     """
     def __init__(self, config):
@@ -36,7 +112,18 @@ class GameMap:
         self.BOTTOM_LEFT = 2
         self.BOTTOM_RIGHT = 3
         self.__map = self.__empty_grid()
+        self.__owned_columns = [True] * self.ARENA_SIZE
         self.__start = [13,0]
+        self.__get_hit_radius = config["unitInformation"][0]['getHitRadius']
+        self.__type_codes = {}
+        for index, unit_information in enumerate(config["unitInformation"]):
+            self.__type_codes[unit_information.get("shorthand")] = index + 1
+        self.structure_grid = bytearray(self.ARENA_SIZE * self.ARENA_SIZE)
+        self.owner_grid = bytearray(self.ARENA_SIZE * self.ARENA_SIZE)
+        self.upgraded_grid = bytearray(self.ARENA_SIZE * self.ARENA_SIZE)
+        self.health_grid = array('d', bytes(8 * self.ARENA_SIZE * self.ARENA_SIZE))
+        self.version = 0
+        self.zobrist = 0
     
     def __getitem__(self, location):
         if len(location) == 2 and self.in_arena_bounds(location):
@@ -46,7 +133,9 @@ class GameMap:
 
     def __setitem__(self, location, val):
         if type(location) == tuple and len(location) == 2 and self.in_arena_bounds(location):
+            self.__own_column(location[0])
             self.__map[location[0]][location[1]] = val
+            self.sync_location(location)
             return
         self._invalid_coordinates(location)
 
@@ -75,6 +164,50 @@ class GameMap:
                 grid[x].append([])
         return grid
 
+    def __own_column(self, x):
+        """Copies a column of unit lists shared with another map before it is changed
+        """
+        if not self.__owned_columns[x]:
+            self.__map[x] = [list(units) for units in self.__map[x]]
+            self.__owned_columns[x] = True
+
+    def copy(self):
+        """Copies the map. Columns of units are shared and only copied when one of the maps changes them.
+
+        Returns:
+            A new GameMap with the same units and occupancy grid
+
+        """
+        copied = GameMap.__new__(GameMap)
+        copied.__dict__.update(self.__dict__)
+        copied.__map = list(self.__map)
+        copied.__owned_columns = [False] * self.ARENA_SIZE
+        self.__owned_columns = [False] * self.ARENA_SIZE
+        copied.__start = [13,0]
+        copied.structure_grid = bytearray(self.structure_grid)
+        copied.owner_grid = bytearray(self.owner_grid)
+        copied.upgraded_grid = bytearray(self.upgraded_grid)
+        copied.health_grid = array('d', self.health_grid)
+        return copied
+
+    def restore(self, other):
+        """Replaces the units on this map with those of another map, such as a copy made earlier.
+
+        Args:
+            other: The GameMap to restore units and the occupancy grid from
+
+        The version is increased rather than restored, so cached pathing and threat maps refresh.
+        """
+        self.__map = list(other.__map)
+        self.__owned_columns = [False] * self.ARENA_SIZE
+        other.__owned_columns = [False] * self.ARENA_SIZE
+        self.structure_grid[:] = other.structure_grid
+        self.owner_grid[:] = other.owner_grid
+        self.upgraded_grid[:] = other.upgraded_grid
+        self.health_grid[:] = other.health_grid
+        self.zobrist = other.zobrist
+        self.version = max(self.version, other.version) + 1
+
     def _invalid_coordinates(self, location):
         self.warn("{} is out of bounds.".format(str(location)))
 
@@ -89,6 +222,8 @@ class GameMap:
         
         """
         x, y = location
+        if type(x) == int and type(y) == int:
+            return 0 <= x < self.ARENA_SIZE and 0 <= y < self.ARENA_SIZE and IN_BOUNDS_MASK[x * self.ARENA_SIZE + y] == 1
         half_board = self.HALF_ARENA
 
         row_size = y + 1
@@ -168,10 +303,12 @@ class GameMap:
 
         x, y = location
         new_unit = GameUnit(unit_type, self.config, player_index, None, location[0], location[1])
+        self.__own_column(x)
         if not new_unit.stationary:
             self.__map[x][y].append(new_unit)
         else:
             self.__map[x][y] = [new_unit]
+            self.sync_location(location)
 
     def remove_unit(self, location):
         """Remove all units on the map in the given location.
@@ -186,7 +323,168 @@ class GameMap:
             self._invalid_coordinates(location)
         
         x, y = location
+        self.__own_column(x)
         self.__map[x][y] = []
+        self.sync_location(location)
+
+    def sync_location(self, location):
+        """Refreshes the occupancy grid at a location from the units stored there.
+
+        Args:
+            location: The location whose units were changed
+
+        Called automatically by add_unit, remove_unit and game_map[x, y] assignments. Call it yourself
+        after changing the units at a location in place, for example after upgrading one.
+        """
+        x, y = map(int, location)
+        if not (0 <= x < self.ARENA_SIZE and 0 <= y < self.ARENA_SIZE):
+            return
+        index = x * self.ARENA_SIZE + y
+        self.version += 1
+        self.zobrist ^= self.__cell_hash(index)
+        for unit in self.__map[x][y]:
+            if unit.stationary:
+                self.structure_grid[index] = self.__type_codes.get(unit.unit_type, 0)
+                self.owner_grid[index] = unit.player_index or 0
+                self.upgraded_grid[index] = 1 if unit.upgraded else 0
+                self.health_grid[index] = unit.health
+                break
+        else:
+            self.structure_grid[index] = 0
+            self.owner_grid[index] = 0
+            self.upgraded_grid[index] = 0
+            self.health_grid[index] = 0
+        self.zobrist ^= self.__cell_hash(index)
+
+    def __cell_hash(self, index):
+        """The zobrist key of the structure at a flat index, 0 if there is none
+        """
+        code = self.structure_grid[index]
+        if not code:
+            return 0
+        return _zobrist_keys(code)[index * 4 + self.owner_grid[index] * 2 + self.upgraded_grid[index]]
+
+    def rehash(self):
+        """Recomputes zobrist from the whole occupancy grid, for after the grid was written directly
+
+        Returns:
+            The new zobrist hash
+
+        """
+        zobrist = 0
+        for index, code in enumerate(self.structure_grid):
+            if code:
+                zobrist ^= self.__cell_hash(index)
+        self.zobrist = zobrist
+        return zobrist
+
+    def is_blocked(self, location):
+        """Checks if a structure occupies the given location using the occupancy grid.
+
+        Args:
+            location: A map location
+
+        Returns:
+            True if there is a structure at the location, False otherwise (including out of bounds locations)
+
+        """
+        x, y = location
+        if not self.in_arena_bounds(location):
+            return False
+        return self.structure_grid[int(x) * self.ARENA_SIZE + int(y)] != 0
+
+    def blocked_mask(self):
+        """Gets a copy of the occupancy grid as a flat mask of blocked locations.
+
+        Returns:
+            A bytearray indexed by x * ARENA_SIZE + y, 1 where a structure stands and 0 elsewhere
+
+        """
+        return bytearray(1 if code else 0 for code in self.structure_grid)
+
+    def __matches_owner(self, index, player_index):
+        return player_index is None or self.owner_grid[index] == player_index
+
+    def __structure_indices(self, unit_type=None):
+        """Flat indices of all structures, or only those of unit_type, in ascending order
+        """
+        if unit_type is not None:
+            codes = [self.__type_codes.get(unit_type)]
+            if codes[0] is None:
+                self.warn("Invalid unit type {} passed to a structure query.".format(unit_type))
+                return []
+        else:
+            codes = sorted(set(self.structure_grid) - {0})
+        indices = []
+        for code in codes:
+            index = self.structure_grid.find(code)
+            while index != -1:
+                indices.append(index)
+                index = self.structure_grid.find(code, index + 1)
+        if len(codes) > 1:
+            indices.sort()
+        return indices
+
+    def get_structure_locations(self, unit_type=None, player_index=None):
+        """Gets the locations of every structure matching the given filters, for example all enemy turrets.
+
+        Args:
+            unit_type: Only return structures of this type. All structure types if None.
+            player_index: Only return structures owned by this player. Both players if None.
+
+        Returns:
+            A list of (x, y) tuples, ordered by x and then y
+
+        """
+        size = self.ARENA_SIZE
+        return [(index // size, index % size) for index in self.__structure_indices(unit_type)
+                if self.__matches_owner(index, player_index)]
+
+    def count_structures(self, unit_type=None, player_index=None):
+        """Counts the structures matching the given filters.
+
+        Args:
+            unit_type: Only count structures of this type. All structure types if None.
+            player_index: Only count structures owned by this player. Both players if None.
+
+        Returns:
+            The number of matching structures on the map
+
+        """
+        if player_index is None and unit_type is not None and unit_type in self.__type_codes:
+            return self.structure_grid.count(self.__type_codes[unit_type])
+        return len(self.get_structure_locations(unit_type, player_index))
+
+    def get_structures_in_region(self, x_range, y_range, unit_type=None, player_index=None):
+        """Gets the locations of structures inside a rectangular region.
+
+        Args:
+            x_range: Inclusive (min_x, max_x) of the region
+            y_range: Inclusive (min_y, max_y) of the region
+            unit_type: Only return structures of this type. All structure types if None.
+            player_index: Only return structures owned by this player. Both players if None.
+
+        Returns:
+            A list of (x, y) tuples, ordered by x and then y
+
+        """
+        size = self.ARENA_SIZE
+        min_x, max_x = max(0, int(x_range[0])), min(size - 1, int(x_range[1]))
+        min_y, max_y = max(0, int(y_range[0])), min(size - 1, int(y_range[1]))
+        code = None
+        if unit_type is not None:
+            code = self.__type_codes.get(unit_type)
+            if code is None:
+                self.warn("Invalid unit type {} passed to a structure query.".format(unit_type))
+                return []
+        locations = []
+        for x in range(min_x, max_x + 1):
+            column = x * size
+            for y in range(min_y, max_y + 1):
+                found = self.structure_grid[column + y]
+                if found and (code is None or found == code) and self.__matches_owner(column + y, player_index):
+                    locations.append((x, y))
+        return locations
 
     def get_locations_in_range(self, location, radius):
         """Gets locations in a circular area around a location
@@ -205,17 +503,106 @@ class GameMap:
             self._invalid_coordinates(location)
 
         x, y = location
+        if type(x) == int and type(y) == int:
+            size = self.ARENA_SIZE
+            return [[index // size, index % size] for index in self.get_indices_in_range(location, radius)]
+
         locations = []
         search_radius = math.ceil(radius)
-        getHitRadius = self.config["unitInformation"][0]['getHitRadius']
         for i in range(int(x - search_radius), int(x + search_radius + 1)):
             for j in range(int(y - search_radius), int(y + search_radius + 1)):
                 new_location = [i, j]
                 # A unit with a given range affects all locations whose centers are within that range + get hit radius
-                if self.in_arena_bounds(new_location) and self.distance_between_locations(location, new_location) < radius + getHitRadius:
+                if self.in_arena_bounds(new_location) and self.distance_between_locations(location, new_location) < radius + self.__get_hit_radius:
                     locations.append(new_location)
         return locations
 
+    def get_indices_in_range(self, location, radius):
+        """Gets locations in a circular area around a location as flat indices, x * ARENA_SIZE + y.
+        This is a table lookup after the first call for a given location and radius, so prefer it in hot loops.
+
+        Args:
+            location: The center of our search area, with integer coordinates
+            radius: The radius of our search area
+
+        Returns:
+            A tuple of the flat indices of the in bounds locations within our search area, ordered by x and then y
+
+        """
+        x, y = map(int, location)
+        size = self.ARENA_SIZE
+        key = (x, y, radius, self.__get_hit_radius)
+        indices = _RANGE_INDICES.get(key)
+        if indices is None:
+            indices = []
+            for dx, dy in get_range_offsets(radius, self.__get_hit_radius):
+                i, j = x + dx, y + dy
+                if 0 <= i < size and 0 <= j < size and IN_BOUNDS_MASK[i * size + j]:
+                    indices.append(i * size + j)
+            indices = tuple(indices)
+            if 0 <= x < size and 0 <= y < size:
+                _RANGE_INDICES[key] = indices
+        return indices
+
+    def get_units_at_index(self, index):
+        """Gets the list of units at a flat index, x * ARENA_SIZE + y, without bounds checks
+
+        Args:
+            index: A flat index, such as one returned by get_indices_in_range
+
+        Returns:
+            The list of units at the location
+
+        """
+        return self.__map[index // self.ARENA_SIZE][index % self.ARENA_SIZE]
+
+    def load_units(self, units, player_index, remove_type=None, upgrade_type=None):
+        """Adds one player's units as sent by the engine, writing the occupancy grid directly.
+
+        Args:
+            units: The engine's per type unit lists, such as the p1Units section of a game state
+            player_index: The player controlling the units, 0 for you 1 for the enemy
+            remove_type: The shorthand of removals, those entries flag the structure at their location for removal
+            upgrade_type: The shorthand of upgrades, those entries upgrade the structure at their location
+
+        Removal and upgrade entries are expected after the unit types, as the engine sends them.
+        """
+        unit_information = self.config["unitInformation"]
+        size = self.ARENA_SIZE
+        for type_index, unit_list in enumerate(units):
+            if not unit_list:
+                continue
+            unit_type = unit_information[type_index].get("shorthand")
+            for unit_data in unit_list:
+                x = int(unit_data[0])
+                y = int(unit_data[1])
+                index = x * size + y
+                if unit_type == remove_type or unit_type == upgrade_type:
+                    if not self.structure_grid[index]:
+                        continue
+                    for unit in self.__map[x][y]:
+                        if unit.stationary:
+                            if unit_type == remove_type:
+                                unit.pending_removal = True
+                            else:
+                                unit.upgrade()
+                                self.zobrist ^= self.__cell_hash(index)
+                                self.upgraded_grid[index] = 1
+                                self.zobrist ^= self.__cell_hash(index)
+                            break
+                    continue
+                self.__own_column(x)
+                unit = GameUnit(unit_type, self.config, player_index, float(unit_data[2]), x, y)
+                self.__map[x][y].append(unit)
+                if unit.stationary:
+                    self.zobrist ^= self.__cell_hash(index)
+                    self.structure_grid[index] = self.__type_codes.get(unit_type, 0)
+                    self.owner_grid[index] = player_index
+                    self.upgraded_grid[index] = 0
+                    self.health_grid[index] = unit.health
+                    self.zobrist ^= self.__cell_hash(index)
+        self.version += 1
+
     def distance_between_locations(self, location_1, location_2):
         """Euclidean distance
 
@@ -1,37 +1,26 @@
 import math
 import json
 import sys
+import copy
+from contextlib import contextmanager
 
 from .navigation import ShortestPathFinder
 from .util import send_command, debug_write
 from .unit import GameUnit
 from .game_map import GameMap
-
-def is_stationary(unit_type):
-    """
-        Args:
-            unit_type: A unit type
-        
-        Returns: 
-            Boolean, True if the unit is stationary, False otherwise.
-    """
-    return unit_type in STRUCTURE_TYPES
+from .threat_map import ThreatMap
+from .rules import GameRules, SP, MP
+from .decoder import decode_state
+from .transposition import TranspositionTable
 
 class GameState:
     """Represents the entire gamestate for a given turn
     Provides methods related to resources and unit deployment
 
     Attributes :
-        * UNIT_TYPE_TO_INDEX (dict): Maps a unit to a corresponding index
-        * WALL (str): A constant representing the wall unit
-        * SUPPORT (str): A constant representing the support unit
-        * TURRET (str): A constant representing the turret unit
-        * SCOUT (str): A constant representing the scout unit
-        * DEMOLISHER (str): A constant representing the demolisher unit
-        * INTERCEPTOR (str): A constant representing the interceptor unit
-        * REMOVE (str): A constant representing removing your own unit
-        * UPGRADE (str): A constant representing upgrading a unit
-        * STRUCTURE_TYPES (list): A list of the structure units
+        * rules (:obj: GameRules): The unit constants and cost tables of the game config, shared by every GameState of a game
+        * transpositions (:obj: TranspositionTable): Results keyed by board hash, shared by every GameState of a game.
+          Pathing and threat maps are kept there, and you can keep your own results there under game_map.zobrist
 
         * ARENA_SIZE (int): The size of the arena
         * HALF_ARENA (int): Half the size of the arena
@@ -59,38 +48,18 @@ class GameState:
         self.config = config
         self.enable_warnings = True
 
-        global WALL, SUPPORT, TURRET, SCOUT, DEMOLISHER, INTERCEPTOR, REMOVE, UPGRADE, STRUCTURE_TYPES, ALL_UNITS, UNIT_TYPE_TO_INDEX
-        UNIT_TYPE_TO_INDEX = {}
-        WALL = config["unitInformation"][0]["shorthand"]
-        UNIT_TYPE_TO_INDEX[WALL] = 0
-        SUPPORT = config["unitInformation"][1]["shorthand"]
-        UNIT_TYPE_TO_INDEX[SUPPORT] = 1
-        TURRET = config["unitInformation"][2]["shorthand"]
-        UNIT_TYPE_TO_INDEX[TURRET] = 2
-        SCOUT = config["unitInformation"][3]["shorthand"]
-        UNIT_TYPE_TO_INDEX[SCOUT] = 3
-        DEMOLISHER = config["unitInformation"][4]["shorthand"]
-        UNIT_TYPE_TO_INDEX[DEMOLISHER] = 4
-        INTERCEPTOR = config["unitInformation"][5]["shorthand"]
-        UNIT_TYPE_TO_INDEX[INTERCEPTOR] = 5
-        REMOVE = config["unitInformation"][6]["shorthand"]
-        UNIT_TYPE_TO_INDEX[REMOVE] = 6
-        UPGRADE = config["unitInformation"][7]["shorthand"]
-        UNIT_TYPE_TO_INDEX[UPGRADE] = 7
-
-        ALL_UNITS = [SCOUT, DEMOLISHER, INTERCEPTOR, WALL, SUPPORT, TURRET]
-        STRUCTURE_TYPES = [WALL, SUPPORT, TURRET]
+        self.rules = GameRules.from_config(config)
+        self.transpositions = TranspositionTable.for_config(config)
 
         self.ARENA_SIZE = 28
         self.HALF_ARENA = int(self.ARENA_SIZE / 2)
         self.MP = 1
         self.SP = 0
-        global MP, SP
-        MP = self.MP
-        SP = self.SP
 
         self.game_map = GameMap(self.config)
-        self._shortest_path_finder = ShortestPathFinder()
+        self._shortest_path_finder = ShortestPathFinder(self.transpositions)
+        self._threat_maps = [None, None]
+        self._max_attack_range = None
         self._build_stack = []
         self._deploy_stack = []
         self._player_resources = [
@@ -103,13 +72,13 @@ class GameState:
         Fills in map based on the serialized game state so that self.game_map[x,y] is a list of GameUnits at that location.
         state_line is the game state as a json string.
         """
-        state = json.loads(state_line)
+        state = decode_state(state_line)
 
-        turn_info = state["turnInfo"]
+        turn_info = state.turn_info
         self.turn_number = int(turn_info[1])
 
-        p1_health, p1_SP, p1_MP, p1_time = map(float, state["p1Stats"][:4])
-        p2_health, p2_SP, p2_MP, p2_time = map(float, state["p2Stats"][:4])
+        p1_health, p1_SP, p1_MP, p1_time = map(float, state.p1_stats[:4])
+        p2_health, p2_SP, p2_MP, p2_time = map(float, state.p2_stats[:4])
 
         self.my_health = p1_health
         self.my_time = p1_time
@@ -120,37 +89,11 @@ class GameState:
             {'SP': p1_SP, 'MP': p1_MP},
             {'SP': p2_SP, 'MP': p2_MP}]
 
-        p1units = state["p1Units"]
-        p2units = state["p2Units"]
-
-        self.__create_parsed_units(p1units, 0)
-        self.__create_parsed_units(p2units, 1)
-
-    def __create_parsed_units(self, units, player_number):
-        """
-        Helper function for __parse_state to add units to the map.
-        """
-        typedef = self.config.get("unitInformation")
-        for i, unit_types in enumerate(units):
-            for uinfo in unit_types:
-                unit_type = typedef[i].get("shorthand")
-                sx, sy, shp = uinfo[:3]
-                x, y = map(int, [sx, sy])
-                hp = float(shp)
-                # This depends on RM and UP always being the last types to be processed
-                if unit_type == REMOVE:
-                    # Quick fix will deploy engine fix soon
-                    if self.contains_stationary_unit([x,y]):
-                        self.game_map[x,y][0].pending_removal = True
-                elif unit_type == UPGRADE:
-                    if self.contains_stationary_unit([x,y]):
-                        self.game_map[x,y][0].upgrade()
-                else:
-                    unit = GameUnit(unit_type, self.config, player_number, hp, x, y)
-                    self.game_map[x,y].append(unit)
+        self.game_map.load_units(state.p1_units, 0, self.rules.REMOVE, self.rules.UPGRADE)
+        self.game_map.load_units(state.p2_units, 1, self.rules.REMOVE, self.rules.UPGRADE)
 
     def __resource_required(self, unit_type):
-        return self.SP if is_stationary(unit_type) else self.MP
+        return self.SP if self.rules.is_stationary(unit_type) else self.MP
 
     def __set_resource(self, resource_type, amount, player_index=0):
         """
@@ -234,7 +177,7 @@ class GameState:
             The number of units affordable of the given unit_type.
 
         """
-        if unit_type not in ALL_UNITS:
+        if unit_type not in self.rules.ALL_UNITS:
             self._invalid_unit(unit_type)
             return
 
@@ -292,16 +235,11 @@ class GameState:
             The units costs as a list [SP, MP]
 
         """
-        if unit_type == REMOVE:
+        if unit_type == self.rules.REMOVE:
             self._invalid_unit(unit_type)
             return
         
-        unit_def = self.config["unitInformation"][UNIT_TYPE_TO_INDEX[unit_type]]
-        cost_base = [unit_def.get('cost1', 0), unit_def.get('cost2', 0)]
-        if upgrade:
-            return [unit_def.get('upgrade', {}).get('cost1', cost_base[SP]), unit_def.get('upgrade', {}).get('cost2', cost_base[MP])]
-
-        return cost_base
+        return self.rules.type_cost(unit_type, upgrade)
 
 
     def can_spawn(self, unit_type, location, num=1):
@@ -320,7 +258,7 @@ class GameState:
             True if we can spawn the unit(s)
 
         """
-        if unit_type not in ALL_UNITS:
+        if unit_type not in self.rules.ALL_UNITS:
             self._invalid_unit(unit_type)
             return
         
@@ -330,10 +268,10 @@ class GameState:
             return False
 
         affordable = self.number_affordable(unit_type) >= num
-        stationary = is_stationary(unit_type)
+        stationary = self.rules.is_stationary(unit_type)
         blocked = self.contains_stationary_unit(location) or (stationary and len(self.game_map[location[0],location[1]]) > 0)
         correct_territory = location[1] < self.HALF_ARENA
-        on_edge = location in (self.game_map.get_edge_locations(self.game_map.BOTTOM_LEFT) + self.game_map.get_edge_locations(self.game_map.BOTTOM_RIGHT))
+        on_edge = tuple(location) in self.rules.friendly_edges
 
         if self.enable_warnings:
             fail_reason = ""
@@ -364,7 +302,7 @@ class GameState:
             The number of units successfully spawned
 
         """
-        if unit_type not in ALL_UNITS:
+        if unit_type not in self.rules.ALL_UNITS:
             self._invalid_unit(unit_type)
             return
         if num < 1 or not locations:
@@ -382,7 +320,7 @@ class GameState:
                     self.__set_resource(SP, 0 - costs[SP])
                     self.__set_resource(MP, 0 - costs[MP])
                     self.game_map.add_unit(unit_type, location, 0)
-                    if is_stationary(unit_type):
+                    if self.rules.is_stationary(unit_type):
                         self._build_stack.append((unit_type, x, y))
                     else:
                         self._deploy_stack.append((unit_type, x, y))
@@ -391,6 +329,61 @@ class GameState:
                     break
         return spawned_units
 
+    def attempt_spawn_many(self, plan):
+        """Attempts to spawn every entry of a build plan in order, validating each entry once.
+        Entries are checked with the same rules as attempt_spawn, and see the units and costs of earlier entries.
+
+        Args:
+            plan: A list of (unit_type, location) or (unit_type, location, num) entries, for example
+                [(TURRET, [3, 12]), (WALL, [3, 13]), (SCOUT, [13, 0], 5)]
+
+        Returns:
+            A list with the number of units successfully spawned for each entry
+
+        """
+        rules = self.rules
+        size = self.ARENA_SIZE
+        game_map = self.game_map
+        resources = self._player_resources[0]
+        results = []
+        for entry in plan:
+            unit_type, location = entry[0], entry[1]
+            num = entry[2] if len(entry) > 2 else 1
+            if unit_type not in rules.ALL_UNITS:
+                self._invalid_unit(unit_type)
+                results.append(0)
+                continue
+            if num < 1 or not game_map.in_arena_bounds(location):
+                self.warn("Could not spawn {} {} at location {}. Location invalid or fewer than one unit.".format(num, unit_type, location))
+                results.append(0)
+                continue
+
+            x, y = map(int, location)
+            stationary = unit_type in rules.STRUCTURE_TYPES
+            if stationary:
+                blocked = game_map.structure_grid[x * size + y] or len(game_map[x, y]) > 0
+                num = 1
+            else:
+                blocked = game_map.structure_grid[x * size + y]
+            if blocked or y >= self.HALF_ARENA or not (stationary or (x, y) in rules.friendly_edges):
+                self.warn("Could not spawn {} at location {}. Location is blocked, in enemy territory, or not on an edge.".format(unit_type, location))
+                results.append(0)
+                continue
+
+            cost_SP, cost_MP = rules.costs[unit_type]
+            stack = self._build_stack if stationary else self._deploy_stack
+            spawned_units = 0
+            while spawned_units < num and resources['SP'] >= cost_SP and resources['MP'] >= cost_MP:
+                resources['SP'] -= cost_SP
+                resources['MP'] -= cost_MP
+                game_map.add_unit(unit_type, [x, y], 0)
+                stack.append((unit_type, x, y))
+                spawned_units += 1
+            if spawned_units < num:
+                self.warn("Could not spawn {} {} at location {}. Not enough resources.".format(num - spawned_units, unit_type, location))
+            results.append(spawned_units)
+        return results
+
     def attempt_remove(self, locations):
         """Attempts to remove existing friendly structures in the given locations.
 
@@ -407,7 +400,7 @@ class GameState:
         for location in locations:
             if location[1] < self.HALF_ARENA and self.contains_stationary_unit(location):
                 x, y = map(int, location)
-                self._build_stack.append((REMOVE, x, y))
+                self._build_stack.append((self.rules.REMOVE, x, y))
                 removed_units += 1
             else:
                 self.warn("Could not remove a unit from {}. Location has no structures or is enemy territory.".format(location))
@@ -439,19 +432,83 @@ class GameState:
                     if unit.stationary:
                         existing_unit = unit
 
-                if not existing_unit.upgraded and self.config["unitInformation"][UNIT_TYPE_TO_INDEX[existing_unit.unit_type]].get("upgrade", None) is not None:
+                if not existing_unit.upgraded and existing_unit.unit_type in self.rules.upgrade_costs:
                     costs = self.type_cost(existing_unit.unit_type, True)
                     resources = self.get_resources()
                     if resources[SP] >= costs[SP] and resources[MP] >= costs[MP]:
                         self.__set_resource(SP, 0 - costs[SP])
                         self.__set_resource(MP, 0 - costs[MP])
-                        existing_unit.upgrade()
-                        self._build_stack.append((UPGRADE, x, y))
+                        # Upgrade a copy of the unit, it may be shared with forks of this state
+                        upgraded_unit = copy.copy(existing_unit)
+                        upgraded_unit.upgrade()
+                        self.game_map[x, y] = [upgraded_unit if unit is existing_unit else unit for unit in self.game_map[x, y]]
+                        self._build_stack.append((self.rules.UPGRADE, x, y))
                         spawned_units += 1
             else:
                 self.warn("Could not upgrade a unit from {}. Location has no structures or is enemy territory.".format(location))
         return spawned_units
 
+    def fork(self):
+        """Copies the game state so you can try out moves without changing this one.
+        The map is copied on write and the parsed units are shared, so forking is much cheaper than
+        building a new GameState from serialized_string.
+
+        Returns:
+            A new GameState with the same map, resources and queued spawns, removals and upgrades.
+            Calling submit_turn on it submits its own queued actions.
+
+        """
+        forked = copy.copy(self)
+        forked.game_map = self.game_map.copy()
+        forked._player_resources = [dict(resources) for resources in self._player_resources]
+        forked._build_stack = list(self._build_stack)
+        forked._deploy_stack = list(self._deploy_stack)
+        forked._threat_maps = [threat_map.copy(forked.game_map) if threat_map else None for threat_map in self._threat_maps]
+        return forked
+
+    def checkpoint(self):
+        """Saves the current map, resources and queued actions so they can be restored with rollback
+
+        Returns:
+            A checkpoint to pass to rollback, it can be rolled back to any number of times
+
+        """
+        return self.fork()
+
+    def rollback(self, checkpoint):
+        """Undoes every spawn, removal and upgrade made since a checkpoint was taken
+
+        Args:
+            checkpoint: A checkpoint returned by checkpoint()
+
+        """
+        self.game_map.restore(checkpoint.game_map)
+        self._player_resources = [dict(resources) for resources in checkpoint._player_resources]
+        self._build_stack = list(checkpoint._build_stack)
+        self._deploy_stack = list(checkpoint._deploy_stack)
+
+    @contextmanager
+    def transaction(self, commit=False):
+        """Context manager that rolls back every change made inside it when it exits.
+        Useful to evaluate many candidate moves in a row, for example:
+
+            with game_state.transaction():
+                game_state.attempt_spawn(TURRET, [13, 12])
+                score = evaluate(game_state)
+
+        Args:
+            commit: If True, changes are kept unless an exception is raised
+
+        """
+        checkpoint = self.checkpoint()
+        try:
+            yield self
+        except BaseException:
+            self.rollback(checkpoint)
+            raise
+        if not commit:
+            self.rollback(checkpoint)
+
     def get_target_edge(self, start_location):
         """Gets the target edge given a starting location
 
@@ -498,6 +555,74 @@ class GameState:
         end_points = self.game_map.get_edge_locations(target_edge)
         return self._shortest_path_finder.navigate_multiple_endpoints(start_location, end_points, self)
 
+    def find_paths_from_all_edges(self, player_index=0):
+        """Gets the path a unit would take from every edge location a player can deploy on.
+        Each target edge is searched only once, and every path is then read from the shared result,
+        which is much cheaper than calling find_path_to_edge for each location.
+
+        Args:
+            player_index: The player deploying the units, 0 for your edges (bottom) 1 for the enemy edges (top)
+
+        Returns:
+            A list with one dict per edge location, ordered along the left edge and then the right edge.
+            Each dict holds:
+                * start ([x, y]): The deploy location
+                * target_edge (int): The edge a unit deployed there tries to reach
+                * path (list): The path the unit would take, None if the location is blocked by a structure
+                * end ([x, y]): The last location of the path, None if the location is blocked
+                * self_destruct (bool): True if the unit can not reach its target edge and would self destruct
+                * length (int): The number of moves in the path, 0 if the location is blocked
+
+        """
+        if not player_index == 0 and not player_index == 1:
+            self._invalid_player_index(player_index)
+            return
+
+        if player_index == 0:
+            spawn_edges = [self.game_map.BOTTOM_LEFT, self.game_map.BOTTOM_RIGHT]
+        else:
+            spawn_edges = [self.game_map.TOP_LEFT, self.game_map.TOP_RIGHT]
+
+        results = []
+        for spawn_edge in spawn_edges:
+            edge_locations = self.game_map.get_edge_locations(spawn_edge)
+            target_edge = self.get_target_edge(edge_locations[0])
+            end_points = self.game_map.get_edge_locations(target_edge)
+            for location in edge_locations:
+                path = self._shortest_path_finder.navigate_multiple_endpoints(location, end_points, self)
+                end = path[-1] if path else None
+                results.append({
+                    'start': location,
+                    'target_edge': target_edge,
+                    'path': path,
+                    'end': end,
+                    'self_destruct': end is not None and end not in end_points,
+                    'length': len(path) - 1 if path else 0})
+        return results
+
+    def get_threat_map(self, player_index=0):
+        """Gets the damage per frame enemy structures deal to a player's mobile units on every location.
+        The map is built the first time it is requested and then only updated where structures change,
+        so it stays cheap to use while you plan your turn.
+
+        Args:
+            player_index: The player whose mobile units are threatened, 0 for you 1 for the enemy
+
+        Returns:
+            A ThreatMap, use damage_at(location) or path_damage(path) to query it
+
+        """
+        if not player_index == 0 and not player_index == 1:
+            self._invalid_player_index(player_index)
+            return
+        threat_map = self._threat_maps[player_index]
+        if threat_map is None:
+            threat_map = ThreatMap(self.game_map, player_index, self.transpositions)
+            self._threat_maps[player_index] = threat_map
+        else:
+            threat_map.sync()
+        return threat_map
+
     def contains_stationary_unit(self, location):
         """Check if a location is blocked, return structures unit if it is
 
@@ -512,6 +637,8 @@ class GameState:
             self.warn('Checked for stationary unit outside of arena bounds')
             return False
         x, y = map(int, location)
+        if not self.game_map.structure_grid[x * self.ARENA_SIZE + y]:
+            return False
         for unit in self.game_map[x,y]:
             if unit.stationary:
                 return unit
@@ -555,7 +682,7 @@ class GameState:
             return
 
         attacker_location = [attacking_unit.x, attacking_unit.y]
-        possible_locations = self.game_map.get_locations_in_range(attacker_location, attacking_unit.attackRange)
+        possible_indices = self.game_map.get_indices_in_range(attacker_location, attacking_unit.attackRange)
         target = None
         target_stationary = True
         target_distance = sys.maxsize
@@ -563,14 +690,18 @@ class GameState:
         target_y = self.ARENA_SIZE
         target_x_distance = 0
 
-        for location in possible_locations:
-            for unit in self.game_map[location]:
-                if unit.player_index == attacking_unit.player_index or (attacking_unit.damage_f == 0 and is_stationary(unit.unit_type)) or (attacking_unit.damage_i == 0 and not(is_stationary(unit.unit_type))):
+        for index in possible_indices:
+            units = self.game_map.get_units_at_index(index)
+            if not units:
+                continue
+            location = divmod(index, self.ARENA_SIZE)
+            for unit in units:
+                if unit.player_index == attacking_unit.player_index or (attacking_unit.damage_f == 0 and unit.stationary) or (attacking_unit.damage_i == 0 and not unit.stationary):
                     continue
 
                 new_target = False
                 unit_stationary = unit.stationary
-                unit_distance = self.game_map.distance_between_locations(location, [attacking_unit.x, attacking_unit.y])
+                unit_distance = self.game_map.distance_between_locations(location, attacker_location)
                 unit_health = unit.health
                 unit_y = unit.y
                 unit_x_distance = abs(self.HALF_ARENA - 0.5 - unit.x)
@@ -635,13 +766,18 @@ class GameState:
         """
         Get locations in the range of TURRET units
         """
-        max_range = 0
-        for unit in self.config["unitInformation"]:
-            if unit.get('attackRange', 0) >= max_range:
-                max_range = unit.get('attackRange', 0)
-        possible_locations= self.game_map.get_locations_in_range(location, max_range)
-        for location_unit in possible_locations:
-            for unit in self.game_map[location_unit]:
-                if unit.damage_i + unit.damage_f > 0 and unit.player_index != player_index and self.game_map.distance_between_locations(location, location_unit) <= unit.attackRange:
+        if self._max_attack_range is None:
+            self._max_attack_range = 0
+            for unit in self.config["unitInformation"]:
+                self._max_attack_range = max(self._max_attack_range, unit.get('attackRange', 0), unit.get('upgrade', {}).get('attackRange', 0))
+        x, y = location
+        for index in self.game_map.get_indices_in_range(location, self._max_attack_range):
+            units = self.game_map.get_units_at_index(index)
+            if not units:
+                continue
+            unit_x, unit_y = divmod(index, self.ARENA_SIZE)
+            squared_distance = (unit_x - x) ** 2 + (unit_y - y) ** 2
+            for unit in units:
+                if unit.damage_i + unit.damage_f > 0 and unit.player_index != player_index and squared_distance <= unit.attackRange ** 2:
                     attackers.append(unit)
         return attackers
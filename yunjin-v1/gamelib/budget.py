@@ -0,0 +1,119 @@
+import time
+from .util import debug_write
+
+
+class TurnBudget:
+    """Tracks how much of the time allowed for a turn has been used.
+
+    AlgoCore creates one right before each call to on_turn and makes it available as self.turn_budget.
+    Check should_stop() inside expensive loops, or use best_of to try candidates until time runs out.
+    Call lap() after each phase of your turn to have its timing included in the end of turn log.
+
+    Attributes :
+        * turn_number (int): The turn this budget is for
+        * budget (float): The number of seconds the turn may take
+        * start_time (float): The time.perf_counter() value when the turn started
+        * laps (list): (label, seconds) pairs recorded by lap()
+
+    """
+    def __init__(self, budget, turn_number=None, start_time=None):
+        """Starts the budget
+
+        Args:
+            budget: The number of seconds the turn may take
+            turn_number: The turn this budget is for, used in the timing log
+            start_time: The time.perf_counter() value the turn started at, now if None
+
+        """
+        self.turn_number = turn_number
+        self.budget = budget
+        self.start_time = time.perf_counter() if start_time is None else start_time
+        self.laps = []
+        self.__last_lap = self.start_time
+
+    @classmethod
+    def from_config(cls, config, turn_number=None, fraction=0.8):
+        """Creates a budget from the soft time limit of the game config
+
+        Args:
+            config: The game config, the default 5 second soft limit is used if it is None
+            turn_number: The turn this budget is for
+            fraction: The fraction of the soft limit to allow, leaving the rest to submit the turn
+
+        Returns:
+            A new TurnBudget starting now
+
+        """
+        soft_limit = 5000
+        if config is not None:
+            soft_limit = config.get("timingAndReplay", {}).get("waitTimeBotSoft", soft_limit)
+        return cls(soft_limit / 1000 * fraction, turn_number)
+
+    def elapsed(self):
+        """The number of seconds since the turn started
+        """
+        return time.perf_counter() - self.start_time
+
+    def remaining(self):
+        """The number of seconds left in the budget, negative once it is exceeded
+        """
+        return self.budget - self.elapsed()
+
+    def should_stop(self, reserve=0):
+        """Checks if the budget is used up
+
+        Args:
+            reserve: Seconds to keep in hand, for example the expected cost of one more iteration
+
+        Returns:
+            True if less than reserve seconds are left
+
+        """
+        return self.remaining() <= reserve
+
+    def lap(self, label):
+        """Records the time spent since the previous lap, or since the turn started
+
+        Args:
+            label: A name for the phase that just finished
+
+        Returns:
+            The number of seconds the phase took
+
+        """
+        now = time.perf_counter()
+        seconds = now - self.__last_lap
+        self.__last_lap = now
+        self.laps.append((label, seconds))
+        return seconds
+
+    def best_of(self, candidates, evaluate, reserve=0):
+        """Evaluates candidates in order until they run out or the budget does, keeping the best one.
+        The first candidate is always evaluated so there is a plan to return.
+
+        Args:
+            candidates: An iterable of candidate plans, best guesses first
+            evaluate: Function returning a score for a candidate, higher is better
+            reserve: Seconds to keep in hand, see should_stop
+
+        Returns:
+            (best candidate, its score), or (None, None) if there were no candidates
+
+        """
+        best = None
+        best_score = None
+        for candidate in candidates:
+            if best_score is not None and self.should_stop(reserve):
+                break
+            score = evaluate(candidate)
+            if best_score is None or score > best_score:
+                best = candidate
+                best_score = score
+        return best, best_score
+
+    def report(self):
+        """Writes the time the turn took, and each recorded lap, with debug_write
+        """
+        laps = ", ".join("{} {:.3f}s".format(label, seconds) for label, seconds in self.laps)
+        debug_write("Turn {} took {:.3f}s of {:.3f}s budget{}".format(
+            self.turn_number, self.elapsed(), self.budget, " ({})".format(laps) if laps else ""))
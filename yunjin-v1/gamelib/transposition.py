@@ -0,0 +1,124 @@
+import threading
+from collections import OrderedDict
+from .util import config_key
+
+# Tables keyed by config_key(config), so games with equal configs share one table
+_TABLES = {}
+
+
+class TranspositionTable:
+    """A bounded cache of results keyed by board hashes, see GameMap.zobrist, that keeps the most recently used entries.
+
+    Boards often repeat between turns, between the forks and rollbacks of a turn being planned and between
+    the side swapped games of an arena. Keying results by GameMap.zobrist lets work done on a board be reused
+    whenever the same structures are on the board again. Use TranspositionTable.for_config(config) to get the
+    table shared by every GameState of a game, which the pathfinder, threat maps and AttackEvaluator use.
+    Include a tag in your keys, such as ("my_score", game_map.zobrist), so they do not clash with those.
+    The table is locked, so it can be shared with the speculation thread.
+
+    Attributes :
+        * capacity (int): The maximum number of entries, the least recently used entries are dropped beyond it
+        * hits (int): The number of lookups that found an entry
+        * misses (int): The number of lookups that did not
+
+    """
+    def __init__(self, capacity=512):
+        """Creates an empty table
+
+        Args:
+            capacity: The maximum number of entries, 0 to store nothing
+
+        """
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+
+    @classmethod
+    def for_config(cls, config):
+        """Gets the table shared by every GameState of configs with the same contents, creating it the first time they are seen
+
+        Args:
+            config (JSON): Contains information about the game
+
+        Returns:
+            The shared TranspositionTable of the config
+
+        """
+        key = config_key(config)
+        table = _TABLES.get(key)
+        if table is None:
+            table = _TABLES.setdefault(key, cls())
+        return table
+
+    def __len__(self):
+        with self.__lock:
+            return len(self.__entries)
+
+    def __contains__(self, key):
+        with self.__lock:
+            return key in self.__entries
+
+    def get(self, key, default=None):
+        """Gets the value stored for a key, marking it as recently used
+
+        Args:
+            key: A hashable key, usually a tuple containing a board hash
+            default: Returned if there is no entry for the key
+
+        Returns:
+            The stored value, or default
+
+        """
+        with self.__lock:
+            try:
+                value = self.__entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self.__entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Stores a value, dropping the least recently used entries if the table is full
+
+        Args:
+            key: A hashable key, usually a tuple containing a board hash
+            value: The value to store, it is shared with later lookups so do not change it afterwards
+
+        """
+        if self.capacity <= 0:
+            return
+        with self.__lock:
+            self.__entries[key] = value
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.capacity:
+                self.__entries.popitem(last=False)
+
+    def lookup(self, key, compute):
+        """Gets the value stored for a key, computing and storing it if there is none.
+        compute runs without the lock held, so two threads may both compute a missing value
+
+        Args:
+            key: A hashable key, usually a tuple containing a board hash
+            compute: A function taking no arguments that returns the value
+
+        Returns:
+            The stored or computed value
+
+        """
+        value = self.get(key, self)
+        if value is self:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        """Drops every entry and resets the hit and miss counts
+        """
+        with self.__lock:
+            self.__entries.clear()
+            self.hits = 0
+            self.misses = 0
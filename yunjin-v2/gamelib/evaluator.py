@@ -0,0 +1,234 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from .game_state import GameState
+from .simulator import ActionSimulator
+from .transposition import TranspositionTable
+
+_EMPTY_STATE = '{"turnInfo":[0,0,-1],"p1Stats":[0,0,0,0],"p2Stats":[0,0,0,0],"p1Units":[],"p2Units":[]}'
+
+# The board of the current process, set up by _init_worker in pool workers or by the evaluator itself when serial
+_worker_config = None
+_worker_state = None
+_worker_board = None
+
+
+def path_damage_score(game_state, plan, player_index):
+    """Scores a plan by the damage per frame its units take along their paths, negated so higher is better
+    """
+    threat_map = game_state.get_threat_map(player_index)
+    damage = 0
+    for unit_type, location, num in plan:
+        path = game_state.find_path_to_edge(location)
+        damage += threat_map.path_damage(path) * num
+    return -damage
+
+
+def simulation_score(game_state, plan, player_index):
+    """Scores a plan by simulating it, as (enemy health lost, damage dealt to enemy structures)
+    """
+    simulator = ActionSimulator(game_state)
+    for unit_type, location, num in plan:
+        simulator.add_unit(unit_type, location, num, player_index)
+    result = simulator.run()
+    return (result.health_lost[1 - player_index], result.structure_damage[player_index])
+
+
+def _init_worker(config):
+    global _worker_config, _worker_state, _worker_board
+    _worker_config = config
+    _worker_state = None
+    _worker_board = None
+
+
+def _warm():
+    return os.getpid()
+
+
+def _load_board(board):
+    """Rebuilds the structures of a board payload in a new GameState of the process, unless it is already loaded
+    """
+    global _worker_state, _worker_board
+    if _worker_board == board[0]:
+        return
+    key, structures = board
+    game_state = GameState(_worker_config, _EMPTY_STATE)
+    game_state.suppress_warnings(True)
+    game_map = game_state.game_map
+    for unit_type, x, y, player_index, health, upgraded, pending_removal in structures:
+        game_map.add_unit(unit_type, [x, y], player_index)
+        unit = game_map[x, y][0]
+        if upgraded:
+            unit.upgrade()
+        unit.health = health
+        unit.pending_removal = pending_removal
+        game_map.sync_location([x, y])
+    _worker_state = game_state
+    _worker_board = key
+
+
+def _evaluate_chunk(board, plans, player_index, score):
+    _load_board(board)
+    return [score(_worker_state, plan, player_index) for plan in plans]
+
+
+def _normalize_plan(candidate):
+    """A candidate as a list of (unit_type, location, num) entries
+    """
+    entries = [candidate] if type(candidate[0]) == str else candidate
+    return [(entry[0], entry[1], entry[2] if len(entry) > 2 else 1) for entry in entries]
+
+
+def _plan_key(plan):
+    return tuple((unit_type, tuple(location), num) for unit_type, location, num in plan)
+
+
+def _can_place(game_state, plan, player_index):
+    """Checks that every unit of a plan can be spawned where it is, on its player's half, on an edge if it is
+    a mobile unit and not on a structure. Resources are not checked, so plans for later turns can be scored
+    """
+    rules = game_state.rules
+    edges = rules.friendly_edges if player_index == 0 else frozenset(tuple(location) for location in rules.edges[0] + rules.edges[1])
+    for unit_type, location, num in plan:
+        if unit_type not in rules.ALL_UNITS or num < 1 or not game_state.game_map.in_arena_bounds(location):
+            return False
+        x, y = map(int, location)
+        stationary = rules.is_stationary(unit_type)
+        if (y < game_state.HALF_ARENA) != (player_index == 0):
+            return False
+        if not stationary and (x, y) not in edges:
+            return False
+        if game_state.game_map.structure_grid[x * game_state.ARENA_SIZE + y] or (stationary and len(game_state.game_map[x, y]) > 0):
+            return False
+    return True
+
+
+class AttackEvaluator:
+    """Scores many candidate attacks in parallel across a pool of processes.
+
+    Create one in on_game_start so the worker processes are started, and receive the game config,
+    before your first turn. Each call to evaluate ships the structures of the board once per worker
+    and splits the candidates between them, results always come back in candidate order so they do not
+    depend on scheduling. With one core, or workers=0, candidates are evaluated in this process instead.
+
+    A candidate is a (unit_type, location, num) entry, or a list of them for a mix of units.
+    Scores are computed on the structures only, the mobile units already on the board are ignored.
+    Candidates that can not be spawned, off their player's edges or on top of a structure, are not scored.
+    Scores are kept in a TranspositionTable under the zobrist hash and structure health of the board, so
+    candidates scored on the same board before, on an earlier turn or another fork, are not evaluated again.
+
+    Attributes :
+        * workers (int): The number of worker processes, 0 when evaluating serially
+        * score (function): Default scoring function, path_damage_score or simulation_score
+        * table (:obj: TranspositionTable): Where scores are kept, None to always evaluate every candidate
+
+    """
+    def __init__(self, config, workers=None, score=simulation_score, table=True):
+        """Starts and warms up the worker processes
+
+        Args:
+            config: The game config, sent to every worker once
+            workers: The number of worker processes, one less than the number of cores if None
+            score: Default scoring function, a module level function taking (game_state, plan, player_index)
+                returning a comparable score where higher is better
+            table: A TranspositionTable to keep scores in, True for the one shared by the config's GameStates,
+                or None to not keep scores, for example if the scoring function is not deterministic
+
+        """
+        if workers is None:
+            workers = (os.cpu_count() or 1) - 1
+        self.workers = workers if workers > 1 else 0
+        self.score = score
+        self.table = TranspositionTable.for_config(config) if table is True else table
+        self.__config = config
+        self.__pool = None
+        self.__board_count = 0
+        if self.workers:
+            self.__pool = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(config,))
+            for future in [self.__pool.submit(_warm) for _ in range(self.workers)]:
+                future.result()
+        else:
+            _init_worker(config)
+
+    def __board(self, game_state):
+        game_map = game_state.game_map
+        self.__board_count += 1
+        structures = []
+        for x, y in game_map.get_structure_locations():
+            unit = game_state.contains_stationary_unit([x, y])
+            structures.append((unit.unit_type, x, y, unit.player_index, unit.health, unit.upgraded, unit.pending_removal))
+        return ((os.getpid(), id(self), self.__board_count), structures)
+
+    def evaluate(self, game_state, candidates, player_index=0, score=None):
+        """Scores every candidate on the board of a game state
+
+        Args:
+            game_state: The GameState whose structures the candidates are evaluated against
+            candidates: A list of candidates, each a (unit_type, location, num) entry or a list of them
+            player_index: The player spawning the candidates, 0 for you 1 for the enemy
+            score: Scoring function to use instead of self.score
+
+        Returns:
+            A list with the score of each candidate, in the same order, None for candidates that can not be spawned
+
+        """
+        score = score or self.score
+        plans = [_normalize_plan(candidate) for candidate in candidates]
+        scores = [None] * len(plans)
+        missing = [index for index, plan in enumerate(plans) if _can_place(game_state, plan, player_index)]
+        keys = None
+        if self.table is not None:
+            game_map = game_state.game_map
+            board_key = ("attack", game_map.zobrist, hash(game_map.health_grid.tobytes()), player_index, score)
+            keys = {index: board_key + (_plan_key(plans[index]),) for index in missing}
+            for index in missing:
+                scores[index] = self.table.get(keys[index])
+            missing = [index for index in missing if scores[index] is None]
+        if missing:
+            found = self.__evaluate_plans(game_state, [plans[index] for index in missing], player_index, score)
+            for index, plan_score in zip(missing, found):
+                scores[index] = plan_score
+                if keys is not None:
+                    self.table.put(keys[index], plan_score)
+        return scores
+
+    def __evaluate_plans(self, game_state, plans, player_index, score):
+        board = self.__board(game_state)
+        if not self.workers:
+            return _evaluate_chunk(board, plans, player_index, score)
+        chunk_size = -(-len(plans) // self.workers)
+        futures = [self.__pool.submit(_evaluate_chunk, board, plans[start:start + chunk_size], player_index, score)
+                   for start in range(0, len(plans), chunk_size)]
+        scores = []
+        for future in futures:
+            scores.extend(future.result())
+        return scores
+
+    def best(self, game_state, candidates, player_index=0, score=None):
+        """Finds the best scoring candidate, the earliest one wins ties
+
+        Args:
+            game_state: The GameState whose structures the candidates are evaluated against
+            candidates: A list of candidates, see evaluate
+            player_index: The player spawning the candidates, 0 for you 1 for the enemy
+            score: Scoring function to use instead of self.score
+
+        Returns:
+            (best candidate, its score), or (None, None) if no candidate can be spawned
+
+        """
+        scores = self.evaluate(game_state, candidates, player_index, score)
+        best_index = None
+        for index, candidate_score in enumerate(scores):
+            if candidate_score is not None and (best_index is None or candidate_score > scores[best_index]):
+                best_index = index
+        if best_index is None:
+            return None, None
+        return candidates[best_index], scores[best_index]
+
+    def close(self):
+        """Shuts down the worker processes
+        """
+        if self.__pool is not None:
+            self.__pool.shutdown()
+            self.__pool = None
@@ -1,7 +1,31 @@
 import unittest
+import os
+import time
 import json
+import tempfile
+import threading
 from .game_state import GameState
 from .unit import GameUnit
+from .simulator import ActionSimulator
+from .budget import TurnBudget
+from .speculation import SpeculationWorker
+from .action_frame import ActionFrame
+from .decoder import decode_state
+from .history import History
+from .evaluator import AttackEvaluator, path_damage_score
+from .algocore import AlgoCore
+from .engine import HeadlessEngine
+from .tuner import SearchSpace, Tuner, _apply_params
+from .transposition import TranspositionTable
+
+_played = []
+
+def _fake_play(algo_path, params, opponent_path, game_index, seed, max_turns):
+    _played.append((params["x"], game_index))
+    return float(params["x"] >= 3), params["x"]
+
+def _structure_units_score(game_state, plan, player_index):
+    return sum(1 for x, y in game_state.game_map.get_structure_locations() if game_state.contains_stationary_unit([x, y]))
 
 class BasicTests(unittest.TestCase):
 
@@ -235,12 +259,52 @@ class BasicTests(unittest.TestCase):
             game.game_map.add_unit("FF", [13,13])
         self.assertEqual(1, len(game.game_map[13,13]), "Towers seem to be stacking")
         
+    def test_occupancy_grid(self):
+        game = self.make_turn_0_map()
+        game.game_map.add_unit("DF", [13, 5], 0)
+        game.game_map.add_unit("DF", [14, 20], 1)
+        game.game_map.add_unit("FF", [15, 20], 1)
+        game.game_map.add_unit("EI", [12, 5], 0)
+        self.assertTrue(game.game_map.is_blocked([13, 5]), "Turret should block its location")
+        self.assertFalse(game.game_map.is_blocked([12, 5]), "Mobile units should not block a location")
+        self.assertEqual([(14, 20)], game.game_map.get_structure_locations("DF", 1), "Wrong enemy turrets")
+        self.assertEqual([(13, 5), (14, 20), (15, 20)], game.game_map.get_structure_locations(), "Wrong structures")
+        self.assertEqual([(15, 20)], game.game_map.get_structures_in_region((15, 27), (14, 27)), "Wrong structures in region")
+        self.assertEqual(2, game.game_map.count_structures("DF"), "Wrong number of turrets")
+        self.assertEqual(3, sum(game.game_map.blocked_mask()), "Wrong number of blocked locations")
+        game.game_map.remove_unit([13, 5])
+        self.assertFalse(game.contains_stationary_unit([13, 5]), "Removed turret should not block")
+        self.assertEqual(1, game.game_map.count_structures("DF"), "Grid was not updated on removal")
+
+    def test_path_cache_invalidation(self):
+        game = self.make_turn_0_map()
+        path = game.find_path_to_edge([13, 0])
+        self.assertEqual([13, 0], path[0], "Path should start at the start location")
+        self.assertEqual(path, game.find_path_to_edge([13, 0]), "Cached path differs from the first one")
+        game.attempt_spawn("FF", [path[3]])
+        new_path = game.find_path_to_edge([13, 0])
+        self.assertNotIn(path[3], new_path, "Path goes through a newly spawned wall")
+
+    def test_paths_from_all_edges(self):
+        game = self.make_turn_0_map()
+        game.game_map.add_unit("FF", [13, 0], 0)
+        for x in range(28):
+            game.game_map.add_unit("FF", [x, 14], 1)
+        paths = game.find_paths_from_all_edges()
+        self.assertEqual(28, len(paths), "There should be a path entry for every bottom edge location")
+        blocked = [entry for entry in paths if entry['path'] is None]
+        self.assertEqual([[13, 0]], [entry['start'] for entry in blocked], "Only the walled location should be blocked")
+        for entry in paths:
+            if entry['path'] is not None:
+                self.assertEqual(game.find_path_to_edge(entry['start']), entry['path'], "Batch path differs from a single query")
+                self.assertTrue(entry['self_destruct'], "Units can not cross a full wall")
+
     def test_get_units_in_range(self):
         game = self.make_turn_0_map()
         self.assertEqual(1, len(game.game_map.get_locations_in_range([13,13], 0)), "We should be in 0 range of ourself")
         self.assertEqual(37, len(game.game_map.get_locations_in_range([13,13], 3.5)), "Wrong number of tiles in range")
 
-    def _test_get_attackers(self):
+    def test_get_attackers(self):
         game = self.make_turn_0_map()
         
         self.assertEqual([], game.get_attackers([13,13], 0), "Are we being attacked by a ghost?")
@@ -256,6 +320,401 @@ class BasicTests(unittest.TestCase):
         game.game_map.add_unit("DF", [14,14], 1)
         self.assertEqual(3, len(game.get_attackers([13,13], 0)), "We should be in danger from 3 places")
 
+    def test_threat_map(self):
+        game = self.make_turn_0_map()
+        game.game_map.add_unit("DF", [13, 16], 1)
+        threat_map = game.get_threat_map(0)
+        self.assertEqual(5, threat_map.damage_at([13, 14]), "Turret should threaten a location 2 away")
+        self.assertEqual(0, threat_map.damage_at([13, 13]), "Turret should not reach a location 3 away")
+        self.assertEqual(0, game.get_threat_map(1).damage_at([13, 14]), "Turrets should not threaten their own units")
+        game.game_map[13, 16][0].upgrade()
+        game.game_map.sync_location([13, 16])
+        self.assertEqual(15, game.get_threat_map(0).damage_at([13, 13]), "Upgraded turret should have more range and damage")
+        game.game_map.add_unit("DF", [14, 16], 1)
+        self.assertEqual(20, game.get_threat_map(0).damage_at([13, 14]), "Spawned turret was not added to the threat map")
+        self.assertEqual(40, threat_map.path_damage([[13, 14], [14, 14]]), "Wrong damage along path")
+        game.game_map.remove_unit([13, 16])
+        self.assertEqual(5, game.get_threat_map(0).damage_at([13, 14]), "Removed turret is still in the threat map")
+
+    def test_attempt_spawn_many(self):
+        game = self.make_turn_0_map()
+        results = game.attempt_spawn_many([
+            ("DF", [13, 12]),
+            ("DF", [13, 12]),
+            ("FF", [13, 15]),
+            ("PI", [13, 0], 3),
+            ("PI", [13, 5], 1),
+            ("EI", [14, 0], 2),
+            ("FF", [0, 13], 30)])
+        self.assertEqual([1, 0, 0, 3, 0, 0, 1], results, "Wrong number of units spawned per entry")
+        self.assertEqual(22, game.get_resource(game.SP), "Wrong SP after spawning")
+        self.assertEqual(2, game.get_resource(game.MP), "Wrong MP after spawning")
+        self.assertEqual([("DF", 13, 12), ("FF", 0, 13)], game._build_stack)
+        self.assertEqual(3, len(game._deploy_stack))
+        self.assertEqual(3, len(game.game_map[13, 0]), "Scouts should be added to the map")
+
+    def test_fork_and_rollback(self):
+        game = self.make_turn_0_map()
+        game.attempt_spawn("DF", [13, 12])
+        threat_map = game.get_threat_map(1)
+        fork = game.fork()
+        fork.attempt_spawn("DF", [14, 12])
+        fork.attempt_upgrade([13, 12])
+        self.assertEqual(1, len(fork.game_map[14, 12]), "Fork should contain its own spawn")
+        self.assertEqual(0, len(game.game_map[14, 12]), "Spawning on a fork should not change the original")
+        self.assertFalse(game.game_map[13, 12][0].upgraded, "Upgrading on a fork should not change the original")
+        self.assertEqual(5, game.get_threat_map(1).damage_at([13, 14]), "Original threat map changed by the fork")
+        self.assertEqual(20, fork.get_threat_map(1).damage_at([13, 14]), "Fork threat map is out of date")
+        self.assertEqual(1, len(game._build_stack), "Fork should have its own build stack")
+        self.assertTrue(threat_map is game.get_threat_map(1))
+
+        checkpoint = game.checkpoint()
+        game.attempt_spawn("FF", [[0, 13], [1, 13]])
+        game.rollback(checkpoint)
+        self.assertEqual(0, len(game.game_map[0, 13]), "Rollback should remove spawned units")
+        self.assertEqual(23, game.get_resource(game.SP), "Rollback should refund resources")
+        self.assertEqual(1, len(game._build_stack), "Rollback should restore the build stack")
+
+        with game.transaction():
+            game.attempt_spawn("FF", [0, 13])
+            self.assertTrue(game.contains_stationary_unit([0, 13]))
+        self.assertFalse(game.contains_stationary_unit([0, 13]), "Transaction should roll back on exit")
+        with game.transaction(commit=True):
+            game.attempt_spawn("FF", [0, 13])
+        self.assertTrue(game.contains_stationary_unit([0, 13]), "Committed transaction should keep its changes")
+
+    def test_zobrist_hashing(self):
+        game = self.make_turn_0_map()
+        game_map = game.game_map
+        self.assertEqual(0, game_map.zobrist, "An empty board should hash to 0")
+        game.attempt_spawn("DF", [13, 12])
+        game.attempt_spawn("FF", [[0, 13], [1, 13]])
+        game_map.add_unit("DF", [14, 14], 1)
+        game.attempt_upgrade([13, 12])
+        self.assertEqual(game_map.rehash(), game_map.zobrist, "Incremental hash differs from the full hash")
+
+        other = self.make_turn_0_map()
+        other.game_map.add_unit("DF", [14, 14], 1)
+        other.game_map.add_unit("FF", [1, 13])
+        other.game_map.add_unit("FF", [0, 13])
+        other.game_map.add_unit("DF", [13, 12])
+        self.assertNotEqual(game_map.zobrist, other.game_map.zobrist, "Upgraded structures should change the hash")
+        other.attempt_upgrade([13, 12])
+        self.assertEqual(game_map.zobrist, other.game_map.zobrist, "Equal boards should have equal hashes")
+
+        checkpoint = game.checkpoint()
+        game.find_path_to_edge([13, 0])
+        game_map.remove_unit([0, 13])
+        game.find_path_to_edge([13, 0])
+        self.assertNotEqual(checkpoint.game_map.zobrist, game_map.zobrist)
+        game.rollback(checkpoint)
+        self.assertEqual(checkpoint.game_map.zobrist, game_map.zobrist, "Rollback should restore the hash")
+        hits = game.transpositions.hits
+        game.find_path_to_edge([13, 0])
+        self.assertEqual(hits + 1, game.transpositions.hits, "Pathing of a board seen before should be reused")
+
+    def test_transposition_table(self):
+        table = TranspositionTable(2)
+        table.put("a", 1)
+        table.put("b", 2)
+        self.assertEqual(1, table.get("a"))
+        table.put("c", 3)
+        self.assertFalse("b" in table, "The least recently used entry should be dropped")
+        self.assertEqual(2, len(table))
+        self.assertEqual(3, table.lookup("c", lambda: 4))
+        self.assertEqual(5, table.lookup("d", lambda: 5))
+        self.assertEqual((2, 1), (table.hits, table.misses))
+        config = self.make_turn_0_map().config
+        self.assertTrue(TranspositionTable.for_config(config) is TranspositionTable.for_config(json.loads(json.dumps(config))),
+                        "Games with equal configs should share one table")
+
+        shared = TranspositionTable(8)
+        errors = []
+        def churn(offset):
+            try:
+                for index in range(20000):
+                    shared.put((offset + index) % 16, index)
+                    shared.get((offset + index + 5) % 16)
+            except Exception as exception:
+                errors.append(exception)
+        threads = [threading.Thread(target=churn, args=(offset,)) for offset in (0, 7)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([], errors, "Sharing a table between threads should not raise")
+        self.assertEqual(8, len(shared))
+
+    def test_turn_budget(self):
+        budget = TurnBudget(10, 1)
+        self.assertFalse(budget.should_stop(), "Fresh budget should not be used up")
+        self.assertTrue(budget.should_stop(reserve=11), "Reserve larger than the budget should stop")
+        best, score = budget.best_of([3, 7, 5], lambda candidate: candidate)
+        self.assertEqual((7, 7), (best, score), "best_of should return the highest scoring candidate")
+        budget.lap("search")
+        self.assertEqual("search", budget.laps[0][0])
+
+        expired = TurnBudget(0, 1)
+        evaluated = []
+        best, _ = expired.best_of([1, 2, 3], lambda candidate: evaluated.append(candidate) or candidate)
+        self.assertEqual([1], evaluated, "Expired budget should only evaluate the first candidate")
+        self.assertEqual(4.0, TurnBudget.from_config({"timingAndReplay": {"waitTimeBotSoft": 5000}}).budget)
+
+    def test_speculation_worker(self):
+        worker = SpeculationWorker(lambda frame_string, turn_number: len(frame_string))
+        self.assertEqual(None, worker.latest(), "No result before any frame was submitted")
+        worker.submit("frame", 3)
+        self.assertEqual((3, None, 5), worker.latest(timeout=5), "Worker should run on the submitted frame")
+        worker.stop()
+
+        started = threading.Event()
+        release = threading.Event()
+        def slow(frame_string, turn_number):
+            started.set()
+            release.wait(5)
+            return frame_string
+        worker = SpeculationWorker(slow)
+        worker.submit("early", 3, 1)
+        started.wait(5)
+        worker.submit("last", 3, 9)
+        self.assertTrue(worker.superseded(), "A newer frame should supersede the run in progress")
+        worker.finish_turn()
+        self.assertEqual(None, worker.latest(final=True), "The final board has not been run yet")
+        release.set()
+        self.assertEqual((3, 9, "last"), worker.latest(timeout=5, final=True), "The final frame should not be dropped")
+        worker.stop()
+
+    def test_action_frame(self):
+        frame_string = """{"p2Units":[[],[],[],[],[],[],[]],"turnInfo":[1,3,12],"p1Stats":[30.0,25.0,5.0,0],"p1Units":[[],[],[],[],[],[],[]],"p2Stats":[30.0,25.0,5.0,0],"events":{"selfDestruct":[],"breach":[[[13,27],1,3,"12",1]],"damage":[],"shield":[],"move":[],"spawn":[],"death":[],"attack":[],"melee":[]}}"""
+        frame = ActionFrame(frame_string)
+        self.assertEqual([1, 3, 12], frame.turn_info, "turnInfo was not scanned correctly")
+        self.assertEqual((3, 12), (frame.turn_number, frame.frame_number))
+        self.assertTrue(frame.has_event("breach"), "Frame has a breach")
+        self.assertFalse(frame.has_event("death"), "Frame has no deaths")
+        self.assertEqual([[[13, 27], 1, 3, "12", 1]], frame.event("breach"), "Breach events were not decoded correctly")
+        self.assertEqual([30.0, 25.0, 5.0, 0], frame.section("p2Stats"))
+        self.assertEqual(json.loads(frame_string), json.loads(frame), "Frame should still be the frame string")
+        self.assertEqual(frame.event("breach"), frame.state["events"]["breach"])
+
+    def test_history(self):
+        history = History(capacity=2)
+        turn = """{"turnInfo":[0,1,-1],"p1Stats":[30.0,20.0,5.0,0],"p2Stats":[28.0,10.0,8.0,0],"p1Units":[],"p2Units":[]}"""
+        frame = """{"turnInfo":[1,1,0],"events":{"spawn":[[[3,17],2,"1",2],[[14,27],3,"2",2],[[13,27],3,"3",2],[[5,18],4,"4",2]],"breach":[[[2,11],1,3,"2",2]],"death":[[[3,10],0,"5",1,false],[[4,10],0,"6",1,true]]}}"""
+        history.record_turn(turn)
+        history.record_frame(frame)
+        self.assertEqual({'left': 2, 'right': 1}, history.attack_side_distribution(), "Wrong enemy attack sides")
+        self.assertEqual({(2, 11): 1}, history.breached_locations(), "Wrong breach locations")
+        self.assertEqual({(3, 10): 1}, history.structure_death_locations(), "Removed structures should not count as destroyed")
+        self.assertEqual([(1, 8.0)], history.resource_curve("MP", 1))
+        history.record_turn(turn.replace("[0,1,-1]", "[0,2,-1]"))
+        history.record_turn(turn.replace("[0,1,-1]", "[0,3,-1]"))
+        self.assertEqual([2, 3], [record.turn_number for record in history.last()], "Ring buffer should only keep the last turns")
+        self.assertEqual({}, history.breached_locations())
+
+    def test_action_simulator(self):
+        game = self.make_turn_0_map()
+        simulator = ActionSimulator(game)
+        simulator.add_unit("PI", [13, 0], 3)
+        result = simulator.run()
+        self.assertEqual(3, len(result.breaches[0]), "Unblocked pings should all score")
+        self.assertEqual(3, result.health_lost[1], "Enemy should lose one health per ping")
+
+        game = self.make_turn_0_map()
+        for x in range(28):
+            if game.game_map.in_arena_bounds([x, 14]):
+                game.game_map.add_unit("FF", [x, 14], 1)
+        simulator = ActionSimulator(game)
+        simulator.add_unit("EI", [13, 0], 1)
+        result = simulator.run()
+        self.assertEqual(0, len(result.breaches[0]), "Walled off unit should not score")
+        self.assertEqual(1, len(result.self_destructs[0]), "Walled off unit should self destruct")
+        self.assertTrue(result.structure_damage[0] > 0, "Unit should damage the wall")
+        self.assertEqual(1, len(game.game_map[0, 14]), "Simulation should not change the game map")
+
+    def test_action_simulator_benchmark(self):
+        game = self.make_turn_0_map()
+        for x in range(4, 24, 3):
+            game.game_map.add_unit("DF", [x, 14], 1)
+        for x in range(3, 25, 2):
+            game.game_map.add_unit("FF", [x, 15], 1)
+        for x in range(6, 22, 4):
+            game.game_map.add_unit("EF", [x, 16], 1)
+        for x in range(5, 23, 4):
+            game.game_map.add_unit("EF", [x, 11], 0)
+
+        def simulate():
+            simulator = ActionSimulator(game)
+            simulator.add_unit("PI", [13, 0], 20)
+            simulator.add_unit("EI", [14, 0], 15)
+            simulator.add_unit("SI", [3, 10], 15)
+            return simulator.run()
+
+        first = simulate()
+        runs = 5
+        start = time.perf_counter()
+        for _ in range(runs):
+            result = simulate()
+        elapsed = (time.perf_counter() - start) / runs
+        self.assertTrue(len(first.breaches[0]) > 0 and first.destroyed_structures[1], "Attack should both score and destroy structures")
+        self.assertEqual((first.breaches, first.health_lost), (result.breaches, result.health_lost), "Repeated runs should agree")
+        # A full action phase of 50 units should take a few milliseconds, the bound leaves room for slow machines
+        self.assertLess(elapsed, 0.25, "Simulating 50 units took {:.1f}ms".format(elapsed * 1000))
+
+    def test_game_rules(self):
+        game = self.make_turn_0_map()
+        other = GameState(game.config, game.serialized_string)
+        self.assertTrue(game.rules is other.rules, "Game states of one config should share their rules")
+        other = GameState(json.loads(json.dumps(game.config)), game.serialized_string)
+        self.assertTrue(game.rules is other.rules, "Games with equal configs should share their rules")
+        self.assertEqual("DF", game.rules.TURRET)
+        self.assertTrue(game.rules.is_stationary("FF"), "Walls are structures")
+        self.assertFalse(game.rules.is_stationary("PI"), "Scouts are not structures")
+        self.assertEqual([4.0, 0], game.type_cost("DF", True), "Wrong upgrade cost")
+        self.assertEqual([0, 1.0], game.type_cost("PI", True), "Units without upgrades should cost their base cost")
+        self.assertTrue((13, 0) in game.rules.friendly_edges)
+
+    def test_unit_stats_shared(self):
+        game = self.make_turn_0_map()
+        turret = GameUnit("DF", game.config, 0, None, 13, 12)
+        other = GameUnit("DF", game.config, 1, None, 14, 12)
+        self.assertTrue(turret.stats is other.stats, "Units of one type should share their stats")
+        copy = GameUnit("DF", json.loads(json.dumps(game.config)), 0, None, 13, 12)
+        self.assertTrue(turret.stats is copy.stats, "Games with equal configs should share their stats")
+        self.assertFalse(hasattr(turret, "__dict__"), "Units should not have a per instance dict")
+        turret.upgrade()
+        self.assertEqual((True, False), (turret.upgraded, other.upgraded), "Upgrading should only change one unit")
+        self.assertEqual(3.5, turret.attackRange, "Upgraded turret should use upgraded range")
+        self.assertEqual([6.0, 0], turret.cost, "Upgraded cost should include the upgrade")
+        other.attackRange = 5
+        self.assertEqual(5, other.attackRange, "Stats should be assignable per unit")
+        self.assertEqual(2.5, GameUnit("DF", game.config).attackRange, "Assigning a stat should not change other units")
+        self.assertEqual(90.0, turret.health)
+
+    def test_parse_units(self):
+        game = self.make_turn_0_map()
+        turn = """{"p2Units":[[],[],[[13,16,60.0,"3"]],[],[],[],[],[[13,16,0.0,"4"]]],"turnInfo":[0,4,-1],"p1Stats":[30.0,25.0,5.0,0],"p1Units":[[[13,13,75.0,"1"]],[],[],[[13,0,15.0,"5"]],[],[],[[13,13,0.0,"2"]],[]],"p2Stats":[29.0,12.0,3.0,0],"events":{"breach":[]}}"""
+        decoded = decode_state(turn)
+        self.assertEqual(json.loads(turn)["p2Units"], decoded.p2_units, "Units were not decoded correctly")
+        state = GameState(game.config, turn)
+        self.assertEqual(4, state.turn_number)
+        self.assertTrue(state.game_map[13, 13][0].pending_removal, "Wall should be flagged for removal")
+        self.assertTrue(state.game_map[13, 16][0].upgraded, "Turret should be upgraded")
+        self.assertEqual(60.0, state.game_map[13, 16][0].health)
+        self.assertEqual(1, state.game_map.upgraded_grid[13 * 28 + 16], "Occupancy grid should record the upgrade")
+        self.assertEqual(1, state.game_map.owner_grid[13 * 28 + 16])
+        self.assertEqual("PI", state.game_map[13, 0][0].unit_type, "Mobile units should be parsed")
+        self.assertEqual(12.0, state.get_resource(state.SP, 1))
+
+    def test_attack_evaluator(self):
+        game = self.make_turn_0_map()
+        for location in [[20, 13], [21, 13], [5, 14], [6, 14]]:
+            game.game_map.add_unit("DF", location, 1)
+        candidates = [("PI", [13, 0], 5), ("PI", [0, 13], 5), [("PI", [14, 0], 3), ("EI", [14, 0], 1)]]
+        serial = AttackEvaluator(game.config, workers=0)
+        self.assertEqual(0, serial.workers)
+        scores = serial.evaluate(game, candidates)
+        self.assertEqual(3, len(scores), "Every candidate should be scored")
+        self.assertEqual(5, scores[0][0], "Unblocked scouts should all score")
+        pool = AttackEvaluator(game.config, workers=2)
+        try:
+            self.assertEqual(scores, pool.evaluate(game, candidates), "Pool results should match serial results")
+            self.assertEqual(serial.evaluate(game, candidates, score=path_damage_score),
+                             pool.evaluate(game, candidates, score=path_damage_score))
+        finally:
+            pool.close()
+        best, best_score = serial.best(game, candidates)
+        self.assertEqual(max(scores), best_score)
+
+        game.game_map.add_unit("FF", [13, 0], 0)
+        blocked = [("PI", [13, 0], 5), ("PI", [14, 13], 1), ("PI", [0, 13], 5)]
+        unkept = AttackEvaluator(game.config, workers=0, score=path_damage_score, table=None)
+        self.assertEqual([None, None], unkept.evaluate(game, blocked)[:2], "Unspawnable candidates should not be scored")
+        self.assertEqual(blocked[2], unkept.best(game, blocked)[0])
+        self.assertEqual([5], unkept.evaluate(game, blocked[2:], score=_structure_units_score),
+                         "Scoring functions should see the structure units")
+
+    def test_headless_engine(self):
+        config = self.make_turn_0_map().config
+
+        class Rusher(AlgoCore):
+            def __init__(self):
+                super().__init__()
+                self.frames = 0
+
+            def on_turn(self, turn_state):
+                game_state = GameState(self.config, turn_state)
+                game_state.attempt_spawn("PI", [13, 0], 100)
+                game_state.submit_turn()
+
+            def on_action_frame(self, frame):
+                self.frames += 1
+
+        for rusher_index in range(2):
+            algos = [AlgoCore(), AlgoCore()]
+            algos[rusher_index] = Rusher()
+            result = HeadlessEngine(config, algos[0], algos[1]).play()
+            self.assertEqual(rusher_index + 1, result.winner, "Unblocked scouts should win from either side")
+            self.assertEqual(0, result.health[1 - rusher_index])
+            self.assertLess(result.turns, 20)
+            self.assertEqual([False, False], result.crashed)
+            self.assertGreater(algos[rusher_index].frames, 0, "Action frames should be sent to on_action_frame")
+
+        class Recorder(AlgoCore):
+            def on_game_start(self, config):
+                super().on_game_start(config)
+                self.enable_history()
+
+        recorder = Recorder()
+        HeadlessEngine(config, recorder, Rusher()).play()
+        self.assertGreater(sum(len(record.breaches[1]) for record in recorder.history.last()), 0,
+                           "History enabled in on_game_start should record the breaches of self-play games")
+
+    def test_tuner(self):
+        self.assertEqual(SearchSpace.key({"a": 1, "b": 2}), SearchSpace.key({"b": 2, "a": 1}))
+        space = SearchSpace({"x": [0, 5], "y": {"choices": [1, 2]}, "z": ["left", "right", "both"]})
+        self.assertEqual((0, 5), space.parameters["x"])
+        self.assertEqual([1, 2], space.parameters["y"])
+
+        del _played[:]
+        tuner = Tuner("algo", ["opponent"], {"x": [0, 5]}, {}, workers=0, play=_fake_play)
+        best, (score, margin) = tuner.successive_halving(9, min_games=1, max_games=3, initial=[{"x": 4}])
+        self.assertGreaterEqual(best["x"], 3)
+        self.assertEqual(1.0, score)
+        played = len(_played)
+        tuner.evaluate([best], 3)
+        self.assertEqual(played, len(_played), "Cached games should not be played again")
+        self.assertEqual(len(set(_played)), len(_played))
+
+        tuner = Tuner("algo", ["opponent"], {"x": [0, 5]}, {}, workers=0, max_turns=50, play=_fake_play)
+        tuner.evaluate([best], 1)
+        self.assertEqual(played + 1, len(_played), "Games with other settings should not reuse cached results")
+
+        with tempfile.TemporaryDirectory() as folder:
+            opponent = os.path.join(folder, "algo_strategy.py")
+            cache = os.path.join(folder, "cache.jsonl")
+            with open(opponent, "w") as opponent_file:
+                opponent_file.write("THRESHOLD = 1\n")
+            Tuner("algo", [opponent], {"x": [0, 5]}, {}, workers=0, cache_path=cache, play=_fake_play).evaluate([best], 1)
+            Tuner("algo", [opponent], {"x": [0, 5]}, {}, workers=0, cache_path=cache, play=_fake_play).evaluate([best], 1)
+            self.assertEqual(played + 2, len(_played), "Cached games should not be played again across runs")
+            with open(opponent, "w") as opponent_file:
+                opponent_file.write("THRESHOLD = 2\n")
+            Tuner("algo", [opponent], {"x": [0, 5]}, {}, workers=0, cache_path=cache, play=_fake_play).evaluate([best], 1)
+            self.assertEqual(played + 3, len(_played), "Games against an edited opponent should be played again")
+
+        class Strategy(AlgoCore):
+            def on_game_start(self, config):
+                self.config = config
+                self.threshold = 1
+        algo = Strategy()
+        _apply_params(algo, {"threshold": 7})
+        algo.on_game_start({})
+        self.assertEqual(7, algo.threshold, "Tuned values should replace the defaults set in on_game_start")
+        algo = Strategy()
+        _apply_params(algo, {"treshold": 7})
+        with self.assertRaises(ValueError):
+            algo.on_game_start({})
+
     def test_print_unit(self):
         game = self.make_turn_0_map()
 
@@ -0,0 +1,55 @@
+"""
+Plays algos against each other with HeadlessEngine.
+
+    python -m gamelib.selfplay path/to/algo1 path/to/algo2 [games]
+
+loads the algo_strategy.py of each algo folder and prints the result of each game. The algos must use this gamelib,
+which is the case when they `import gamelib` and the command is run from the folder containing it.
+"""
+
+import importlib.util
+import json
+import os
+import sys
+
+from .engine import HeadlessEngine
+
+
+def load_algo(algo_path):
+    """Creates the AlgoStrategy of an algo folder, or of an algo_strategy.py file
+
+    Args:
+        algo_path: The algo folder or its algo_strategy.py
+
+    Returns:
+        A new AlgoStrategy object
+
+    """
+    if os.path.isdir(algo_path):
+        algo_path = os.path.join(algo_path, "algo_strategy.py")
+    algo_path = os.path.abspath(algo_path)
+    module_name = "algo_strategy_{}".format(abs(hash(algo_path)))
+    if module_name not in sys.modules:
+        spec = importlib.util.spec_from_file_location(module_name, algo_path)
+        module = importlib.util.module_from_spec(spec)
+        sys.path.insert(0, os.path.dirname(algo_path))
+        try:
+            spec.loader.exec_module(module)
+        finally:
+            sys.path.remove(os.path.dirname(algo_path))
+        sys.modules[module_name] = module
+    return sys.modules[module_name].AlgoStrategy()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        sys.stderr.write("Usage: python -m gamelib.selfplay algo1 algo2 [games]\n")
+        sys.exit(1)
+    config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "game-configs.json")
+    with open(config_path) as config_file:
+        game_config = json.load(config_file)
+    games = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+    algo_names = [os.path.basename(os.path.normpath(path)) for path in sys.argv[1:3]]
+    for game in range(games):
+        engine = HeadlessEngine(game_config, load_algo(sys.argv[1]), load_algo(sys.argv[2]), names=algo_names)
+        print("Game {}: {}".format(game + 1, engine.play()))
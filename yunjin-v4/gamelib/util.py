@@ -1,8 +1,21 @@
+import hashlib
+import json
 import sys
+from collections import OrderedDict
 
 
 BANNER_TEXT = "---------------- Starting Your Algo --------------------"
 
+# Where commands and debug output go instead of stdout and stderr, see set_command_sink and set_debug_sink
+_command_sink = None
+_debug_sink = None
+
+# id(config) -> (config, digest) of the configs seen most recently. The config is kept with its digest so the id
+# can not be reused while cached, and only a few are kept so the configs of finished games can be freed
+_CONFIG_KEYS = OrderedDict()
+_CONFIG_KEYS_CAPACITY = 8
+_last_config_key = (None, None)     # the entry of the last config looked up, usually the config of the current game
+
 
 def get_command():
     """Gets input from stdin
@@ -26,6 +39,9 @@ def send_command(cmd):
     Should usually only be called by 'GameState.submit_turn()'
 
     """
+    if _command_sink is not None:
+        _command_sink(cmd.strip())
+        return
     sys.stdout.write(cmd.strip() + "\n")
     sys.stdout.flush()
 
@@ -36,6 +52,54 @@ def debug_write(*msg):
         msg: The message to output
 
     """
+    if _debug_sink is not None:
+        _debug_sink(", ".join(map(str, msg)).strip())
+        return
     #Printing to STDERR is okay and printed out by the game but doesn't effect turns.
     sys.stderr.write(", ".join(map(str, msg)).strip() + "\n")
     sys.stderr.flush()
+
+def set_command_sink(sink):
+    """Sends the commands of send_command to a function instead of standard output.
+    Used to run algos in the same process as the engine, see HeadlessEngine
+
+    Args:
+        sink: A function called with each command string, or None to write to standard output again
+
+    """
+    global _command_sink
+    _command_sink = sink
+
+def set_debug_sink(sink):
+    """Sends the messages of debug_write to a function instead of standard error
+
+    Args:
+        sink: A function called with each message, or None to write to standard error again
+
+    """
+    global _debug_sink
+    _debug_sink = sink
+
+def config_key(config):
+    """Gets a digest of the contents of a game config, to key the tables that are shared by every game with the same config.
+    Every game parses its own copy of the config, so equal configs are different objects
+
+    Args:
+        config (JSON): Contains information about the game
+
+    Returns:
+        A hex string, the same for configs with equal contents
+
+    """
+    global _last_config_key
+    entry = _last_config_key
+    if entry[0] is config:
+        return entry[1]
+    entry = _CONFIG_KEYS.get(id(config))
+    if entry is None or entry[0] is not config:
+        entry = (config, hashlib.sha1(json.dumps(config, sort_keys=True).encode()).hexdigest())
+        _CONFIG_KEYS[id(config)] = entry
+        while len(_CONFIG_KEYS) > _CONFIG_KEYS_CAPACITY:
+            _CONFIG_KEYS.popitem(last=False)
+    _last_config_key = entry
+    return entry[1]
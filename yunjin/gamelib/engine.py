@@ -0,0 +1,395 @@
+import json
+import time
+
+from .algocore import AlgoCore
+from .game_map import GameMap
+from .game_state import GameState
+from .rules import GameRules, SP, MP
+from .simulator import ActionSimulator
+from .unit import get_unit_stats
+from . import util
+
+
+class MatchResult:
+    """The outcome of a headless match. Per player lists are indexed by player index, 0 for the first algo
+
+    Attributes :
+        * winner (int): 1 or 2 for the winning player, 0 for a draw
+        * turns (int): The number of turns played
+        * health (list): Each player's health at the end of the match
+        * crashed (list): For each player, True if its algo raised an exception or did not answer a turn
+        * duration (float): The number of seconds the match took
+        * computation_time (list): The number of seconds each algo spent in on_turn
+
+    """
+    def __init__(self, winner, turns, health, crashed, duration, computation_time):
+        self.winner = winner
+        self.turns = turns
+        self.health = health
+        self.crashed = crashed
+        self.duration = duration
+        self.computation_time = computation_time
+
+    def __str__(self):
+        return "Winner: {}, turns: {}, health: {}, duration: {:.3f}s".format(self.winner, self.turns, self.health, self.duration)
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class HeadlessEngine:
+    """Plays a match between two AlgoCore objects in this process, following the rules of a game config.
+
+    Each turn both algos are sent the same strings the engine would send, through AlgoCore.handle_message,
+    and their commands are collected with util.set_command_sink instead of stdout. The second algo sees the
+    board flipped, as with the real engine, so it also plays from the bottom of the board.
+
+    A turn is played like this:
+        1. Both algos are sent the turn state and submit their build and deploy commands
+        2. Valid structures, upgrades and removals are applied, then valid mobile units are deployed
+        3. The action phase is played by ActionSimulator, each frame is sent to the algos that handle action frames
+        4. Damage, breaches and destroyed structures are applied, structures flagged for removal are refunded
+        5. Both players receive the SP and MP of the next turn
+
+    The action phase follows ActionSimulator, a close model of the engine rather than an exact one, so results
+    can differ slightly from engine.jar. Use it for fast self-play, and confirm important results with the engine.
+
+    Attributes :
+        * config (JSON): The game config
+        * algos (list): The two algos, the first plays as player 1
+        * max_turns (int): The match ends after this many turns, the player with the most health wins
+        * names (list): The names of the algos, used in endStats
+        * quiet (bool): If True, debug_write output of the algos is discarded while playing
+
+    """
+    MAX_FRAMES = 500
+
+    def __init__(self, config, algo1, algo2, max_turns=100, names=("player1", "player2"), quiet=True):
+        """Sets up a match, the algos can be new AlgoStrategy objects or ones that already played a match
+
+        Args:
+            config: The game config, as loaded from game-configs.json
+            algo1: The AlgoCore playing as player 1
+            algo2: The AlgoCore playing as player 2
+            max_turns: The number of turns after which the match ends
+            names: The names of the algos in endStats
+            quiet: If True, the debug output of the algos is discarded
+
+        """
+        self.config = config
+        self.algos = [algo1, algo2]
+        self.max_turns = max_turns
+        self.names = list(names)
+        self.quiet = quiet
+        self.rules = GameRules.from_config(config)
+        self.game_map = GameMap(config)
+        self.ARENA_SIZE = self.game_map.ARENA_SIZE
+        self.HALF_ARENA = self.game_map.HALF_ARENA
+        self.__config_string = json.dumps(config)
+        self.__edges = [self.rules.friendly_edges,
+                        frozenset(tuple(location) for location in self.rules.edges[0] + self.rules.edges[1])]
+        self.__reset()
+
+    def __reset(self):
+        resources = self.config["resources"]
+        self.turn = 0
+        self.health = [resources["startingHP"]] * 2
+        self.resources = [[resources["startingCores"], resources["startingBits"]] for _ in range(2)]
+        self.time_ms = [0, 0]
+        self.computation_time = [0.0, 0.0]
+        self.crashed = [False, False]
+        # (x, y) -> [type index, owner, health, upgraded, pending removal, id, SP spent]
+        self.structures = {}
+        self.__next_id = 0
+        self.__commands = []
+
+    @staticmethod
+    def __handles_frames(algo):
+        """Checks if an algo uses action frames, decided every action phase as history and speculation are
+        enabled from on_game_start or later
+        """
+        return (type(algo).on_action_frame is not AlgoCore.on_action_frame or
+                getattr(algo, "history", None) is not None or getattr(algo, "speculation", None) is not None)
+
+    def __new_id(self):
+        self.__next_id += 1
+        return str(self.__next_id)
+
+    def play(self):
+        """Plays the match
+
+        Returns:
+            The MatchResult
+
+        """
+        self.__reset()
+        start_time = time.perf_counter()
+        util.set_command_sink(self.__commands.append)
+        if self.quiet:
+            util.set_debug_sink(lambda message: None)
+        try:
+            for algo in self.algos:
+                algo.handle_message(self.__config_string)
+            while True:
+                self.__play_turn()
+                if min(self.health) <= 0 or any(self.crashed) or self.turn + 1 >= self.max_turns:
+                    break
+                self.__next_turn()
+            winner = self.__winner()
+            duration = time.perf_counter() - start_time
+            for player_index, algo in enumerate(self.algos):
+                algo.handle_message(self.__state_string(player_index, 2, -1, end_stats=self.__end_stats(winner, duration)))
+        finally:
+            util.set_command_sink(None)
+            util.set_debug_sink(None)
+        return MatchResult(winner, self.turn + 1, list(self.health), list(self.crashed), duration, list(self.computation_time))
+
+    def __winner(self):
+        if self.crashed[0] != self.crashed[1]:
+            return 2 if self.crashed[0] else 1
+        if self.health[0] != self.health[1]:
+            return 1 if self.health[0] > self.health[1] else 2
+        return 0
+
+    def __end_stats(self, winner, duration):
+        return {
+            "winner": winner,
+            "turns": self.turn + 1,
+            "duration": int(duration * 1000),
+            "player1": {"name": self.names[0], "crashed": self.crashed[0], "total_computation_time": int(self.computation_time[0] * 1000)},
+            "player2": {"name": self.names[1], "crashed": self.crashed[1], "total_computation_time": int(self.computation_time[1] * 1000)}}
+
+    def __crash(self, player_index, exception):
+        """Records that an algo raised an exception, it loses the match at the end of the turn
+        """
+        util.set_debug_sink(None)
+        util.debug_write("Algo {} crashed on turn {}: {!r}".format(self.names[player_index], self.turn, exception))
+        if self.quiet:
+            util.set_debug_sink(lambda message: None)
+        self.crashed[player_index] = True
+
+    def __ask(self, player_index, message):
+        """Sends a turn to an algo, returns its build and deploy commands
+        """
+        del self.__commands[:]
+        start_time = time.perf_counter()
+        try:
+            self.algos[player_index].handle_message(message)
+        except Exception as exception:
+            self.__crash(player_index, exception)
+        elapsed = time.perf_counter() - start_time
+        self.computation_time[player_index] += elapsed
+        self.time_ms[player_index] = int(elapsed * 1000)
+        commands = []
+        for command in self.__commands[:2]:
+            try:
+                commands.append(json.loads(command))
+            except ValueError:
+                commands.append([])
+        if len(commands) < 2 and not self.crashed[player_index]:
+            self.crashed[player_index] = True
+        return commands + [[]] * (2 - len(commands))
+
+    def __play_turn(self):
+        commands = [self.__ask(player_index, self.__state_string(player_index, 0, -1)) for player_index in range(2)]
+
+        spawn_events = []
+        for player_index in range(2):
+            self.__build(player_index, commands[player_index][0], spawn_events)
+        deploys = []
+        for player_index in range(2):
+            self.__deploy(player_index, commands[player_index][1], deploys, spawn_events)
+
+        self.__action_phase(deploys, spawn_events)
+        self.__remove_flagged()
+
+    def __next_turn(self):
+        resources = self.config["resources"]
+        unit_information = self.config["unitInformation"]
+        self.turn += 1
+        for player_index in range(2):
+            SP_gained = resources["coresPerRound"]
+            MP_gained = resources["bitsPerRound"] + resources["bitGrowthRate"] * (self.turn // resources["turnIntervalForBitSchedule"])
+            for type_index, owner, _, upgraded, _, _, _ in self.structures.values():
+                if owner == player_index:
+                    type_config = unit_information[type_index]
+                    if upgraded:
+                        type_config = dict(type_config, **type_config.get("upgrade", {}))
+                    SP_gained += type_config.get("generatesResource1", 0)
+                    MP_gained += type_config.get("generatesResource2", 0)
+            player_resources = self.resources[player_index]
+            player_resources[SP] = round(player_resources[SP] + SP_gained, 1)
+            MP_held = player_resources[MP] * (1 - resources["bitDecayPerRound"]) + MP_gained
+            player_resources[MP] = round(min(MP_held, resources.get("maxBits", MP_held)), 1)
+
+    def __flip(self, player_index, x, y):
+        """Converts between the locations seen by a player and the locations of player 1
+        """
+        if player_index == 0:
+            return x, y
+        return self.ARENA_SIZE - 1 - x, self.ARENA_SIZE - 1 - y
+
+    def __parse_command(self, player_index, command):
+        """Returns (unit_type, x, y) in player 1 locations, or None if the command is malformed
+        """
+        try:
+            unit_type, x, y = command[0], int(command[1]), int(command[2])
+        except (TypeError, ValueError, IndexError):
+            return None
+        if unit_type not in self.rules.UNIT_TYPE_TO_INDEX:
+            return None
+        x, y = self.__flip(player_index, x, y)
+        if not self.game_map.in_arena_bounds([x, y]):
+            return None
+        return unit_type, x, y
+
+    def __own_half(self, player_index, y):
+        return y < self.HALF_ARENA if player_index == 0 else y >= self.HALF_ARENA
+
+    def __pay(self, player_index, cost):
+        player_resources = self.resources[player_index]
+        if player_resources[SP] < cost[SP] or player_resources[MP] < cost[MP]:
+            return False
+        player_resources[SP] -= cost[SP]
+        player_resources[MP] -= cost[MP]
+        return True
+
+    def __build(self, player_index, commands, spawn_events):
+        rules = self.rules
+        for command in commands:
+            parsed = self.__parse_command(player_index, command)
+            if parsed is None:
+                continue
+            unit_type, x, y = parsed
+            structure = self.structures.get((x, y))
+            if unit_type == rules.REMOVE:
+                if structure is not None and structure[1] == player_index:
+                    structure[4] = True
+            elif unit_type == rules.UPGRADE:
+                if structure is None or structure[1] != player_index or structure[3]:
+                    continue
+                base_type = self.config["unitInformation"][structure[0]]["shorthand"]
+                if base_type not in rules.upgrade_costs or not self.__pay(player_index, rules.upgrade_costs[base_type]):
+                    continue
+                base = get_unit_stats(self.config, base_type, False)
+                upgraded = get_unit_stats(self.config, base_type, True)
+                structure[2] += upgraded.max_health - base.max_health
+                structure[3] = True
+                structure[6] += rules.upgrade_costs[base_type][SP]
+            elif unit_type in rules.STRUCTURE_TYPES:
+                if structure is not None or not self.__own_half(player_index, y) or not self.__pay(player_index, rules.costs[unit_type]):
+                    continue
+                type_index = rules.UNIT_TYPE_TO_INDEX[unit_type]
+                unit_id = self.__new_id()
+                self.structures[(x, y)] = [type_index, player_index, get_unit_stats(self.config, unit_type, False).max_health,
+                                           False, False, unit_id, rules.costs[unit_type][SP]]
+                spawn_events.append([[x, y], type_index, unit_id, player_index + 1])
+
+    def __deploy(self, player_index, commands, deploys, spawn_events):
+        rules = self.rules
+        for command in commands:
+            parsed = self.__parse_command(player_index, command)
+            if parsed is None:
+                continue
+            unit_type, x, y = parsed
+            if (unit_type not in rules.MOBILE_UNITS or (x, y) not in self.__edges[player_index] or
+                    (x, y) in self.structures or not self.__pay(player_index, rules.costs[unit_type])):
+                continue
+            deploys.append((unit_type, x, y, player_index))
+            spawn_events.append([[x, y], rules.UNIT_TYPE_TO_INDEX[unit_type], str(len(deploys) - 1), player_index + 1])
+
+    def __action_phase(self, deploys, spawn_events):
+        wants_frames = [self.__handles_frames(algo) and not crashed for algo, crashed in zip(self.algos, self.crashed)]
+        game_state = GameState(self.config, self.__state_string(0, 0, -1))
+        simulator = ActionSimulator(game_state, record_events=any(wants_frames))
+        for unit_type, x, y, player_index in deploys:
+            simulator.add_unit(unit_type, [x, y], 1, player_index)
+
+        if any(wants_frames):
+            self.__send_frame(wants_frames, 0, simulator, dict({event_type: [] for event_type in ActionSimulator.EVENT_TYPES}, spawn=spawn_events))
+        while simulator.frame < self.MAX_FRAMES and any(simulator.unit_alive):
+            simulator.step()
+            if any(wants_frames):
+                self.__send_frame(wants_frames, simulator.frame, simulator, simulator.events)
+
+        result = simulator.result
+        for player_index in range(2):
+            self.health[player_index] = max(0, self.health[player_index] - result.health_lost[player_index])
+            self.resources[player_index][SP] += result.sp_gained[player_index]
+        for (x, y), structure in list(self.structures.items()):
+            index = x * self.ARENA_SIZE + y
+            if not simulator.structure_code[index]:
+                del self.structures[(x, y)]
+            else:
+                structure[2] = simulator.structure_health[index]
+
+    def __send_frame(self, wants_frames, frame, simulator, events):
+        mobile = [(simulator.unit_type[unit_id], simulator.unit_player[unit_id], simulator.unit_x[unit_id], simulator.unit_y[unit_id],
+                   simulator.unit_health[unit_id], str(unit_id))
+                  for unit_id, alive in enumerate(simulator.unit_alive) if alive]
+        structure_health = simulator.structure_health
+        for player_index, wants in enumerate(wants_frames):
+            if wants and not self.crashed[player_index]:
+                try:
+                    self.algos[player_index].handle_message(self.__state_string(
+                        player_index, 1, frame, mobile=mobile, events=events, structure_health=structure_health))
+                except Exception as exception:
+                    self.__crash(player_index, exception)
+
+    def __remove_flagged(self):
+        for location, structure in list(self.structures.items()):
+            if structure[4]:
+                type_config = self.config["unitInformation"][structure[0]]
+                max_health = get_unit_stats(self.config, type_config["shorthand"], structure[3]).max_health
+                refund = type_config.get("refundPercentage", 0) * structure[6] * min(1, structure[2] / max_health)
+                self.resources[structure[1]][SP] = round(self.resources[structure[1]][SP] + refund, 1)
+                del self.structures[location]
+
+    def __flip_event(self, player_index, event_type, event):
+        """An event as seen by a player, the location is always first and the player number is after the unit id
+        """
+        if player_index == 0:
+            return event
+        event = list(event)
+        event[0] = list(self.__flip(1, *event[0]))
+        player_position = {"spawn": 3, "death": 3, "breach": 4, "selfDestruct": 5}.get(event_type)
+        if player_position is not None:
+            event[player_position] = 3 - event[player_position]
+        return event
+
+    def __state_string(self, player_index, state_type, frame, mobile=(), events=None, end_stats=None, structure_health=None):
+        """The game state or action frame string the engine sends a player
+        """
+        units = [[[] for _ in range(8)] for _ in range(2)]
+        for (x, y), (type_index, owner, health, upgraded, pending_removal, unit_id, _) in self.structures.items():
+            if structure_health is not None:
+                health = structure_health[x * self.ARENA_SIZE + y]
+                if health <= 0:
+                    continue
+            seen_x, seen_y = self.__flip(player_index, x, y)
+            owner_units = units[owner]
+            owner_units[type_index].append([seen_x, seen_y, health, unit_id])
+            if pending_removal:
+                owner_units[6].append([seen_x, seen_y, 0, unit_id])
+            if upgraded:
+                owner_units[7].append([seen_x, seen_y, 0, unit_id])
+        for type_index, owner, x, y, health, unit_id in mobile:
+            seen_x, seen_y = self.__flip(player_index, x, y)
+            units[owner][type_index].append([seen_x, seen_y, health, unit_id])
+
+        stats = [[self.health[index], self.resources[index][SP], self.resources[index][MP], self.time_ms[index]] for index in range(2)]
+        other = 1 - player_index
+        state = {
+            "p1Units": units[player_index],
+            "p2Units": units[other],
+            "turnInfo": [state_type, self.turn, frame, 0],
+            "p1Stats": stats[player_index],
+            "p2Stats": stats[other],
+            "events": {event_type: [self.__flip_event(player_index, event_type, event) for event in event_list]
+                       for event_type, event_list in (events or {}).items()}}
+        if end_stats is not None:
+            if player_index == 1:
+                end_stats = dict(end_stats, player1=end_stats["player2"], player2=end_stats["player1"],
+                                 winner=(3 - end_stats["winner"]) if end_stats["winner"] else 0)
+            state["endStats"] = end_stats
+        return json.dumps(state)